@@ -0,0 +1,28 @@
+"""add shard to users
+
+Revision ID: a6c2e8f4d1b7
+Revises: f3b8d1e6a4c9
+Create Date: 2026-10-19 18:05:31.274619
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6c2e8f4d1b7'
+down_revision: Union[str, Sequence[str], None] = 'f3b8d1e6a4c9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('shard', sa.String(length=50), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'shard')
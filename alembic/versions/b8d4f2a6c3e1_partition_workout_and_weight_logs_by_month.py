@@ -0,0 +1,164 @@
+"""partition workout and weight logs by month
+
+Revision ID: b8d4f2a6c3e1
+Revises: a6c2e8f4d1b7
+Create Date: 2026-10-19 19:22:46.531870
+
+Turns workout_logs and weight_logs into tables range-partitioned on
+log_date, one partition per month plus a default partition for dates no
+monthly partition covers yet. The primary key becomes (id, log_date), since
+PostgreSQL requires the partition key in it; ids still come from the same
+sequence. log_date gets a BRIN index. create_log_partition(parent, month)
+adds one month, moving any of its rows out of the default partition;
+app.services.partitions calls it ahead of time and detaches old months.
+
+PostgreSQL only: on other databases this revision does nothing.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8d4f2a6c3e1'
+down_revision: Union[str, Sequence[str], None] = 'a6c2e8f4d1b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Months created ahead of the current one
+MONTHS_AHEAD = 3
+
+TABLES = {
+    'workout_logs': {
+        'indexes': [
+            ('ix_workout_logs_id', ['id']),
+            ('ix_workout_logs_user_id_log_date', ['user_id', 'log_date']),
+            ('ix_workout_logs_user_id_updated_at', ['user_id', 'updated_at']),
+        ],
+        'foreign_keys': [
+            ('workout_logs_user_id_fkey', 'user_id', 'users', 'CASCADE'),
+            ('workout_logs_plan_id_fkey', 'plan_id', 'workout_plans', 'SET NULL'),
+            ('workout_logs_exercise_id_fkey', 'exercise_id', 'exercises', 'SET NULL'),
+        ],
+    },
+    'weight_logs': {
+        'indexes': [
+            ('ix_weight_logs_id', ['id']),
+            ('ix_weight_logs_user_id_updated_at', ['user_id', 'updated_at']),
+        ],
+        'foreign_keys': [
+            ('weight_logs_user_id_fkey', 'user_id', 'users', 'CASCADE'),
+        ],
+    },
+}
+
+CREATE_LOG_PARTITION = """
+CREATE OR REPLACE FUNCTION create_log_partition(parent text, month date) RETURNS void AS $$
+DECLARE
+    start_date date := date_trunc('month', month)::date;
+    end_date date := (date_trunc('month', month) + interval '1 month')::date;
+    partition text := parent || '_' || to_char(start_date, 'YYYY_MM');
+BEGIN
+    IF to_regclass(partition) IS NOT NULL THEN
+        RETURN;
+    END IF;
+    EXECUTE format('CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS)', partition, parent);
+    -- Rows for this month that were routed to the default partition
+    EXECUTE format(
+        'WITH moved AS (DELETE FROM %I WHERE log_date >= %L AND log_date < %L RETURNING *) '
+        'INSERT INTO %I SELECT * FROM moved',
+        parent || '_default', start_date, end_date, partition
+    );
+    EXECUTE format(
+        'ALTER TABLE %I ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+        parent, partition, start_date, end_date
+    );
+END
+$$ LANGUAGE plpgsql
+"""
+
+
+def _swap_out(table: str, spec: dict) -> str:
+    """Rename ``table`` aside and free its constraint and index names; returns the new name."""
+    old = f'{table}_unpartitioned'
+    op.rename_table(table, old)
+    op.execute(f'ALTER TABLE {old} RENAME CONSTRAINT {table}_pkey TO {old}_pkey')
+    for name, _ in spec['indexes']:
+        op.drop_index(name, table_name=old)
+    for name, _, _, _ in spec['foreign_keys']:
+        op.drop_constraint(name, old, type_='foreignkey')
+    return old
+
+
+def _move_sequence(old: str, table: str) -> None:
+    # The id default keeps using the old table's sequence; hand it over so
+    # dropping the old table does not drop it
+    sequence = op.get_bind().execute(sa.text(f"SELECT pg_get_serial_sequence('{old}', 'id')")).scalar()
+    op.execute(f'ALTER SEQUENCE {sequence} OWNED BY {table}.id')
+
+
+def _add_constraints(table: str, spec: dict) -> None:
+    for name, column, referent, ondelete in spec['foreign_keys']:
+        op.create_foreign_key(name, table, referent, [column], ['id'], ondelete=ondelete)
+    for name, columns in spec['indexes']:
+        op.create_index(name, table, columns, unique=False)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+
+    op.execute(CREATE_LOG_PARTITION)
+    for table, spec in TABLES.items():
+        old = _swap_out(table, spec)
+
+        op.execute(f'CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS) PARTITION BY RANGE (log_date)')
+        op.execute(f'ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id, log_date)')
+        _move_sequence(old, table)
+        _add_constraints(table, spec)
+        op.create_index(f'ix_{table}_log_date_brin', table, ['log_date'], postgresql_using='brin')
+        op.execute(f'CREATE TABLE {table}_default PARTITION OF {table} DEFAULT')
+
+        # A partition for every month with rows, and the coming months
+        months = bind.execute(sa.text(
+            f"SELECT DISTINCT date_trunc('month', log_date)::date FROM {old} "
+            f"UNION SELECT (date_trunc('month', current_date) + make_interval(months => n))::date "
+            f"FROM generate_series(0, {MONTHS_AHEAD}) AS n"
+        )).scalars().all()
+        for month in sorted(months):
+            bind.execute(sa.text('SELECT create_log_partition(:table, :month)'), {'table': table, 'month': month})
+
+        op.execute(f'INSERT INTO {table} SELECT * FROM {old}')
+        op.drop_table(old)
+        op.execute(f'ANALYZE {table}')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    # Partitions detached by app.services.partitions are left where they are
+    for table, spec in TABLES.items():
+        partitioned = f'{table}_partitioned'
+        op.rename_table(table, partitioned)
+        op.execute(f'ALTER TABLE {partitioned} RENAME CONSTRAINT {table}_pkey TO {partitioned}_pkey')
+        for name, _ in spec['indexes']:
+            op.drop_index(name, table_name=partitioned)
+        op.drop_index(f'ix_{table}_log_date_brin', table_name=partitioned)
+        for name, _, _, _ in spec['foreign_keys']:
+            op.drop_constraint(name, partitioned, type_='foreignkey')
+
+        op.execute(f'CREATE TABLE {table} (LIKE {partitioned} INCLUDING DEFAULTS)')
+        op.execute(f'ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id)')
+        _move_sequence(partitioned, table)
+        _add_constraints(table, spec)
+
+        op.execute(f'INSERT INTO {table} SELECT * FROM {partitioned}')
+        # Drops the monthly and default partitions with it
+        op.drop_table(partitioned)
+
+    op.execute('DROP FUNCTION create_log_partition(text, date)')
@@ -0,0 +1,43 @@
+"""add exercise volume columns to workout logs
+
+Revision ID: c3f1a8d2e4b7
+Revises: 9d62599c512f
+Create Date: 2026-10-19 09:12:04.318227
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3f1a8d2e4b7'
+down_revision: Union[str, Sequence[str], None] = '9d62599c512f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('workout_logs', sa.Column('exercise_id', sa.Integer(), nullable=True))
+    op.add_column('workout_logs', sa.Column('sets', sa.Integer(), nullable=True))
+    op.add_column('workout_logs', sa.Column('reps', sa.Integer(), nullable=True))
+    op.add_column('workout_logs', sa.Column('duration_seconds', sa.Integer(), nullable=True))
+    op.add_column('workout_logs', sa.Column('distance_meters', sa.Integer(), nullable=True))
+    op.create_foreign_key(
+        'workout_logs_exercise_id_fkey', 'workout_logs', 'exercises',
+        ['exercise_id'], ['id'], ondelete='SET NULL'
+    )
+    op.create_index('ix_workout_logs_user_id_log_date', 'workout_logs', ['user_id', 'log_date'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_workout_logs_user_id_log_date', table_name='workout_logs')
+    op.drop_constraint('workout_logs_exercise_id_fkey', 'workout_logs', type_='foreignkey')
+    op.drop_column('workout_logs', 'distance_meters')
+    op.drop_column('workout_logs', 'duration_seconds')
+    op.drop_column('workout_logs', 'reps')
+    op.drop_column('workout_logs', 'sets')
+    op.drop_column('workout_logs', 'exercise_id')
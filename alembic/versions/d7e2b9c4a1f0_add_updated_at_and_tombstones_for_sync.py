@@ -0,0 +1,57 @@
+"""add updated_at columns and tombstones table for delta sync
+
+Revision ID: d7e2b9c4a1f0
+Revises: c3f1a8d2e4b7
+Create Date: 2026-10-19 11:40:27.905113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7e2b9c4a1f0'
+down_revision: Union[str, Sequence[str], None] = 'c3f1a8d2e4b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (table, column the per-user index leads with)
+SYNCED_TABLES = [
+    ('workout_plans', 'user_id'),
+    ('plan_items', 'plan_id'),
+    ('workout_logs', 'user_id'),
+    ('weight_logs', 'user_id'),
+    ('goals', 'user_id'),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table, owner in SYNCED_TABLES:
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False))
+        op.create_index(f'ix_{table}_{owner}_updated_at', table, [owner, 'updated_at'], unique=False)
+
+    op.create_table('tombstones',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('entity', sa.String(length=50), nullable=False),
+        sa.Column('entity_id', sa.Integer(), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_tombstones_id'), 'tombstones', ['id'], unique=False)
+    op.create_index('ix_tombstones_user_id_deleted_at', 'tombstones', ['user_id', 'deleted_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tombstones_user_id_deleted_at', table_name='tombstones')
+    op.drop_index(op.f('ix_tombstones_id'), table_name='tombstones')
+    op.drop_table('tombstones')
+
+    for table, owner in reversed(SYNCED_TABLES):
+        op.drop_index(f'ix_{table}_{owner}_updated_at', table_name=table)
+        op.drop_column(table, 'updated_at')
@@ -4,6 +4,172 @@ class Settings(BaseSettings):
     DATABASE_URL: str
     JWT_SECRET: str
 
+    # Extra shards for user data, comma separated "name=url" entries; the
+    # main database is shard "main". New users are placed on a consistent-hash
+    # ring over user_id with SHARD_VNODES points per shard, and moved to match
+    # it by `python -m app.services.rebalance` (see app.services.sharding).
+    DATABASE_SHARDS: str = ""
+    SHARD_VNODES: int = 100
+
+    # Read replicas, comma separated URLs. Endpoints marked @replica_reads
+    # read from them round-robin; replicas failing the periodic health check
+    # or lagging more than REPLICA_MAX_LAG_SECONDS are skipped. After a user
+    # commits a write, their reads stay on the primary for
+    # READ_YOUR_WRITES_SECONDS ("redis" shares that between workers).
+    DATABASE_REPLICA_URLS: str = ""
+    REPLICA_HEALTH_CHECK_SECONDS: float = 5
+    REPLICA_MAX_LAG_SECONDS: float = 3
+    READ_YOUR_WRITES_SECONDS: float = 5
+    READ_YOUR_WRITES_BACKEND: str = "memory"
+    READ_YOUR_WRITES_REDIS_URL: str = "redis://localhost:6379/0"
+
+    # Monthly partitions of workout_logs and weight_logs (PostgreSQL only,
+    # see app.services.partitions): every LOG_PARTITION_CHECK_SECONDS the
+    # next LOG_PARTITION_MONTHS_AHEAD months are created, and months older
+    # than LOG_PARTITION_RETENTION_MONTHS (0 keeps everything) are detached
+    # into the LOG_PARTITION_ARCHIVE_SCHEMA schema.
+    LOG_PARTITION_CHECK_SECONDS: float = 6 * 3600
+    LOG_PARTITION_MONTHS_AHEAD: int = 3
+    LOG_PARTITION_RETENTION_MONTHS: int = 0
+    LOG_PARTITION_ARCHIVE_SCHEMA: str = "archive"
+
+    # Cold storage: `python -m app.services.archive run` moves workout and
+    # weight logs dated before the month ARCHIVE_AFTER_MONTHS months ago into
+    # compressed per-user monthly blobs, which reads reaching back that far
+    # merge in transparently. 0 turns archiving off.
+    ARCHIVE_AFTER_MONTHS: int = 0
+
+    # Token keys for rotation: comma separated "kid:ALG:value" entries where
+    # ALG is HS256 (value = secret), ES256 or EdDSA (value = PEM file path).
+    # New tokens are signed with JWT_ACTIVE_KID, or with JWT_SECRET when empty.
+    JWT_KEYS: str = ""
+    JWT_ACTIVE_KID: str = ""
+    # Decoded claims of recently seen tokens, reused until the token expires
+    JWT_CLAIMS_CACHE_SIZE: int = 10_000
+
+    # Access tokens are short lived; clients renew them with the rotating
+    # refresh token returned by /auth/login instead of logging in again.
+    ACCESS_TOKEN_MINUTES: int = 15
+    REFRESH_TOKEN_DAYS: int = 30
+    # How often each worker reloads revoked token ids from the database
+    REVOCATION_SYNC_SECONDS: float = 10
+
+    # Token-bucket rate limits checked before routing: ";"-separated rules
+    # "METHOD PATH scope=N/SECONDS ..." with scope ip or account (see
+    # app.middleware.rate_limit). "memory" buckets are per worker and LRU
+    # bounded; "redis" shares them via RATE_LIMIT_REDIS_URL.
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMITS: str = (
+        "POST /auth/login ip=20/60 account=5/60;"
+        "POST /auth/register ip=5/60;"
+        "POST /auth/refresh ip=60/60"
+    )
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMIT_REDIS_URL: str = "redis://localhost:6379/0"
+    RATE_LIMIT_MAX_KEYS: int = 100_000
+    # Take the client address from X-Forwarded-For (only behind a trusted proxy)
+    RATE_LIMIT_TRUST_FORWARDED: bool = False
+
+    # Adaptive concurrency limit per worker (AIMD on latency relative to each
+    # route's baseline; see app.middleware.concurrency). Requests over their
+    # priority's share of the limit get 503 + Retry-After instead of queueing.
+    CONCURRENCY_LIMIT_ENABLED: bool = True
+    CONCURRENCY_INITIAL_LIMIT: int = 20
+    CONCURRENCY_MIN_LIMIT: int = 4
+    CONCURRENCY_MAX_LIMIT: int = 100
+    CONCURRENCY_LATENCY_TOLERANCE: float = 2.0
+    CONCURRENCY_BACKOFF: float = 0.9
+    CONCURRENCY_RETRY_AFTER_SECONDS: int = 1
+    # "priority=path,path; ..." with fnmatch patterns; unlisted paths are
+    # "normal". Bulk requests are shed first, critical ones last, exempt never.
+    CONCURRENCY_PRIORITIES: str = (
+        "exempt=/metrics;"
+        "critical=/workout-mode/*,/auth/refresh;"
+        "bulk=/sync,/batch,/tracking/volume,/plans/*/volume,/admin/*"
+    )
+
+    # Deadline for each request's database work, in milliseconds: statements
+    # still running when it passes are cancelled and the request gets a 503.
+    # REQUEST_DEADLINES overrides it with comma separated "pattern=ms" entries
+    # (fnmatch patterns, first match wins); workout-mode steps must be snappy.
+    REQUEST_DEADLINE_MS: int = 5000
+    REQUEST_DEADLINES: str = "/workout-mode/*=1500,/sync=15000,/batch=15000,/admin/*=30000"
+
+    # Delta sync: rows changed this many seconds before the client's watermark
+    # are sent again so in-flight transactions are never missed.
+    SYNC_OVERLAP_SECONDS: int = 5
+    # Tombstones older than this are pruned; older watermarks force a full resync.
+    SYNC_TOMBSTONE_RETENTION_DAYS: int = 90
+
+    # Dashboard queries running at once per worker, across all /me/dashboard
+    # requests; each holds a pool connection (pool size 5 + 10 overflow).
+    DASHBOARD_QUERY_CONCURRENCY: int = 4
+
+    # Upper bound on sub-operations accepted by POST /batch
+    BATCH_MAX_OPERATIONS: int = 50
+
+    # Idempotency-Key handling for POST requests: "memory" keeps results per
+    # worker, "database" shares them between workers via idempotency_keys.
+    IDEMPOTENCY_BACKEND: str = "memory"
+    IDEMPOTENCY_TTL_SECONDS: int = 24 * 60 * 60
+    IDEMPOTENCY_MAX_ENTRIES: int = 10_000
+
+    # Response compression (brotli is used when the package is installed)
+    COMPRESSION_MIN_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+
+    # How long the serialised (and precompressed) exercise catalog is reused
+    EXERCISE_CATALOG_TTL_SECONDS: int = 300
+
+    # Per-user response cache for plan and tracking reads: "memory" is a
+    # per-worker LRU, "redis" shares entries via CACHE_REDIS_URL.
+    CACHE_ENABLED: bool = True
+    CACHE_BACKEND: str = "memory"
+    CACHE_REDIS_URL: str = "redis://localhost:6379/0"
+    CACHE_TTL_SECONDS: int = 300
+    CACHE_MAX_ENTRIES: int = 5_000
+    CACHE_MAX_ENTRY_BYTES: int = 1_048_576
+
+    # Request timing: per-route metrics are always collected; the
+    # Server-Timing header exposes app and database time to clients.
+    SERVER_TIMING_ENABLED: bool = True
+
+    # Admin endpoints (/admin/...) are open to these users, comma separated.
+    ADMIN_EMAILS: str = ""
+
+    # Slow-query log: statements slower than the threshold are logged with
+    # their route; EXPLAIN output is captured for the first occurrence of
+    # each normalised statement when SLOW_QUERY_EXPLAIN is on.
+    SLOW_QUERY_THRESHOLD_MS: float = 200
+    SLOW_QUERY_EXPLAIN: bool = False
+    SLOW_QUERY_BUFFER_SIZE: int = 100
+
+    # Sampling profiler: admins can profile a request with "X-Profile: 1"
+    # when PROFILER_HEADER_ENABLED; PROFILER_SAMPLE_RATE profiles that
+    # fraction of all requests. With both off the middleware is not installed.
+    PROFILER_HEADER_ENABLED: bool = False
+    PROFILER_SAMPLE_RATE: float = 0.0
+    PROFILER_INTERVAL_MS: float = 5
+    PROFILER_BUFFER_SIZE: int = 20
+
+    # Allocation tracking: tracemalloc is started from /admin/memory/start
+    # (or at startup); while it traces, MEMORY_SAMPLE_RATE of requests
+    # report their peak allocation to /metrics.
+    MEMORY_TRACE_ON_STARTUP: bool = False
+    MEMORY_TRACE_FRAMES: int = 10
+    MEMORY_SAMPLE_RATE: float = 0.1
+    MEMORY_SNAPSHOTS_KEPT: int = 5
+
+    # Per-route SQL statement budgets (@query_budget): "raise" fails the
+    # request at the first statement over budget (tests), "log" logs and
+    # counts overruns, "off" ignores them.
+    QUERY_BUDGET_MODE: str = "log"
+
+    @property
+    def admin_emails(self) -> set:
+        return {e.strip().lower() for e in self.ADMIN_EMAILS.split(",") if e.strip()}
+
     class Config:
         env_file = ".env"
 
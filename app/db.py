@@ -1,16 +1,43 @@
+from fastapi import Request
 from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import sessionmaker, declarative_base
 from app.config import settings
+from app.services.deadline import DeadlineExceeded, apply_deadline, is_timeout
+from app.services.replicas import RoutingSession, route_reads
+from app.services.sharding import ShardMap, parse_shards
 
 print(">>> DB URL in use:", settings.DATABASE_URL)
 
 engine = create_engine(settings.DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
+shard_map = ShardMap(engine, parse_shards(settings.DATABASE_SHARDS), settings.SHARD_VNODES)
+
+def get_db(request: Request):
+    # get_current_user may already have picked the user's shard; if not, it
+    # rebinds this session before its first statement
+    db = SessionLocal(bind=getattr(request.state, "shard_engine", engine))
+    request.state.db = db
     try:
+        apply_deadline(db, request.scope)
+        if db.bind is engine:
+            # Replicas are copies of the main database
+            route_reads(db, request)
         yield db
+    except OperationalError as exc:
+        if is_timeout(exc):
+            raise DeadlineExceeded() from exc
+        raise
     finally:
         db.close()
+
+def bind_to_shard(request: Request, shard: str | None) -> None:
+    """Point the request's session at the shard holding the current user's data."""
+    shard_engine = shard_map.engine_for(shard)
+    request.state.shard_engine = shard_engine
+    db = getattr(request.state, "db", None)
+    if db is not None and db.bind is not shard_engine:
+        db.bind = shard_engine
+        db.info["replica"] = None
@@ -1,16 +1,83 @@
-from fastapi import FastAPI, Depends
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, Request
+from fastapi.responses import JSONResponse, ORJSONResponse
 from sqlalchemy import text
 from sqlalchemy.orm import Session
-from app.db import get_db
-from app.routers import auth, exercises, plans, tracking, workout_mode
+from app.config import settings
+from app.db import engine, get_db, shard_map
+from app.middleware.idempotency import IdempotencyMiddleware
+from app.middleware.memory import AllocationMiddleware
+from app.middleware.compression import CompressionMiddleware
+from app.middleware.concurrency import ConcurrencyLimitMiddleware
+from app.middleware.deadline import DeadlineMiddleware
+from app.middleware.etag import ETagMiddleware
+from app.middleware.profiler import ProfilerMiddleware, profiler_enabled
+from app.middleware.rate_limit import RateLimitMiddleware
+from app.middleware.timing import TimingMiddleware, instrument_engine
+from app.services.deadline import DeadlineExceeded
+from app.services.partitions import partition_maintainer
+from app.services.replicas import replica_set
+from app.services.revocation import revocation_list
+from app.routers import auth, exercises, plans, tracking, workout_mode, sync, me, batch, metrics, admin
 
-app = FastAPI(title="Athlos API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    revocation_list.start()
+    replica_set.start()
+    partition_maintainer.start()
+    yield
+    partition_maintainer.stop()
+    replica_set.stop()
+    revocation_list.stop()
+
+
+app = FastAPI(title="Athlos API", default_response_class=ORJSONResponse, lifespan=lifespan)
+
+# Middleware added last runs first: compression wraps idempotency, so stored
+# idempotent responses are kept uncompressed and re-negotiated on replay.
+# The rate limiter rejects requests before anything else touches the
+# database, then the concurrency limiter sheds what the worker cannot take
+# on, so rate-limited requests never count against it. Timing wraps the
+# whole stack so it measures the bytes on the wire (and counts 429s and
+# 503s); the profiler sits outside it so its admin lookup is not charged
+# to the route. Deadlines start once a request is admitted.
+app.add_middleware(ETagMiddleware)
+app.add_middleware(IdempotencyMiddleware)
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(DeadlineMiddleware)
+if settings.CONCURRENCY_LIMIT_ENABLED:
+    app.add_middleware(ConcurrencyLimitMiddleware)
+if settings.RATE_LIMIT_ENABLED:
+    app.add_middleware(RateLimitMiddleware)
+app.add_middleware(AllocationMiddleware)
+app.add_middleware(TimingMiddleware)
+if profiler_enabled():
+    app.add_middleware(ProfilerMiddleware)
+
+for db_engine in [*shard_map.engines.values(), *replica_set.engines]:
+    instrument_engine(db_engine)
+
+
+@app.exception_handler(DeadlineExceeded)
+async def deadline_exceeded(request: Request, exc: DeadlineExceeded):
+    # A 503 also tells the concurrency limiter the database is struggling
+    return JSONResponse(
+        {"detail": "Request took too long, try again shortly"},
+        status_code=503,
+        headers={"Retry-After": str(settings.CONCURRENCY_RETRY_AFTER_SECONDS)},
+    )
 
 app.include_router(auth.router)
 app.include_router(exercises.router)
 app.include_router(plans.router)
 app.include_router(tracking.router)
 app.include_router(workout_mode.router)
+app.include_router(sync.router)
+app.include_router(me.router)
+app.include_router(batch.router)
+app.include_router(metrics.router)
+app.include_router(admin.router)
 
 @app.get("/db-check")
 def db_check(db: Session = Depends(get_db)):
@@ -0,0 +1,184 @@
+"""
+Negotiated response compression.
+
+Responses larger than ``COMPRESSION_MIN_SIZE`` bytes with a compressible
+content type are compressed with brotli (when the ``brotli`` package is
+installed and the client accepts it) or gzip. Payloads that are cached in
+memory can be wrapped in `PrecompressedPayload`, which compresses them once;
+responses that already carry a ``Content-Encoding`` are passed through.
+
+Per-route compression ratio and CPU time are collected in `stats`.
+"""
+
+import gzip
+import threading
+import time
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import Response
+
+from app.config import settings
+from app.services.metrics import route_label
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+
+
+def _compress(encoding: str, body: bytes) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+def choose_encoding(accept_encoding: str | None) -> str | None:
+    """Pick ``br`` or ``gzip`` from an Accept-Encoding header, honouring q=0."""
+    accepted = set()
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        params = params.replace(" ", "")
+        if params.startswith("q="):
+            try:
+                if float(params[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(name.strip().lower())
+
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+
+class CompressionStats:
+    """Per-route totals of compressed responses, bytes and CPU seconds."""
+
+    def __init__(self):
+        self._routes = {}
+        self._lock = threading.Lock()
+
+    def record(self, route: str, encoding: str, size_in: int, size_out: int, cpu_seconds: float):
+        with self._lock:
+            entry = self._routes.setdefault((route, encoding), [0, 0, 0, 0.0])
+            entry[0] += 1
+            entry[1] += size_in
+            entry[2] += size_out
+            entry[3] += cpu_seconds
+
+    def snapshot(self) -> list:
+        with self._lock:
+            items = sorted(self._routes.items())
+        return [
+            {
+                "route": route,
+                "encoding": encoding,
+                "responses": count,
+                "bytes_in": size_in,
+                "bytes_out": size_out,
+                "ratio": round(size_in / size_out, 3) if size_out else None,
+                "cpu_seconds": round(cpu, 6),
+            }
+            for (route, encoding), (count, size_in, size_out, cpu) in items
+        ]
+
+
+stats = CompressionStats()
+
+
+class PrecompressedPayload:
+    """
+    A JSON body compressed once per encoding, for responses cached in memory.
+    The one-off compression cost is recorded in `stats` under ``label``.
+    """
+
+    def __init__(self, body: bytes, label: str, media_type: str = "application/json"):
+        self.body = body
+        self.label = label
+        self.media_type = media_type
+        self._encoded = {}
+        self._lock = threading.Lock()
+
+    def encoded(self, encoding: str) -> bytes:
+        if encoding not in self._encoded:
+            with self._lock:
+                if encoding not in self._encoded:
+                    cpu_start = time.thread_time()
+                    self._encoded[encoding] = _compress(encoding, self.body)
+                    stats.record(
+                        self.label, encoding, len(self.body), len(self._encoded[encoding]),
+                        time.thread_time() - cpu_start
+                    )
+        return self._encoded[encoding]
+
+    def response(self, accept_encoding: str | None) -> Response:
+        encoding = choose_encoding(accept_encoding)
+        if encoding is None or len(self.body) < settings.COMPRESSION_MIN_SIZE:
+            return Response(self.body, media_type=self.media_type, headers={"Vary": "Accept-Encoding"})
+        return Response(
+            self.encoded(encoding),
+            media_type=self.media_type,
+            headers={"Content-Encoding": encoding, "Vary": "Accept-Encoding"},
+        )
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing buffered responses above a size threshold."""
+
+    def __init__(self, app, minimum_size: int | None = None):
+        self.app = app
+        self.minimum_size = settings.COMPRESSION_MIN_SIZE if minimum_size is None else minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        start_message = None
+        chunks = []
+        passthrough = False
+
+        async def compressing_send(message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                return await send(message)
+
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                content_type = headers.get("content-type", "")
+                if (
+                    "content-encoding" in headers
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)
+                ):
+                    passthrough = True
+                    return await send(message)
+                start_message = message
+                return
+
+            # http.response.body: buffer until the last chunk
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+
+            body = b"".join(chunks)
+            headers = MutableHeaders(raw=start_message["headers"])
+            if len(body) >= self.minimum_size:
+                cpu_start = time.thread_time()
+                compressed = _compress(encoding, body)
+                stats.record(route_label(scope), encoding, len(body), len(compressed), time.thread_time() - cpu_start)
+                if len(compressed) < len(body):
+                    body = compressed
+                    headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+            await send(start_message)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, compressing_send)
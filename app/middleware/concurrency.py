@@ -0,0 +1,160 @@
+"""
+Adaptive concurrency limiting with priority-based load shedding.
+
+The number of requests in flight per worker is capped by a limit that adapts
+AIMD-style to observed latency: every request that completes near its
+route's usual latency while the worker is busy raises the limit by
+``1/limit`` (about one per round of requests), and a request that takes
+more than ``CONCURRENCY_LATENCY_TOLERANCE`` times its route's baseline, or
+fails with a 503 or an exception, cuts it by ``CONCURRENCY_BACKOFF``. Only
+requests admitted after the last cut can trigger the next one, so one slow
+burst cuts once.
+
+Requests are shed, not queued: when a request arrives with the worker
+already at its priority's share of the limit, it gets an immediate 503 with
+``Retry-After``. Bulk routes are shed first and critical ones (workout-mode
+steps) last; see ``CONCURRENCY_PRIORITIES``. The limit, in-flight count,
+threadpool and connection pool queue depth and shed counts are exported to
+``/metrics``.
+"""
+
+import time
+from fnmatch import fnmatchcase
+
+from anyio import to_thread
+from starlette.responses import JSONResponse
+
+from app.config import settings
+from app.db import engine
+from app.services.metrics import REGISTRY, route_label
+
+# Fraction of the limit each priority may fill; "exempt" is never limited
+PRIORITY_SHARES = {"critical": 1.0, "normal": 0.8, "bulk": 0.5}
+PRIORITIES = ("exempt",) + tuple(PRIORITY_SHARES)
+# Weight of each sample in a route's baseline latency
+BASELINE_ALPHA = 0.05
+
+LIMIT = REGISTRY.gauge("athlos_concurrency_limit", "Current adaptive concurrency limit.")
+IN_FLIGHT = REGISTRY.gauge("athlos_concurrency_in_flight", "Requests in flight under the concurrency limit.")
+SHED = REGISTRY.counter(
+    "athlos_concurrency_shed_total", "Requests rejected with 503 by the concurrency limiter.", labels=("priority",)
+)
+THREADPOOL_WAITING = REGISTRY.gauge(
+    "athlos_threadpool_tasks_waiting", "Sync endpoints waiting for a threadpool worker (sampled per request)."
+)
+
+
+@REGISTRY.collector
+def _pool_metrics():
+    checked_out = getattr(engine.pool, "checkedout", None)
+    if checked_out is None:
+        return
+    yield "# HELP athlos_db_pool_checked_out Database connections currently checked out of the pool."
+    yield "# TYPE athlos_db_pool_checked_out gauge"
+    yield f"athlos_db_pool_checked_out {checked_out()}"
+
+
+def parse_priorities(spec: str) -> list:
+    """``"critical=/a/*,/b; bulk=/c"`` -> ``[("critical", "/a/*"), ("critical", "/b"), ("bulk", "/c")]``."""
+    patterns = []
+    for entry in spec.split(";"):
+        if not entry.strip():
+            continue
+        priority, _, paths = entry.partition("=")
+        priority = priority.strip()
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown concurrency priority {priority!r}")
+        patterns.extend((priority, path.strip()) for path in paths.split(",") if path.strip())
+    return patterns
+
+
+class AIMDLimiter:
+    """Additive-increase/multiplicative-decrease limit; used from the event loop only."""
+
+    def __init__(self, initial: int, min_limit: int, max_limit: int, tolerance: float, backoff: float):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.in_flight = 0
+        self.last_cut = 0.0
+        self.baselines = {}
+
+    def try_acquire(self, share: float) -> bool:
+        if self.in_flight >= max(int(self.limit * share), 1):
+            return False
+        self.in_flight += 1
+        return True
+
+    def release(self, route: str, started: float, latency: float, failed: bool) -> None:
+        busy = self.in_flight >= self.limit / 2
+        self.in_flight -= 1
+
+        baseline = self.baselines.get(route, latency)
+        overloaded = failed or latency > baseline * self.tolerance
+        # Clipped so a slow period raises the baseline only gradually
+        sample = min(latency, baseline * self.tolerance)
+        self.baselines[route] = baseline + BASELINE_ALPHA * (sample - baseline)
+
+        if overloaded:
+            if started >= self.last_cut:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self.last_cut = time.monotonic()
+        elif busy:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+
+class ConcurrencyLimitMiddleware:
+    """ASGI middleware shedding requests above the adaptive concurrency limit."""
+
+    def __init__(self, app, limiter=None, priorities=None):
+        self.app = app
+        self.limiter = limiter or AIMDLimiter(
+            settings.CONCURRENCY_INITIAL_LIMIT,
+            settings.CONCURRENCY_MIN_LIMIT,
+            settings.CONCURRENCY_MAX_LIMIT,
+            settings.CONCURRENCY_LATENCY_TOLERANCE,
+            settings.CONCURRENCY_BACKOFF,
+        )
+        self.priorities = parse_priorities(settings.CONCURRENCY_PRIORITIES) if priorities is None else priorities
+        LIMIT.set(value=self.limiter.limit)
+
+    def priority(self, path: str) -> str:
+        return next((priority for priority, pattern in self.priorities if fnmatchcase(path, pattern)), "normal")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        priority = self.priority(scope["path"])
+        if priority == "exempt":
+            return await self.app(scope, receive, send)
+
+        THREADPOOL_WAITING.set(value=to_thread.current_default_thread_limiter().statistics().tasks_waiting)
+        if not self.limiter.try_acquire(PRIORITY_SHARES[priority]):
+            SHED.inc(priority)
+            response = JSONResponse(
+                {"detail": "Server is overloaded, try again shortly"},
+                status_code=503,
+                headers={"Retry-After": str(settings.CONCURRENCY_RETRY_AFTER_SECONDS)},
+            )
+            return await response(scope, receive, send)
+
+        IN_FLIGHT.set(value=self.limiter.in_flight)
+        started = time.monotonic()
+        status_code = None
+
+        async def status_send(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        failed = True
+        try:
+            await self.app(scope, receive, status_send)
+            failed = status_code == 503
+        finally:
+            self.limiter.release(route_label(scope), started, time.monotonic() - started, failed)
+            IN_FLIGHT.set(value=self.limiter.in_flight)
+            LIMIT.set(value=self.limiter.limit)
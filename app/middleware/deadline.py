@@ -0,0 +1,73 @@
+"""
+Per-route request deadlines and cancellation on client disconnect.
+
+Each request gets a deadline of ``REQUEST_DEADLINE_MS`` from its arrival,
+or the value of the first ``REQUEST_DEADLINES`` pattern matching its path;
+`app.services.deadline.apply_deadline` turns it into a statement timeout on
+the request's database session. While the request runs, its ``receive``
+channel is watched so that when the client goes away the statements still
+running for it are cancelled instead of finishing for nobody.
+"""
+
+import time
+
+import anyio
+
+from app.config import settings
+from app.services.deadline import cancel_queries, deadline_ms, parse_deadlines
+
+
+class DeadlineMiddleware:
+    """ASGI middleware setting ``request.state.deadline`` and watching for disconnects."""
+
+    def __init__(self, app, deadlines=None):
+        self.app = app
+        self.deadlines = parse_deadlines(settings.REQUEST_DEADLINES) if deadlines is None else deadlines
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        state = scope.setdefault("state", {})
+        state["deadline"] = time.monotonic() + deadline_ms(scope["path"], self.deadlines) / 1000
+
+        # Servers report the disconnect to whoever is awaiting receive(), and
+        # sync endpoints never do; pump messages through a stream instead so
+        # a disconnect is seen as soon as it happens.
+        send_stream, receive_stream = anyio.create_memory_object_stream(1)
+        responded = False
+
+        async def pump():
+            async with send_stream:
+                while True:
+                    message = await receive()
+                    if message["type"] == "http.disconnect":
+                        if not responded:
+                            cancel_queries(state)
+                        await send_stream.send(message)
+                        return
+                    await send_stream.send(message)
+
+        async def pumped_receive():
+            try:
+                return await receive_stream.receive()
+            except anyio.EndOfStream:
+                return {"type": "http.disconnect"}
+
+        async def tracking_send(message):
+            nonlocal responded
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                responded = True
+            await send(message)
+
+        # Errors are re-raised outside the task group so they are not
+        # wrapped in an ExceptionGroup on their way to the error handlers
+        error = None
+        async with anyio.create_task_group() as tasks:
+            tasks.start_soon(pump)
+            try:
+                await self.app(scope, pumped_receive, tracking_send)
+            except Exception as exc:
+                error = exc
+            tasks.cancel_scope.cancel()
+        if error is not None:
+            raise error
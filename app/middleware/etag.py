@@ -0,0 +1,28 @@
+"""
+Adds the ETag computed by the `app.services.etag` dependencies to responses.
+
+Endpoints on the fast path return their own `Response` objects, which
+FastAPI does not merge dependency headers into, so the header is attached
+here from ``request.state`` instead.
+"""
+
+from starlette.datastructures import MutableHeaders
+
+
+class ETagMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            return await self.app(scope, receive, send)
+
+        async def etag_send(message):
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                etag = scope.get("state", {}).get("etag")
+                if etag:
+                    headers = MutableHeaders(scope=message)
+                    headers["ETag"] = etag
+            await send(message)
+
+        await self.app(scope, receive, etag_send)
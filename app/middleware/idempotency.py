@@ -0,0 +1,262 @@
+"""
+Idempotency-Key support for POST requests.
+
+When an authenticated POST carries an ``Idempotency-Key`` header, the first
+response for that (user, key) pair is stored and every retry gets the stored
+bytes back without reaching the route handler. Reusing a key for a different
+request is rejected, and a retry that arrives while the original is still
+running gets 409.
+
+Results are kept in a bounded in-memory LRU per worker by default; set
+``IDEMPOTENCY_BACKEND=database`` to share them between workers through the
+``idempotency_keys`` table.
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.exc import IntegrityError
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+
+from app.config import settings
+from app.db import SessionLocal
+from app.middleware.timing import untimed
+from app.models.idempotency_key import IdempotencyKey
+from app.routers.auth import token_user_id
+
+MAX_KEY_LENGTH = 255
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+@dataclass
+class StoredResponse:
+    fingerprint: str
+    expires_at: datetime
+    status_code: int | None = None  # None while the original request is in flight
+    headers: list = field(default_factory=list)
+    body: bytes = b""
+
+
+class MemoryIdempotencyStore:
+    """Per-worker LRU of stored responses keyed by (user_id, key), with a TTL."""
+
+    blocking = False
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def claim(self, user_id: int, key: str, fingerprint: str) -> StoredResponse | None:
+        """
+        Return the stored entry for the key, or reserve the key for a new
+        request and return None.
+        """
+        with self._lock:
+            entry = self._entries.get((user_id, key))
+            if entry is not None and entry.expires_at > _now():
+                self._entries.move_to_end((user_id, key))
+                return entry
+
+            self._entries[(user_id, key)] = StoredResponse(fingerprint, _now() + self.ttl)
+            self._entries.move_to_end((user_id, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return None
+
+    def save(self, user_id: int, key: str, response: StoredResponse) -> None:
+        with self._lock:
+            self._entries[(user_id, key)] = response
+
+    def release(self, user_id: int, key: str) -> None:
+        with self._lock:
+            self._entries.pop((user_id, key), None)
+
+
+class DatabaseIdempotencyStore:
+    """Stored responses shared between workers through the idempotency_keys table."""
+
+    blocking = True
+
+    def __init__(self, ttl_seconds: int):
+        self.ttl = timedelta(seconds=ttl_seconds)
+
+    def claim(self, user_id: int, key: str, fingerprint: str) -> StoredResponse | None:
+        db = SessionLocal()
+        try:
+            # Expired keys of this user are dropped first so they can be reused
+            db.query(IdempotencyKey).filter(
+                IdempotencyKey.user_id == user_id,
+                IdempotencyKey.expires_at <= _now()
+            ).delete(synchronize_session=False)
+            db.add(IdempotencyKey(
+                user_id=user_id,
+                key=key,
+                fingerprint=fingerprint,
+                expires_at=_now() + self.ttl
+            ))
+            try:
+                db.commit()
+                return None
+            except IntegrityError:
+                db.rollback()
+
+            row = db.query(IdempotencyKey).filter(
+                IdempotencyKey.user_id == user_id,
+                IdempotencyKey.key == key
+            ).first()
+            if row is None:
+                # Released between our insert and select; treat as in flight
+                return StoredResponse(fingerprint, _now())
+            return StoredResponse(
+                fingerprint=row.fingerprint,
+                expires_at=row.expires_at,
+                status_code=row.status_code,
+                headers=[tuple(h) for h in json.loads(row.headers or "[]")],
+                body=row.body or b"",
+            )
+        finally:
+            db.close()
+
+    def save(self, user_id: int, key: str, response: StoredResponse) -> None:
+        db = SessionLocal()
+        try:
+            db.query(IdempotencyKey).filter(
+                IdempotencyKey.user_id == user_id,
+                IdempotencyKey.key == key
+            ).update({
+                IdempotencyKey.status_code: response.status_code,
+                IdempotencyKey.headers: json.dumps(response.headers),
+                IdempotencyKey.body: response.body,
+            }, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def release(self, user_id: int, key: str) -> None:
+        db = SessionLocal()
+        try:
+            db.query(IdempotencyKey).filter(
+                IdempotencyKey.user_id == user_id,
+                IdempotencyKey.key == key
+            ).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+
+def make_store():
+    if settings.IDEMPOTENCY_BACKEND == "database":
+        return DatabaseIdempotencyStore(settings.IDEMPOTENCY_TTL_SECONDS)
+    if settings.IDEMPOTENCY_BACKEND == "memory":
+        return MemoryIdempotencyStore(settings.IDEMPOTENCY_MAX_ENTRIES, settings.IDEMPOTENCY_TTL_SECONDS)
+    raise ValueError(f"Unknown IDEMPOTENCY_BACKEND: {settings.IDEMPOTENCY_BACKEND!r}")
+
+
+class IdempotencyMiddleware:
+    """ASGI middleware replaying stored responses for repeated Idempotency-Keys."""
+
+    def __init__(self, app, store=None):
+        self.app = app
+        self.store = store or make_store()
+
+    async def _store_call(self, method, *args):
+        if self.store.blocking:
+            return await run_in_threadpool(untimed, method, *args)
+        return method(*args)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST":
+            return await self.app(scope, receive, send)
+
+        headers = Headers(scope=scope)
+        key = headers.get("idempotency-key")
+        if not key:
+            return await self.app(scope, receive, send)
+        user_id = token_user_id(headers.get("authorization"))
+        if user_id is None:
+            # Unauthenticated requests are left to the route's own auth checks
+            return await self.app(scope, receive, send)
+        if len(key) > MAX_KEY_LENGTH:
+            response = JSONResponse({"detail": "Idempotency-Key too long"}, status_code=400)
+            return await response(scope, receive, send)
+
+        # Buffer the body: it is part of the fingerprint and replayed below
+        chunks = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunks.append(message.get("body", b""))
+            more_body = message.get("more_body", False)
+        body = b"".join(chunks)
+
+        fingerprint = hashlib.sha256(
+            b"\0".join([scope["method"].encode(), scope["path"].encode(), scope.get("query_string", b""), body])
+        ).hexdigest()
+
+        stored = await self._store_call(self.store.claim, user_id, key, fingerprint)
+        if stored is not None:
+            if stored.fingerprint != fingerprint:
+                response = JSONResponse(
+                    {"detail": "Idempotency-Key was already used for a different request"},
+                    status_code=422
+                )
+            elif stored.status_code is None:
+                response = JSONResponse(
+                    {"detail": "A request with this Idempotency-Key is still in progress"},
+                    status_code=409
+                )
+            else:
+                return await self._replay(stored, send)
+            return await response(scope, receive, send)
+
+        body_sent = False
+
+        async def replay_receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        captured = StoredResponse(fingerprint, _now() + timedelta(seconds=settings.IDEMPOTENCY_TTL_SECONDS))
+        response_chunks = []
+
+        async def capture_send(message):
+            if message["type"] == "http.response.start":
+                captured.status_code = message["status"]
+                captured.headers = [(k.decode("latin-1"), v.decode("latin-1")) for k, v in message.get("headers", [])]
+            elif message["type"] == "http.response.body":
+                response_chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, replay_receive, capture_send)
+        except BaseException:
+            await self._store_call(self.store.release, user_id, key)
+            raise
+
+        if captured.status_code is not None and captured.status_code < 500:
+            captured.body = b"".join(response_chunks)
+            await self._store_call(self.store.save, user_id, key, captured)
+        else:
+            # Server errors are not final; let the client retry for real
+            await self._store_call(self.store.release, user_id, key)
+
+    async def _replay(self, stored: StoredResponse, send):
+        headers = [(k.encode("latin-1"), v.encode("latin-1")) for k, v in stored.headers]
+        headers.append((b"idempotent-replayed", b"true"))
+        await send({"type": "http.response.start", "status": stored.status_code, "headers": headers})
+        await send({"type": "http.response.body", "body": stored.body})
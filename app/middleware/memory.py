@@ -0,0 +1,167 @@
+"""
+Allocation tracking with tracemalloc.
+
+Tracing is started and stopped from the admin endpoints (or at startup with
+``MEMORY_TRACE_ON_STARTUP``); while it runs, snapshots can be taken and
+compared to find the allocation sites that grow between them.
+
+While tracing, `AllocationMiddleware` measures the peak traced memory of a
+``MEMORY_SAMPLE_RATE`` fraction of requests. The tracemalloc peak is global
+to the process, so only one request is measured at a time. When tracing is
+off the middleware costs a single ``is_tracing()`` check.
+"""
+
+import itertools
+import os
+import random
+import threading
+import tracemalloc
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from app.config import settings
+from app.services.metrics import REGISTRY, SIZE_BUCKETS, route_label
+
+PEAK_BUCKETS = SIZE_BUCKETS[1:] + (16777216, 67108864, 268435456)
+
+REQUEST_PEAK_ALLOCATION = REGISTRY.histogram(
+    "athlos_http_request_peak_allocated_bytes",
+    "Peak memory allocated while serving a sampled request (tracemalloc).",
+    labels=("route",),
+    buckets=PEAK_BUCKETS,
+)
+
+# Allocations made by tracemalloc itself and the import machinery are noise
+SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+GROUP_BY = ("lineno", "filename", "traceback")
+
+
+def _stat(stat) -> dict:
+    return {
+        "site": [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+        "size": stat.size,
+        "count": stat.count,
+    }
+
+
+def _diff(stat) -> dict:
+    return {**_stat(stat), "size_diff": stat.size_diff, "count_diff": stat.count_diff}
+
+
+class SnapshotStore:
+    """The last few snapshots, by id."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._snapshots: OrderedDict = OrderedDict()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def take(self) -> tuple[int, tracemalloc.Snapshot]:
+        snapshot = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+        with self._lock:
+            snapshot_id = next(self._ids)
+            self._snapshots[snapshot_id] = (datetime.now(timezone.utc).isoformat(), snapshot)
+            while len(self._snapshots) > self.size:
+                self._snapshots.popitem(last=False)
+        return snapshot_id, snapshot
+
+    def get(self, snapshot_id: int) -> tracemalloc.Snapshot | None:
+        with self._lock:
+            entry = self._snapshots.get(snapshot_id)
+        return entry[1] if entry is not None else None
+
+    def summaries(self) -> list:
+        with self._lock:
+            items = list(self._snapshots.items())
+        return [
+            {"id": snapshot_id, "at": at, "traces": len(snapshot.traces)}
+            for snapshot_id, (at, snapshot) in items
+        ]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._snapshots.clear()
+
+
+snapshots = SnapshotStore(settings.MEMORY_SNAPSHOTS_KEPT)
+
+
+def top(snapshot: tracemalloc.Snapshot, group_by: str, limit: int) -> list:
+    return [_stat(stat) for stat in snapshot.statistics(group_by)[:limit]]
+
+
+def growth(old: tracemalloc.Snapshot, new: tracemalloc.Snapshot, group_by: str, limit: int) -> list:
+    """Allocation sites ordered by how much they grew from ``old`` to ``new``."""
+    return [_diff(stat) for stat in new.compare_to(old, group_by)[:limit]]
+
+
+def traced_memory() -> dict:
+    current, peak = tracemalloc.get_traced_memory()
+    return {
+        "tracing": tracemalloc.is_tracing(),
+        "frames": tracemalloc.get_traceback_limit(),
+        "current_bytes": current,
+        "peak_bytes": peak,
+        "overhead_bytes": tracemalloc.get_tracemalloc_memory(),
+    }
+
+
+def resident_memory() -> int | None:
+    """Resident set size of this process in bytes, where /proc is available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+@REGISTRY.collector
+def _memory_metrics():
+    rss = resident_memory()
+    if rss is not None:
+        yield "# HELP athlos_process_resident_memory_bytes Resident set size of the worker."
+        yield "# TYPE athlos_process_resident_memory_bytes gauge"
+        yield f"athlos_process_resident_memory_bytes {rss}"
+    if tracemalloc.is_tracing():
+        current, _ = tracemalloc.get_traced_memory()
+        yield "# HELP athlos_tracemalloc_traced_bytes Memory currently traced by tracemalloc."
+        yield "# TYPE athlos_tracemalloc_traced_bytes gauge"
+        yield f"athlos_tracemalloc_traced_bytes {current}"
+
+
+class AllocationMiddleware:
+    """ASGI middleware recording the peak allocation of sampled requests."""
+
+    def __init__(self, app):
+        self.app = app
+        self._busy = threading.Lock()
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or not tracemalloc.is_tracing()
+            or random.random() >= settings.MEMORY_SAMPLE_RATE
+            or not self._busy.acquire(blocking=False)
+        ):
+            return await self.app(scope, receive, send)
+
+        try:
+            tracemalloc.reset_peak()
+            baseline, _ = tracemalloc.get_traced_memory()
+            await self.app(scope, receive, send)
+        finally:
+            if tracemalloc.is_tracing():
+                _, peak = tracemalloc.get_traced_memory()
+                REQUEST_PEAK_ALLOCATION.observe(route_label(scope), value=max(peak - baseline, 0))
+            self._busy.release()
+
+
+if settings.MEMORY_TRACE_ON_STARTUP and not tracemalloc.is_tracing():
+    tracemalloc.start(settings.MEMORY_TRACE_FRAMES)
@@ -0,0 +1,186 @@
+"""
+On-demand sampling profiler for live requests.
+
+A request is profiled when an admin sends ``X-Profile: 1`` (with
+``PROFILER_HEADER_ENABLED``) or when it is picked by ``PROFILER_SAMPLE_RATE``.
+While it runs, a sampler thread records the stacks of every busy thread in
+the worker every ``PROFILER_INTERVAL_MS``. That covers the event loop as well
+as the threadpool running sync endpoints, which cProfile (per-thread) would
+miss. Concurrent requests on the same worker show up in the samples too, so
+only one request is profiled at a time.
+
+Profiles are kept as collapsed stacks (``frame;frame;frame count``), which
+flamegraph.pl and speedscope read directly, in a ring buffer served by the
+admin endpoints. The middleware is only installed when one of the triggers is
+enabled, so there is no overhead otherwise.
+"""
+
+import itertools
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime, timezone
+
+from fastapi.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.config import settings
+from app.db import SessionLocal
+from app.models.user import User
+from app.routers.auth import token_user_id
+from app.services.metrics import route_label
+
+# Innermost frames in these modules mean the thread is parked, not working
+IDLE_MODULES = ("threading.py", "queue.py", "selectors.py")
+
+
+def is_admin(user_id: int | None) -> bool:
+    if user_id is None or not settings.admin_emails:
+        return False
+    db = SessionLocal()
+    try:
+        email = db.query(User.email).filter(User.id == user_id).scalar()
+        return email is not None and email.lower() in settings.admin_emails
+    finally:
+        db.close()
+
+
+def _label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _collapse(frame) -> str:
+    labels = []
+    while frame is not None:
+        labels.append(_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class Sampler(threading.Thread):
+    """Collects stacks of busy threads until stopped."""
+
+    def __init__(self, interval: float):
+        super().__init__(name="athlos-profiler", daemon=True)
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        own = threading.get_ident()
+        while not self._stop_event.wait(self.interval):
+            self.samples += 1
+            for ident, frame in sys._current_frames().items():
+                if ident == own or os.path.basename(frame.f_code.co_filename) in IDLE_MODULES:
+                    continue
+                self.stacks[_collapse(frame)] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+class ProfileStore:
+    """Ring buffer of finished profiles."""
+
+    def __init__(self, size: int):
+        self.profiles = deque(maxlen=size)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def add(self, **profile) -> int:
+        with self._lock:
+            profile["id"] = next(self._ids)
+            self.profiles.append(profile)
+            return profile["id"]
+
+    def summaries(self) -> list:
+        with self._lock:
+            profiles = list(reversed(self.profiles))
+        return [{k: v for k, v in p.items() if k != "stacks"} for p in profiles]
+
+    def get(self, profile_id: int) -> dict | None:
+        with self._lock:
+            return next((p for p in self.profiles if p["id"] == profile_id), None)
+
+    def collapsed(self, route: str | None = None) -> str:
+        """Collapsed stacks of all stored profiles, optionally of one route, merged."""
+        merged = Counter()
+        with self._lock:
+            for profile in self.profiles:
+                if route is None or profile["route"] == route:
+                    merged.update(profile["stacks"])
+        return format_collapsed(merged)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.profiles.clear()
+
+
+def format_collapsed(stacks: Counter) -> str:
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+profiles = ProfileStore(settings.PROFILER_BUFFER_SIZE)
+
+
+def profiler_enabled() -> bool:
+    return settings.PROFILER_HEADER_ENABLED or settings.PROFILER_SAMPLE_RATE > 0
+
+
+class ProfilerMiddleware:
+    """ASGI middleware profiling selected requests with `Sampler`."""
+
+    def __init__(self, app):
+        self.app = app
+        self._busy = threading.Lock()
+
+    async def _wanted(self, scope) -> bool:
+        if settings.PROFILER_SAMPLE_RATE > 0 and random.random() < settings.PROFILER_SAMPLE_RATE:
+            return True
+        if settings.PROFILER_HEADER_ENABLED:
+            headers = Headers(scope=scope)
+            if headers.get("x-profile") == "1":
+                return await run_in_threadpool(is_admin, token_user_id(headers.get("authorization")))
+        return False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not await self._wanted(scope):
+            return await self.app(scope, receive, send)
+        if not self._busy.acquire(blocking=False):
+            return await self.app(scope, receive, send)
+
+        sampler = Sampler(settings.PROFILER_INTERVAL_MS / 1000)
+        profile_id = None
+        started = time.perf_counter()
+
+        async def profiled_send(message):
+            nonlocal profile_id
+            if message["type"] == "http.response.start":
+                # Stop at the response head so the id can be returned with it
+                sampler.stop()
+                profile_id = profiles.add(
+                    at=datetime.now(timezone.utc).isoformat(),
+                    method=scope["method"],
+                    route=route_label(scope),
+                    path=scope["path"],
+                    status=message["status"],
+                    duration_ms=round((time.perf_counter() - started) * 1000, 3),
+                    samples=sampler.samples,
+                    stacks=sampler.stacks,
+                )
+                MutableHeaders(scope=message).append("X-Profile-Id", str(profile_id))
+            await send(message)
+
+        sampler.start()
+        try:
+            await self.app(scope, receive, profiled_send)
+        finally:
+            if profile_id is None:
+                sampler.stop()
+            self._busy.release()
@@ -0,0 +1,244 @@
+"""
+Token-bucket rate limiting, applied before routing.
+
+``RATE_LIMITS`` holds ";"-separated rules of the form
+``METHOD PATH scope=N/SECONDS ...``: each request to a matching route takes
+one token from a bucket that holds N tokens and refills at N per SECONDS.
+PATH may end in ``*`` to match a prefix, and METHOD may be ``*``; the first
+matching rule applies. Scopes are:
+
+- ``ip``: the client address (the first ``X-Forwarded-For`` entry when
+  ``RATE_LIMIT_TRUST_FORWARDED`` is on);
+- ``account``: the ``email`` of a JSON request body (login, register), or
+  else the user id of the request's token.
+
+A request over any of its limits gets 429 with ``Retry-After`` before any
+database query or password hash runs. Buckets live in per-worker LRU shards
+bounded by ``RATE_LIMIT_MAX_KEYS``; set ``RATE_LIMIT_BACKEND=redis`` (with
+the optional ``redis`` package) to share them between workers. An evicted
+bucket starts over full, so eviction only ever errs on the lenient side.
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+
+import orjson
+from fastapi.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+
+from app.config import settings
+from app.middleware.timing import untimed
+from app.routers.auth import token_user_id
+from app.services.metrics import REGISTRY
+
+try:
+    import redis
+except ImportError:  # optional dependency
+    redis = None
+
+SCOPES = ("ip", "account")
+SHARDS = 16
+# Bodies larger than this are passed on without looking for an email
+MAX_ACCOUNT_BODY_BYTES = 16 * 1024
+
+RATE_LIMITED = REGISTRY.counter(
+    "athlos_rate_limited_total",
+    "Requests rejected by the rate limiter.",
+    labels=("rule", "scope"),
+)
+
+
+class Limit:
+    def __init__(self, scope: str, capacity: int, period_seconds: float):
+        self.scope = scope
+        self.capacity = capacity
+        self.rate = capacity / period_seconds  # tokens per second
+
+
+class Rule:
+    def __init__(self, method: str, path: str, limits: list):
+        self.method = method
+        self.path = path
+        self.limits = limits
+        self.name = f"{method} {path}"
+        self.needs_account = any(limit.scope == "account" for limit in limits)
+
+    @classmethod
+    def parse(cls, entry: str) -> "Rule":
+        method, path, *limits = entry.split()
+        parsed = []
+        for limit in limits:
+            scope, _, value = limit.partition("=")
+            capacity, _, period = value.partition("/")
+            if scope not in SCOPES:
+                raise ValueError(f"Unknown rate limit scope {scope!r} in {entry!r}")
+            parsed.append(Limit(scope, int(capacity), float(period)))
+        return cls(method.upper(), path, parsed)
+
+    def matches(self, method: str, path: str) -> bool:
+        if self.method not in ("*", method):
+            return False
+        if self.path.endswith("*"):
+            return path.startswith(self.path[:-1])
+        return path == self.path
+
+
+def parse_rules(spec: str) -> list:
+    return [Rule.parse(entry) for entry in spec.split(";") if entry.strip()]
+
+
+class MemoryBuckets:
+    """Token buckets in LRU shards, each with its own lock."""
+
+    blocking = False
+
+    def __init__(self, max_keys: int, shards: int = SHARDS):
+        self.max_per_shard = max(max_keys // shards, 1)
+        self._shards = [(OrderedDict(), threading.Lock()) for _ in range(shards)]
+
+    def take(self, key: str, capacity: int, rate: float) -> float:
+        """Take a token; returns 0 if one was available, else seconds until one is."""
+        entries, lock = self._shards[hash(key) % len(self._shards)]
+        now = time.monotonic()
+        with lock:
+            entry = entries.get(key)
+            if entry is None:
+                tokens = capacity
+            else:
+                tokens = min(capacity, entry[0] + (now - entry[1]) * rate)
+                entries.move_to_end(key)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate
+            entries[key] = (tokens, now)
+            while len(entries) > self.max_per_shard:
+                entries.popitem(last=False)
+        return wait
+
+
+class RedisBuckets:
+    """Token buckets in a Redis-compatible server, updated atomically by a script."""
+
+    blocking = True
+
+    SCRIPT = """
+    local capacity, rate, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(now - ts, 0) * rate)
+    local wait = 0
+    if tokens >= 1 then tokens = tokens - 1 else wait = (1 - tokens) / rate end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+    return tostring(wait)
+    """
+
+    def __init__(self, url: str):
+        if redis is None:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requires the 'redis' package")
+        self.client = redis.Redis.from_url(url)
+        self._take = self.client.register_script(self.SCRIPT)
+
+    def take(self, key: str, capacity: int, rate: float) -> float:
+        return float(self._take(keys=[f"athlos:rl:{key}"], args=[capacity, rate, time.time()]))
+
+
+def make_buckets():
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        return RedisBuckets(settings.RATE_LIMIT_REDIS_URL)
+    if settings.RATE_LIMIT_BACKEND == "memory":
+        return MemoryBuckets(settings.RATE_LIMIT_MAX_KEYS)
+    raise ValueError(f"Unknown RATE_LIMIT_BACKEND: {settings.RATE_LIMIT_BACKEND!r}")
+
+
+def _body_email(body: bytes) -> str | None:
+    if len(body) > MAX_ACCOUNT_BODY_BYTES:
+        return None
+    try:
+        data = orjson.loads(body)
+    except orjson.JSONDecodeError:
+        return None
+    email = data.get("email") if isinstance(data, dict) else None
+    return email.strip().lower() if isinstance(email, str) else None
+
+
+class RateLimitMiddleware:
+    """ASGI middleware rejecting requests over their route's token-bucket limits."""
+
+    def __init__(self, app, rules=None, buckets=None):
+        self.app = app
+        self.rules = parse_rules(settings.RATE_LIMITS) if rules is None else rules
+        self.buckets = buckets or make_buckets()
+
+    def _client_ip(self, scope, headers: Headers) -> str | None:
+        if settings.RATE_LIMIT_TRUST_FORWARDED:
+            forwarded = headers.get("x-forwarded-for")
+            if forwarded:
+                return forwarded.split(",")[0].strip()
+        client = scope.get("client")
+        return client[0] if client else None
+
+    async def _take(self, key: str, limit: Limit) -> float:
+        if self.buckets.blocking:
+            return await run_in_threadpool(untimed, self.buckets.take, key, limit.capacity, limit.rate)
+        return self.buckets.take(key, limit.capacity, limit.rate)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        rule = next((r for r in self.rules if r.matches(scope["method"], scope["path"])), None)
+        if rule is None:
+            return await self.app(scope, receive, send)
+
+        headers = Headers(scope=scope)
+        account = None
+        if rule.needs_account:
+            if scope["method"] in ("POST", "PUT", "PATCH"):
+                # Buffer the body to find the email; it is replayed below
+                chunks = []
+                more_body = True
+                while more_body:
+                    message = await receive()
+                    if message["type"] == "http.disconnect":
+                        return
+                    chunks.append(message.get("body", b""))
+                    more_body = message.get("more_body", False)
+                body = b"".join(chunks)
+                account = _body_email(body)
+
+                body_sent = False
+                downstream_receive = receive
+
+                async def replay_receive():
+                    nonlocal body_sent
+                    if not body_sent:
+                        body_sent = True
+                        return {"type": "http.request", "body": body, "more_body": False}
+                    return await downstream_receive()
+
+                receive = replay_receive
+            if account is None:
+                user_id = token_user_id(headers.get("authorization"))
+                account = f"user:{user_id}" if user_id is not None else None
+
+        for limit in rule.limits:
+            value = self._client_ip(scope, headers) if limit.scope == "ip" else account
+            if value is None:
+                continue
+            wait = await self._take(f"{rule.name}|{limit.scope}|{value}", limit)
+            if wait:
+                RATE_LIMITED.inc(rule.name, limit.scope)
+                response = JSONResponse(
+                    {"detail": "Too many requests"},
+                    status_code=429,
+                    headers={"Retry-After": str(math.ceil(wait))},
+                )
+                return await response(scope, receive, send)
+
+        await self.app(scope, receive, send)
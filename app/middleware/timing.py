@@ -0,0 +1,153 @@
+"""
+Request timing and SQL instrumentation.
+
+`TimingMiddleware` records per-route latency, response size and the number
+of SQL statements and database time spent on each request into the metrics
+registry served at ``GET /metrics``, and reports the same numbers to the
+client in a ``Server-Timing`` header.
+
+Statements are counted by engine events installed with `instrument_engine`;
+the current request's counters are found through a context variable, which
+is inherited by the threadpool that runs sync endpoints. The same events
+feed the slow-query log and enforce per-route query budgets.
+"""
+
+import threading
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+
+from app.config import settings
+from app.services.metrics import COUNT_BUCKETS, REGISTRY, SIZE_BUCKETS, route_label
+from app.services.query_budget import check_request, check_statement
+from app.services.slow_queries import slow_query_log
+
+REQUEST_DURATION = REGISTRY.histogram(
+    "athlos_http_request_duration_seconds",
+    "Time from receiving a request to sending the last body chunk.",
+    labels=("method", "route", "status"),
+)
+REQUEST_DB_STATEMENTS = REGISTRY.histogram(
+    "athlos_http_request_db_statements",
+    "SQL statements executed per request.",
+    labels=("route",),
+    buckets=COUNT_BUCKETS,
+)
+REQUEST_DB_SECONDS = REGISTRY.histogram(
+    "athlos_http_request_db_seconds",
+    "Time spent executing SQL per request.",
+    labels=("route",),
+)
+RESPONSE_SIZE = REGISTRY.histogram(
+    "athlos_http_response_size_bytes",
+    "Response body size as sent to the client.",
+    labels=("route",),
+    buckets=SIZE_BUCKETS,
+)
+
+
+class RequestTimings:
+    """SQL counters of one request; shared by every thread working on it."""
+
+    def __init__(self, scope=None):
+        self.scope = scope
+        self.statements = 0
+        self.db_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def add_statement(self, seconds: float) -> None:
+        with self._lock:
+            self.statements += 1
+            self.db_seconds += seconds
+
+    @property
+    def route(self) -> str:
+        return route_label(self.scope) if self.scope is not None else "unmatched"
+
+
+current_timings: ContextVar[RequestTimings | None] = ContextVar("current_timings", default=None)
+
+
+def untimed(fn, *args):
+    """
+    Call ``fn`` without charging its SQL to the current request, for
+    middleware bookkeeping that is not part of the route's work. Meant to run
+    in the threadpool, whose copied context keeps the reset local.
+    """
+    token = current_timings.set(None)
+    try:
+        return fn(*args)
+    finally:
+        current_timings.reset(token)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    timings = current_timings.get()
+    if timings is not None and timings.scope is not None:
+        check_statement(timings.scope, timings.statements)
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    timings = current_timings.get()
+    if timings is not None:
+        timings.add_statement(elapsed)
+    if elapsed * 1000 >= settings.SLOW_QUERY_THRESHOLD_MS:
+        route = timings.route if timings is not None else "background"
+        slow_query_log.record(conn, route, statement, parameters, executemany, elapsed)
+
+
+def instrument_engine(engine) -> None:
+    """Count statements and time executed on ``engine`` against the current request."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def server_timing(total_seconds: float, timings: RequestTimings) -> str:
+    return (
+        f"app;dur={total_seconds * 1000:.1f}, "
+        f'db;dur={timings.db_seconds * 1000:.1f};desc="{timings.statements} queries"'
+    )
+
+
+class TimingMiddleware:
+    """ASGI middleware recording request metrics and adding ``Server-Timing``."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        timings = RequestTimings(scope)
+        token = current_timings.set(timings)
+        started = time.perf_counter()
+        status = 500
+        size = 0
+
+        async def timing_send(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if settings.SERVER_TIMING_ENABLED:
+                    headers = MutableHeaders(scope=message)
+                    headers.append("Server-Timing", server_timing(time.perf_counter() - started, timings))
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, timing_send)
+        finally:
+            current_timings.reset(token)
+            check_request(scope, timings.statements)
+            route = route_label(scope)
+            REQUEST_DURATION.observe(scope["method"], route, str(status), value=time.perf_counter() - started)
+            REQUEST_DB_STATEMENTS.observe(route, value=timings.statements)
+            REQUEST_DB_SECONDS.observe(route, value=timings.db_seconds)
+            RESPONSE_SIZE.observe(route, value=size)
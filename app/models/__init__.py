@@ -5,4 +5,9 @@ from .plan_item import PlanItem
 from .workout_log import WorkoutLog
 from .weight_log import WeightLog
 from .goal import Goal
-from .workout_session import WorkoutSession
\ No newline at end of file
+from .workout_session import WorkoutSession
+from .tombstone import Tombstone
+from .idempotency_key import IdempotencyKey
+from .refresh_token import RefreshToken
+from .revoked_token import RevokedToken
+from .log_archive import LogArchive
\ No newline at end of file
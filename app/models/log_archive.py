@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, Date, DateTime, LargeBinary, UniqueConstraint
+from sqlalchemy.sql import func
+from app.db import Base
+
+class LogArchive(Base):
+    """One month of a user's archived workout or weight logs (see app.services.archive)."""
+    __tablename__ = "log_archives"
+    __table_args__ = (
+        UniqueConstraint("user_id", "entity", "month", name="uq_log_archives_user_id_entity_month"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+
+    entity = Column(String(50), nullable=False)  # table the rows came from
+    month = Column(Date, nullable=False)  # first day of the month the rows' log_date falls in
+    row_count = Column(Integer, nullable=False)
+    # The rows as gzipped newline-delimited JSON, without user_id
+    data = Column(LargeBinary, nullable=False)
+    archived_at = Column(DateTime, nullable=False, server_default=func.now())
@@ -1,9 +1,13 @@
-from sqlalchemy import Column, Integer, ForeignKey, Text
+from sqlalchemy import Column, Integer, ForeignKey, Text, DateTime, Index
 from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
 from app.db import Base
 
 class PlanItem(Base):
     __tablename__ = "plan_items"
+    __table_args__ = (
+        Index("ix_plan_items_plan_id_updated_at", "plan_id", "updated_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     plan_id = Column(Integer, ForeignKey("workout_plans.id", ondelete="CASCADE"), nullable=False)
@@ -15,6 +19,7 @@ class PlanItem(Base):
     distance_meters = Column(Integer, nullable=True)
     order_index = Column(Integer, nullable=True)
     notes = Column(Text, nullable=True)
+    updated_at = Column(DateTime, nullable=False, server_default=func.now(), onupdate=func.now())
 
     plan = relationship("WorkoutPlan", back_populates="items")
     exercise = relationship("Exercise")
\ No newline at end of file
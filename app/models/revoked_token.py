@@ -0,0 +1,11 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from app.db import Base
+
+class RevokedToken(Base):
+    __tablename__ = "revoked_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    # jti of a revoked access token, or the session id of a revoked login
+    jti = Column(String(32), nullable=False, unique=True)
+    # Once every access token it could match has expired the row is pruned
+    expires_at = Column(DateTime, nullable=False, index=True)
@@ -0,0 +1,56 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Index, event
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+from app.db import Base
+
+# Tables whose deletions are recorded so clients can sync them away
+TRACKED_TABLES = {"workout_plans", "plan_items", "workout_logs", "weight_logs", "goals"}
+# A tombstone for this entity invalidates everything the user's clients
+# synced before it (their rows were moved to another shard with new ids)
+RESYNC_ENTITY = "users"
+
+class Tombstone(Base):
+    __tablename__ = "tombstones"
+    __table_args__ = (
+        Index("ix_tombstones_user_id_deleted_at", "user_id", "deleted_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+
+    entity = Column(String(50), nullable=False)  # table name of the deleted row
+    entity_id = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime, nullable=False, server_default=func.now())
+
+
+@event.listens_for(Session, "before_flush")
+def record_tombstones(session, flush_context, instances):
+    """
+    Collect a tombstone for every tracked row deleted through the ORM,
+    including rows removed by relationship cascades (e.g. plan items of a
+    deleted plan). They are written by `write_tombstones` after the flush.
+    """
+    deleted_users = {obj.id for obj in session.deleted if obj.__tablename__ == "users"}
+
+    # Reset per flush so rows collected by a flush that failed are dropped
+    pending = session.info["pending_tombstones"] = []
+    with session.no_autoflush:
+        for obj in list(session.deleted):
+            if obj.__tablename__ not in TRACKED_TABLES:
+                continue
+            user_id = obj.user_id if hasattr(obj, "user_id") else obj.plan.user_id
+            if user_id in deleted_users:
+                continue
+            pending.append({"user_id": user_id, "entity": obj.__tablename__, "entity_id": obj.id})
+
+
+@event.listens_for(Session, "after_flush")
+def write_tombstones(session, flush_context):
+    """
+    Insert the collected tombstones with one executemany. Added as ORM objects
+    they would each need their generated columns returned, which costs one
+    INSERT per row on some backends.
+    """
+    pending = session.info.pop("pending_tombstones", None)
+    if pending:
+        session.execute(Tombstone.__table__.insert(), pending)
@@ -11,6 +11,8 @@ class User(Base):
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String, unique=True, index=True, nullable=False)
     password_hash = Column(String, nullable=False)
+    # Shard holding the user's data (app.services.sharding); NULL is "main"
+    shard = Column(String(50), nullable=True)
 
     plans = relationship("WorkoutPlan", back_populates="user", cascade="all, delete-orphan")
     workout_logs = relationship("WorkoutLog", back_populates="user", cascade="all, delete-orphan")
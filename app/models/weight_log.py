@@ -1,14 +1,22 @@
-from sqlalchemy import Column, Integer, Float, ForeignKey, Date
+from sqlalchemy import Column, Integer, Float, ForeignKey, Date, DateTime, Index
 from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
 from app.db import Base
 
 class WeightLog(Base):
     __tablename__ = "weight_logs"
+    __table_args__ = (
+        Index("ix_weight_logs_user_id_updated_at", "user_id", "updated_at"),
+    )
 
+    # On PostgreSQL the table is partitioned by month on log_date and its
+    # primary key is (id, log_date); ids still come from one sequence, so
+    # id alone identifies a row (see app.services.partitions)
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
 
     log_date = Column(Date, nullable=False)
     weight = Column(Float, nullable=False)
+    updated_at = Column(DateTime, nullable=False, server_default=func.now(), onupdate=func.now())
 
     user = relationship("User", back_populates="weight_logs")
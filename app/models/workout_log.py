@@ -1,10 +1,18 @@
-from sqlalchemy import Column, Integer, ForeignKey, Text, Date
+from sqlalchemy import Column, Integer, ForeignKey, Text, Date, DateTime, Index
 from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
 from app.db import Base
 
 class WorkoutLog(Base):
     __tablename__ = "workout_logs"
+    __table_args__ = (
+        Index("ix_workout_logs_user_id_log_date", "user_id", "log_date"),
+        Index("ix_workout_logs_user_id_updated_at", "user_id", "updated_at"),
+    )
 
+    # On PostgreSQL the table is partitioned by month on log_date and its
+    # primary key is (id, log_date); ids still come from one sequence, so
+    # id alone identifies a row (see app.services.partitions)
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     plan_id = Column(Integer, ForeignKey("workout_plans.id", ondelete="SET NULL"), nullable=True)
@@ -12,5 +20,15 @@ class WorkoutLog(Base):
     log_date = Column(Date, nullable=False)
     notes = Column(Text, nullable=True)
 
+    # Work actually performed, recorded when a log covers a single exercise
+    exercise_id = Column(Integer, ForeignKey("exercises.id", ondelete="SET NULL"), nullable=True)
+    sets = Column(Integer, nullable=True)
+    reps = Column(Integer, nullable=True)
+    duration_seconds = Column(Integer, nullable=True)
+    distance_meters = Column(Integer, nullable=True)
+
+    updated_at = Column(DateTime, nullable=False, server_default=func.now(), onupdate=func.now())
+
     user = relationship("User", back_populates="workout_logs")
-    plan = relationship("WorkoutPlan")
\ No newline at end of file
+    plan = relationship("WorkoutPlan")
+    exercise = relationship("Exercise")
\ No newline at end of file
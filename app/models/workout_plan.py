@@ -1,9 +1,13 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, ForeignKey, Text, DateTime, Index
 from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
 from app.db import Base
 
 class WorkoutPlan(Base):
     __tablename__ = "workout_plans"
+    __table_args__ = (
+        Index("ix_workout_plans_user_id_updated_at", "user_id", "updated_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
@@ -12,6 +16,7 @@ class WorkoutPlan(Base):
     goal_text = Column(Text, nullable=True)
     frequency_per_week = Column(Integer, nullable=False)
     session_duration_minutes = Column(Integer, nullable=False)
+    updated_at = Column(DateTime, nullable=False, server_default=func.now(), onupdate=func.now())
 
     user = relationship("User", back_populates="plans")
     items = relationship("PlanItem", back_populates="plan", cascade="all, delete-orphan")
\ No newline at end of file
@@ -0,0 +1,269 @@
+"""
+Operational endpoints for administrators.
+
+Every route requires a user listed in the ``ADMIN_EMAILS`` setting.
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from app.config import settings
+from app.middleware import memory
+from app.middleware.profiler import format_collapsed, profiler_enabled, profiles
+from app.routers.auth import get_admin_user
+from app.services.query_budget import query_budget
+from app.services.slow_queries import slow_query_log
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["Admin"],
+    dependencies=[Depends(get_admin_user)],
+    responses={403: {"description": "Admin access required"}},
+)
+
+
+@router.get(
+    "/slow-queries",
+    summary="Recent slow queries",
+    description="Statements slower than `SLOW_QUERY_THRESHOLD_MS`, newest first, with the route that "
+                "issued them, normalised SQL, parameter types and duration. When `SLOW_QUERY_EXPLAIN` "
+                "is on, the first occurrence of each normalised SELECT carries its query plan.",
+    responses={
+        200: {
+            "description": "Slow query log",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "threshold_ms": 200,
+                        "explain": True,
+                        "queries": [
+                            {
+                                "at": "2025-09-01T12:00:00.000000+00:00",
+                                "route": "/tracking/workouts",
+                                "statement": "SELECT workout_logs.id, ... FROM workout_logs "
+                                             "WHERE workout_logs.user_id = ? ORDER BY workout_logs.log_date DESC",
+                                "parameters": {"user_id_1": "int"},
+                                "duration_ms": 412.7,
+                                "plan": "Seq Scan on workout_logs  (cost=0.00..1834.00 rows=96 width=52) ..."
+                            }
+                        ]
+                    }
+                }
+            }
+        }
+    }
+)
+@query_budget(1)
+def list_slow_queries():
+    return {
+        "threshold_ms": settings.SLOW_QUERY_THRESHOLD_MS,
+        "explain": settings.SLOW_QUERY_EXPLAIN,
+        "queries": slow_query_log.snapshot(),
+    }
+
+
+@router.delete(
+    "/slow-queries",
+    status_code=204,
+    summary="Clear the slow query log",
+    description="Empty the ring buffer and forget which statements were explained, so the next "
+                "occurrence of each is explained again."
+)
+@query_budget(1)
+def clear_slow_queries():
+    slow_query_log.clear()
+
+
+@router.get(
+    "/profiles",
+    summary="Recent request profiles",
+    description="Requests profiled by the sampling profiler, newest first. Send `X-Profile: 1` as an admin "
+                "(with `PROFILER_HEADER_ENABLED`) or set `PROFILER_SAMPLE_RATE` to collect them; the "
+                "`X-Profile-Id` response header names the stored profile.",
+    responses={
+        200: {
+            "description": "Profile summaries",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "enabled": True,
+                        "profiles": [
+                            {
+                                "id": 7,
+                                "at": "2025-09-01T12:00:00.000000+00:00",
+                                "method": "GET",
+                                "route": "/tracking/workouts",
+                                "path": "/tracking/workouts",
+                                "status": 200,
+                                "duration_ms": 184.2,
+                                "samples": 36
+                            }
+                        ]
+                    }
+                }
+            }
+        }
+    }
+)
+@query_budget(1)
+def list_profiles():
+    return {"enabled": profiler_enabled(), "profiles": profiles.summaries()}
+
+
+@router.get(
+    "/profiles/collapsed",
+    response_class=PlainTextResponse,
+    summary="Merged collapsed stacks",
+    description="Collapsed stacks of every stored profile, or only those of `route` (a path template such "
+                "as `/plans/{plan_id}`), merged into one flamegraph-ready text file."
+)
+@query_budget(1)
+def merged_profile(route: str | None = Query(None)):
+    return PlainTextResponse(profiles.collapsed(route))
+
+
+@router.get(
+    "/profiles/{profile_id}",
+    response_class=PlainTextResponse,
+    summary="Collapsed stacks of one profile",
+    description="One `frame;frame;frame count` line per distinct stack, for flamegraph.pl or speedscope."
+)
+@query_budget(1)
+def get_profile(profile_id: int):
+    profile = profiles.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(format_collapsed(profile["stacks"]))
+
+
+@router.delete(
+    "/profiles",
+    status_code=204,
+    summary="Clear stored profiles"
+)
+@query_budget(1)
+def clear_profiles():
+    profiles.clear()
+
+
+@router.get(
+    "/memory",
+    summary="Memory usage and tracing state",
+    description="Worker RSS, whether tracemalloc is tracing, traced and peak bytes, and stored snapshots."
+)
+@query_budget(1)
+def memory_status():
+    return {
+        "resident_bytes": memory.resident_memory(),
+        **memory.traced_memory(),
+        "snapshots": memory.snapshots.summaries(),
+    }
+
+
+@router.post(
+    "/memory/start",
+    summary="Start tracing allocations",
+    description="Start tracemalloc, keeping `frames` stack frames per allocation. Tracing slows the worker "
+                "down and uses extra memory; stop it when done."
+)
+@query_budget(1)
+def start_tracing(frames: int = Query(None, ge=1, le=100)):
+    if memory.tracemalloc.is_tracing():
+        raise HTTPException(status_code=409, detail="Already tracing")
+    memory.tracemalloc.start(frames or settings.MEMORY_TRACE_FRAMES)
+    return memory.traced_memory()
+
+
+@router.post(
+    "/memory/stop",
+    summary="Stop tracing allocations",
+    description="Stop tracemalloc and free its traces. Stored snapshots are kept."
+)
+@query_budget(1)
+def stop_tracing():
+    memory.tracemalloc.stop()
+    return memory.traced_memory()
+
+
+@router.post(
+    "/memory/snapshots",
+    status_code=201,
+    summary="Take a snapshot",
+    description="Store a snapshot of traced allocations and return its top allocation sites. Only the last "
+                "`MEMORY_SNAPSHOTS_KEPT` snapshots are kept.",
+    responses={409: {"description": "Not tracing"}}
+)
+@query_budget(1)
+def take_snapshot(
+    group_by: str = Query("lineno", enum=list(memory.GROUP_BY)),
+    limit: int = Query(25, ge=1, le=500)
+):
+    if not memory.tracemalloc.is_tracing():
+        raise HTTPException(status_code=409, detail="Not tracing; POST /admin/memory/start first")
+    snapshot_id, snapshot = memory.snapshots.take()
+    return {"id": snapshot_id, "top": memory.top(snapshot, group_by, limit)}
+
+
+@router.get(
+    "/memory/snapshots/{snapshot_id}",
+    summary="Top allocation sites of a snapshot"
+)
+@query_budget(1)
+def get_snapshot(
+    snapshot_id: int,
+    group_by: str = Query("lineno", enum=list(memory.GROUP_BY)),
+    limit: int = Query(25, ge=1, le=500)
+):
+    snapshot = memory.snapshots.get(snapshot_id)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    return {"id": snapshot_id, "top": memory.top(snapshot, group_by, limit)}
+
+
+@router.get(
+    "/memory/diff",
+    summary="Allocation growth between snapshots",
+    description="Allocation sites ordered by growth from snapshot `from` to snapshot `to`. Without `to` the "
+                "comparison is against the current state (requires tracing).",
+    responses={
+        200: {
+            "description": "Top growth",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "from": 1,
+                        "to": 2,
+                        "growth": [
+                            {
+                                "site": ["/app/app/routers/tracking.py:97"],
+                                "size": 18350080,
+                                "count": 120004,
+                                "size_diff": 9175040,
+                                "count_diff": 60002
+                            }
+                        ]
+                    }
+                }
+            }
+        }
+    }
+)
+@query_budget(1)
+def diff_snapshots(
+    from_id: int = Query(..., alias="from"),
+    to_id: int | None = Query(None, alias="to"),
+    group_by: str = Query("lineno", enum=list(memory.GROUP_BY)),
+    limit: int = Query(25, ge=1, le=500)
+):
+    old = memory.snapshots.get(from_id)
+    if old is None:
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    if to_id is None:
+        if not memory.tracemalloc.is_tracing():
+            raise HTTPException(status_code=409, detail="Not tracing; pass `to` to compare stored snapshots")
+        to_id, new = memory.snapshots.take()
+    else:
+        new = memory.snapshots.get(to_id)
+        if new is None:
+            raise HTTPException(status_code=404, detail="Snapshot not found")
+    return {"from": from_id, "to": to_id, "growth": memory.growth(old, new, group_by, limit)}
@@ -2,22 +2,35 @@
 Authentication endpoints for the Athlos API.
 
 - **Register** a new user
-- **Login** with email + password to get a JWT
+- **Login** with email + password to get a JWT and a refresh token
+- **Refresh** an expiring JWT without logging in again
+- **Logout** to revoke the login's tokens
 - **Get current user** details with a valid JWT
 
 Use the `Authorization: Bearer <token>` header for protected endpoints.
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import APIKeyHeader
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta, timezone
+import hashlib
+import secrets
 import jwt
 
-from app.db import SessionLocal
+from app.db import SessionLocal, bind_to_shard, shard_map
 from app.models.user import User
-from app.schemas.user import UserCreate, UserLogin, UserOut
+from app.models.refresh_token import RefreshToken
+from app.schemas.user import UserCreate, UserLogin, UserOut, TokenOut, RefreshRequest
 from app.config import settings
+from app.services.deadline import DeadlineExceeded, apply_deadline, is_timeout
+from app.services.metrics import REGISTRY
+from app.services.query_budget import query_budget
+from app.services.rebalance import create_user_stub, delete_user
+from app.services.revocation import revocation_list
+from app.services.sharding import MAIN, is_moving
+from app.services.tokens import keyring, sign_token, verify_token
 
 # Router setup
 router = APIRouter(
@@ -29,21 +42,99 @@ router = APIRouter(
 # Extract JWT from the Authorization header
 oauth2_scheme = APIKeyHeader(name="Authorization")
 
-def get_db():
+TOKEN_REFRESHES = REGISTRY.counter(
+    "athlos_auth_refreshes_total",
+    "Refresh token presentations by outcome (rotated, reused, invalid).",
+    labels=("outcome",),
+)
+
+def get_db(request: Request):
     db = SessionLocal()
     try:
+        apply_deadline(db, request.scope)
         yield db
+    except OperationalError as exc:
+        if is_timeout(exc):
+            raise DeadlineExceeded() from exc
+        raise
     finally:
         db.close()
 
-def create_access_token(data: dict, expires_minutes: int = 60):
+def _now() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def create_access_token(data: dict, expires_minutes: int | None = None):
     """
-    Create a signed JWT token with an expiry time (default 60 minutes).
+    Create a signed JWT token with an expiry time (default ACCESS_TOKEN_MINUTES).
     """
     to_encode = data.copy()
-    expire = datetime.now(timezone.utc) + timedelta(minutes=expires_minutes)
+    expire = datetime.now(timezone.utc) + timedelta(minutes=expires_minutes or settings.ACCESS_TOKEN_MINUTES)
     to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, settings.JWT_SECRET, algorithm="HS256")
+    return sign_token(to_encode)
+
+
+def decode_access_token(token: str) -> dict:
+    """
+    Verify a token issued by `create_access_token` and return its claims.
+    Raises `jwt.PyJWTError` if the token is invalid, expired or revoked.
+    """
+    claims = verify_token(token)
+    if revocation_list.is_revoked(claims):
+        raise jwt.InvalidTokenError("Token has been revoked")
+    return claims
+
+
+def _hash_refresh_token(token: str) -> str:
+    # Refresh tokens are 256 random bits, so a fast hash is enough
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def issue_tokens(db: Session, user_id: int, session_id: str | None = None) -> dict:
+    """
+    Store a new refresh token for the login ``session_id`` (a new login when
+    None), commit, and return it with a fresh access token.
+    """
+    session_id = session_id or secrets.token_hex(16)
+    refresh_token = secrets.token_urlsafe(32)
+    db.add(RefreshToken(
+        user_id=user_id,
+        token_hash=_hash_refresh_token(refresh_token),
+        session_id=session_id,
+        expires_at=_now() + timedelta(days=settings.REFRESH_TOKEN_DAYS),
+    ))
+    db.commit()
+    access_token = create_access_token({"sub": str(user_id), "sid": session_id, "jti": secrets.token_hex(16)})
+    return {
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "token_type": "bearer",
+        "expires_in": settings.ACCESS_TOKEN_MINUTES * 60,
+    }
+
+
+def revoke_session(db: Session, session_id: str) -> None:
+    """Revoke every refresh and access token of a login, and commit."""
+    now = _now()
+    db.query(RefreshToken).filter(
+        RefreshToken.session_id == session_id, RefreshToken.revoked_at.is_(None)
+    ).update({RefreshToken.revoked_at: now}, synchronize_session=False)
+    # Access tokens of the session issued up to now expire by then
+    revocation_list.revoke(db, [session_id], now + timedelta(minutes=settings.ACCESS_TOKEN_MINUTES))
+
+
+def token_user_id(token: str | None) -> int | None:
+    """
+    User id from an Authorization header value, or None if it is not a valid
+    token. Used by middleware that runs before route-level auth.
+    """
+    if not token:
+        return None
+    try:
+        sub = decode_access_token(token).get("sub")
+        return int(sub) if sub is not None else None
+    except (jwt.PyJWTError, ValueError):
+        return None
 
 
 @router.post(
@@ -52,6 +143,7 @@ def create_access_token(data: dict, expires_minutes: int = 60):
     summary="Register a new user",
     description="Create a new user account with email and password. Passwords are hashed using bcrypt."
 )
+@query_budget(6)  # 3, plus placing the user on a shard other than main
 def register(user: UserCreate, db: Session = Depends(get_db)):
     """
     Example request:
@@ -84,7 +176,23 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
     )
 
     db.add(new_user)
-    db.commit()
+    db.flush()
+    shard = shard_map.place(new_user.id)
+    if shard != MAIN:
+        new_user.shard = shard
+        # The stub goes in while the main row is uncommitted: a failed insert
+        # rolls the user back instead of leaving them placed on a shard
+        # without one, and a failed commit takes the stub out again
+        engine = shard_map.engine_for(shard)
+        with engine.begin() as connection:
+            create_user_stub(connection, new_user.id, new_user.email)
+        try:
+            db.commit()
+        except Exception:
+            delete_user(engine, new_user.id, shard)
+            raise
+    else:
+        db.commit()
     db.refresh(new_user)
 
     return new_user
@@ -92,9 +200,12 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
 
 @router.post(
     "/login",
+    response_model=TokenOut,
     summary="Authenticate user and get a JWT",
-    description="Authenticate using email and password. Returns a JWT token."
+    description="Authenticate using email and password. Returns a short-lived JWT and a refresh token "
+                "for `POST /auth/refresh`."
 )
+@query_budget(2)
 def login(user: UserLogin, db: Session = Depends(get_db)):
     """
     Example request:
@@ -109,7 +220,9 @@ def login(user: UserLogin, db: Session = Depends(get_db)):
     ```
     {
       "access_token": "jwt_string_here",
-      "token_type": "bearer"
+      "refresh_token": "opaque_string_here",
+      "token_type": "bearer",
+      "expires_in": 900
     }
     ```
 
@@ -123,16 +236,47 @@ def login(user: UserLogin, db: Session = Depends(get_db)):
     if not db_user or not db_user.verify_password(user.password):
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
-    token = create_access_token({"sub": str(db_user.id)})
-    return {"access_token": token, "token_type": "bearer"}
+    return issue_tokens(db, db_user.id)
+
+
+@router.post(
+    "/refresh",
+    response_model=TokenOut,
+    summary="Exchange a refresh token for new tokens",
+    description="Return a new JWT and a new refresh token; the one presented is used up. Presenting a "
+                "refresh token that was already used revokes the whole login, since it has leaked.",
+    responses={401: {"description": "Invalid, expired, revoked or reused refresh token"}}
+)
+@query_budget(5)
+def refresh(data: RefreshRequest, db: Session = Depends(get_db)):
+    now = _now()
+    token = db.query(RefreshToken).filter(
+        RefreshToken.token_hash == _hash_refresh_token(data.refresh_token)
+    ).first()
+    if not token or token.revoked_at is not None or token.expires_at <= now:
+        TOKEN_REFRESHES.inc("invalid")
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
 
+    # Conditional update, so of two concurrent refreshes only one wins
+    rotated = db.query(RefreshToken).filter(
+        RefreshToken.id == token.id, RefreshToken.used_at.is_(None)
+    ).update({RefreshToken.used_at: now}, synchronize_session=False)
+    if not rotated:
+        TOKEN_REFRESHES.inc("reused")
+        revoke_session(db, token.session_id)
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    TOKEN_REFRESHES.inc("rotated")
+    return issue_tokens(db, token.user_id, token.session_id)
+
+
+def get_current_user(request: Request, token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
     """
     Dependency to extract and validate the current user from a JWT token.
+    Binds the request's database session to the user's shard.
     """
     try:
-        payload = jwt.decode(token, settings.JWT_SECRET, algorithms=["HS256"])
+        payload = decode_access_token(token)
         user_id: str = payload.get("sub")
         if user_id is None:
             raise HTTPException(status_code=401, detail="Invalid token")
@@ -142,16 +286,52 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     user = db.query(User).filter(User.id == int(user_id)).first()
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
+    if is_moving(user.shard):
+        raise HTTPException(
+            status_code=503,
+            detail="Account data is being moved, try again shortly",
+            headers={"Retry-After": "5"},
+        )
+    bind_to_shard(request, user.shard)
 
     return user
 
 
+def get_admin_user(current_user: User = Depends(get_current_user)):
+    """
+    Dependency for operational endpoints: the current user must be listed in
+    the ``ADMIN_EMAILS`` setting.
+    """
+    if current_user.email.lower() not in settings.admin_emails:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return current_user
+
+
+@router.post(
+    "/logout",
+    status_code=status.HTTP_204_NO_CONTENT,
+    summary="Log out",
+    description="Revoke the refresh token and every JWT of the current login."
+)
+@query_budget(4)
+def logout(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    # Tokens issued before refresh tokens existed have no session; they just expire
+    session_id = decode_access_token(token).get("sid")
+    if session_id:
+        revoke_session(db, session_id)
+
+
 @router.get(
     "/me",
     response_model=UserOut,
     summary="Get current user info",
     description="Return details of the currently authenticated user."
 )
+@query_budget(1)
 def read_users_me(current_user: User = Depends(get_current_user)):
     """
     Example response:
@@ -169,3 +349,14 @@ def read_users_me(current_user: User = Depends(get_current_user)):
     ```
     """
     return current_user
+
+
+@router.get(
+    "/jwks.json",
+    summary="Token verification keys",
+    description="Public keys (JWK Set) of the ES256/EdDSA keys in the key ring, for services that verify "
+                "Athlos tokens themselves. Shared-secret (HS256) keys are never published."
+)
+@query_budget(0)
+def read_jwks():
+    return keyring.jwks()
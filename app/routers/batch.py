@@ -0,0 +1,224 @@
+"""
+Batch endpoint for the plans and tracking routes.
+
+Sub-operations are dispatched to the regular endpoint functions, so they
+share all validation and business rules, but they run with a single
+authenticated user on a session joined to one outer transaction. The
+handlers' own ``commit()`` calls only release savepoints; the batch is
+committed once at the end, or rolled back entirely if any operation fails.
+"""
+
+import inspect
+
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.params import Depends as DependsParam, Query as QueryParam
+from fastapi.responses import JSONResponse, Response
+from fastapi.routing import APIRoute
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from pydantic.errors import PydanticSchemaGenerationError
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.db import get_db, shard_map
+from app.schemas.batch import BatchRequest, BatchOut
+from app.services.cache import NAMESPACES, response_cache
+from app.services.deadline import DeadlineExceeded, apply_deadline, is_timeout
+from app.services.replicas import mark_write
+from app.services.query_budget import budget_of, extend_query_budget, query_budget
+from app.routers import plans, tracking
+from app.routers.auth import get_current_user
+from app.models.user import User
+
+router = APIRouter(
+    prefix="/batch",
+    tags=["Batch"]
+)
+
+# Endpoints that may be called from a batch
+BATCHABLE_ROUTES = [
+    route for route in plans.router.routes + tracking.router.routes
+    if isinstance(route, APIRoute)
+]
+
+
+def _begin(connection):
+    """
+    Start the batch's outer transaction.
+
+    pysqlite defers BEGIN until the first write, which breaks SAVEPOINT
+    semantics, so on SQLite the transaction is started explicitly.
+    """
+    if connection.dialect.name != "sqlite":
+        return connection.begin()
+    connection.execution_options(isolation_level="AUTOCOMMIT")
+    transaction = connection.begin()
+    connection.exec_driver_sql("BEGIN")
+    return transaction
+
+
+def _match(method: str, path: str):
+    """Find the route handling ``method path`` and its converted path params."""
+    for route in BATCHABLE_ROUTES:
+        if method not in route.methods:
+            continue
+        match = route.path_regex.match(path)
+        if match:
+            params = {
+                name: route.param_convertors[name].convert(value)
+                for name, value in match.groupdict().items()
+            }
+            return route, params
+    raise HTTPException(status_code=404, detail=f"No batchable endpoint for {method} {path}")
+
+
+def _missing_query(key: str) -> HTTPException:
+    # Same error body FastAPI returns for a missing query parameter
+    return HTTPException(
+        status_code=422,
+        detail=[{"type": "missing", "loc": ["query", key], "msg": "Field required", "input": None}],
+    )
+
+
+def _call(route: APIRoute, path_params: dict, op, db: Session, current_user: User):
+    """Build the endpoint's arguments from the operation and invoke it."""
+    kwargs = {}
+    for name, param in inspect.signature(route.endpoint).parameters.items():
+        default = param.default
+        if isinstance(default, DependsParam):
+            if default.dependency is get_db:
+                kwargs[name] = db
+            elif default.dependency is get_current_user:
+                kwargs[name] = current_user
+            else:
+                raise HTTPException(status_code=400, detail=f"{route.path} cannot be batched")
+        elif name in path_params:
+            kwargs[name] = path_params[name]
+        elif inspect.isclass(param.annotation) and issubclass(param.annotation, BaseModel):
+            kwargs[name] = param.annotation.model_validate(op.body or {})
+        elif isinstance(default, QueryParam):
+            key = default.alias or name
+            if key not in op.query and default.is_required():
+                raise _missing_query(key)
+            value = op.query.get(key, default.default)
+            kwargs[name] = TypeAdapter(param.annotation).validate_python(value) if value is not None else None
+        else:
+            # FastAPI reads other parameters from the query string, except
+            # those it injects itself (Request, BackgroundTasks, ...)
+            try:
+                adapter = TypeAdapter(param.annotation)
+            except PydanticSchemaGenerationError:
+                raise HTTPException(status_code=400, detail=f"{route.path} cannot be batched")
+            if name in op.query:
+                kwargs[name] = adapter.validate_python(op.query[name])
+            elif default is not inspect.Parameter.empty:
+                kwargs[name] = default
+            else:
+                raise _missing_query(name)
+
+    result = route.endpoint(**kwargs)
+
+    if isinstance(result, Response):
+        # Fast-path endpoints serialise their own output
+        return orjson.loads(result.body)
+    if route.response_model is None or result is None:
+        return result
+    adapter = TypeAdapter(route.response_model)
+    return adapter.dump_python(adapter.validate_python(result, from_attributes=True), mode="json")
+
+
+@router.post(
+    "",
+    response_model=BatchOut,
+    summary="Execute several plan and tracking operations atomically",
+    description="Run an ordered list of `/plans` and `/tracking` operations in one database transaction. "
+                "Either every operation is applied or none is; on failure the response carries the failing "
+                "operation's status code and the results up to and including it.",
+    responses={
+        200: {
+            "description": "All operations applied",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "committed": True,
+                        "results": [
+                            {
+                                "status": 200,
+                                "body": {
+                                    "id": 7,
+                                    "exercise_id": 3,
+                                    "sets": 3,
+                                    "reps": 12,
+                                    "duration_seconds": None,
+                                    "distance_meters": None,
+                                    "order_index": 1,
+                                    "notes": None
+                                }
+                            },
+                            {"status": 204, "body": None}
+                        ]
+                    }
+                }
+            }
+        },
+        400: {"description": "Too many operations or operation not batchable"},
+        404: {"description": "An operation's endpoint or resource was not found; nothing applied"},
+        422: {"description": "An operation's body failed validation; nothing applied"}
+    }
+)
+@query_budget(2)
+def run_batch(
+    batch: BatchRequest,
+    request: Request,
+    current_user: User = Depends(get_current_user)
+):
+    if len(batch.operations) > settings.BATCH_MAX_OPERATIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.BATCH_MAX_OPERATIONS} operations per batch"
+        )
+
+    results = []
+    with shard_map.engine_for(current_user.shard).connect() as connection:
+        transaction = _begin(connection)
+        db = Session(bind=connection, autoflush=False, join_transaction_mode="create_savepoint")
+        try:
+            # Bounds the outer transaction, so the whole batch shares one deadline
+            apply_deadline(db, request.scope)
+            for op in batch.operations:
+                try:
+                    route, path_params = _match(op.method, op.path)
+                    # The operation's own budget, plus a RELEASE/SAVEPOINT pair
+                    # for each of up to two commits, minus the user lookup it
+                    # does not repeat
+                    extend_query_budget(request, (budget_of(route.endpoint) or 0) + 3)
+                    body = _call(route, path_params, op, db, current_user)
+                    results.append({"status": route.status_code or 200, "body": body})
+                except (HTTPException, ValidationError) as exc:
+                    if isinstance(exc, ValidationError):
+                        failure = {"status": 422, "body": {"detail": exc.errors(include_url=False)}}
+                    else:
+                        failure = {"status": exc.status_code, "body": {"detail": exc.detail}}
+                    results.append(failure)
+                    transaction.rollback()
+                    return JSONResponse(
+                        status_code=failure["status"],
+                        content=BatchOut(committed=False, results=results).model_dump(mode="json")
+                    )
+            transaction.commit()
+            mark_write(current_user.id)
+        except Exception as exc:
+            if transaction.is_active:
+                transaction.rollback()
+            if isinstance(exc, OperationalError) and is_timeout(exc):
+                raise DeadlineExceeded() from exc
+            raise
+        finally:
+            db.close()
+            # Handlers bumped cache versions before the outer transaction
+            # ended, and reads inside the batch may have cached uncommitted
+            # rows; bump again so none of that survives commit or rollback
+            response_cache.bump(current_user.id, *NAMESPACES)
+
+    return {"committed": True, "results": results}
@@ -1,8 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException
+import time
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
+from app.config import settings
 from app.db import get_db
 from app.models.exercise import Exercise
 from app.schemas.exercise import ExerciseOut
+from app.middleware.compression import PrecompressedPayload
+from app.responses import schema_columns
+from app.services.query_budget import query_budget
+from app.services.replicas import replica_reads
 from typing import List
 
 router = APIRouter(
@@ -10,6 +17,20 @@ router = APIRouter(
     tags=["Exercises"]
 )
 
+# The catalog only changes when it is re-seeded, so its serialised and
+# compressed forms are cached for EXERCISE_CATALOG_TTL_SECONDS.
+_catalog: PrecompressedPayload | None = None
+_catalog_expires_at = 0.0
+
+
+def _catalog_payload(db: Session) -> PrecompressedPayload:
+    global _catalog, _catalog_expires_at
+    if _catalog is None or time.monotonic() >= _catalog_expires_at:
+        rows = db.query(*schema_columns(Exercise, ExerciseOut)).order_by(Exercise.id).all()
+        _catalog = PrecompressedPayload(orjson.dumps([row._asdict() for row in rows]), label="/exercises/")
+        _catalog_expires_at = time.monotonic() + settings.EXERCISE_CATALOG_TTL_SECONDS
+    return _catalog
+
 @router.get(
     "/",
     response_model=List[ExerciseOut],
@@ -45,8 +66,10 @@ router = APIRouter(
         }
     }
 )
-def list_exercises(db: Session = Depends(get_db)):
-    return db.query(Exercise).all()
+@query_budget(1)
+@replica_reads
+def list_exercises(request: Request, db: Session = Depends(get_db)):
+    return _catalog_payload(db).response(request.headers.get("accept-encoding"))
 
 @router.get(
     "/{exercise_id}",
@@ -73,6 +96,8 @@ def list_exercises(db: Session = Depends(get_db)):
         404: {"description": "Exercise not found"}
     }
 )
+@query_budget(1)
+@replica_reads
 def get_exercise(exercise_id: int, db: Session = Depends(get_db)):
     exercise = db.query(Exercise).filter(Exercise.id == exercise_id).first()
     if not exercise:
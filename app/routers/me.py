@@ -0,0 +1,202 @@
+"""
+Composite endpoints for the current user.
+
+The dashboard bundles everything the client needs on launch into a single
+request. Its queries are independent, so each runs on its own session in the
+threadpool and they are awaited together. Each of those sessions holds a pool
+connection, so at most ``DASHBOARD_QUERY_CONCURRENCY`` run at once per worker
+across all dashboard requests, and the session that loaded the user is closed
+before they start.
+"""
+
+import asyncio
+import weakref
+from datetime import date
+
+from fastapi import APIRouter, Depends
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func, or_, and_
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.db import SessionLocal, shard_map
+from app.models.workout_plan import WorkoutPlan
+from app.models.plan_item import PlanItem
+from app.models.exercise import Exercise
+from app.models.workout_session import WorkoutSession
+from app.models.weight_log import WeightLog
+from app.models.goal import Goal
+from app.schemas.dashboard import DashboardOut
+from app.schemas.workout_mode import WorkoutSessionOut, WorkoutSessionItem
+from app.services.query_budget import query_budget
+from app.routers.auth import get_current_user, get_db as get_auth_db
+from app.models.user import User
+
+router = APIRouter(
+    prefix="/me",
+    tags=["Dashboard"]
+)
+
+
+# One semaphore per event loop (a worker has one; asyncio primitives cannot
+# be shared between loops)
+_slots_by_loop = weakref.WeakKeyDictionary()
+
+
+def _query_slots() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    slots = _slots_by_loop.get(loop)
+    if slots is None:
+        slots = _slots_by_loop[loop] = asyncio.Semaphore(settings.DASHBOARD_QUERY_CONCURRENCY)
+    return slots
+
+
+async def _run(query, user: User):
+    """Run ``query(db, user.id)`` in the threadpool on a dedicated session on the user's shard."""
+    def call():
+        db = SessionLocal(bind=shard_map.engine_for(user.shard))
+        try:
+            return query(db, user.id)
+        finally:
+            db.close()
+    async with _query_slots():
+        return await run_in_threadpool(call)
+
+
+def _plans_with_counts(db, user_id):
+    rows = (
+        db.query(WorkoutPlan, func.count(PlanItem.id))
+        .outerjoin(PlanItem, PlanItem.plan_id == WorkoutPlan.id)
+        .filter(WorkoutPlan.user_id == user_id)
+        .group_by(WorkoutPlan.id)
+        .order_by(WorkoutPlan.id)
+        .all()
+    )
+    return [
+        {
+            "id": plan.id,
+            "title": plan.title,
+            "goal_text": plan.goal_text,
+            "frequency_per_week": plan.frequency_per_week,
+            "session_duration_minutes": plan.session_duration_minutes,
+            "item_count": item_count,
+        }
+        for plan, item_count in rows
+    ]
+
+
+def _active_session(db, user_id):
+    row = (
+        db.query(WorkoutSession, WorkoutPlan.title, PlanItem, Exercise.name)
+        .join(WorkoutPlan, WorkoutPlan.id == WorkoutSession.plan_id)
+        .outerjoin(PlanItem, and_(
+            PlanItem.plan_id == WorkoutSession.plan_id,
+            PlanItem.order_index == WorkoutSession.current_index
+        ))
+        .outerjoin(Exercise, Exercise.id == PlanItem.exercise_id)
+        .filter(WorkoutSession.user_id == user_id, WorkoutSession.ended_at.is_(None))
+        .order_by(WorkoutSession.started_at.desc())
+        .first()
+    )
+    if not row:
+        return None
+
+    session, title, item, exercise_name = row
+    return WorkoutSessionOut(
+        id=session.id,
+        plan_id=session.plan_id,
+        title=title,
+        started_at=session.started_at,
+        ended_at=None,
+        current_index=session.current_index,
+        current_exercise=WorkoutSessionItem(
+            id=item.id,
+            order_index=item.order_index,
+            exercise_name=exercise_name,
+            sets=item.sets,
+            reps=item.reps,
+            duration_seconds=item.duration_seconds,
+            distance_meters=item.distance_meters,
+            notes=item.notes
+        ) if item else None
+    )
+
+
+def _latest_weight(db, user_id):
+    return (
+        db.query(WeightLog)
+        .filter(WeightLog.user_id == user_id)
+        .order_by(WeightLog.log_date.desc(), WeightLog.id.desc())
+        .first()
+    )
+
+
+def _open_goals(db, user_id):
+    return (
+        db.query(Goal)
+        .filter(Goal.user_id == user_id, or_(Goal.deadline.is_(None), Goal.deadline >= date.today()))
+        .all()
+    )
+
+
+@router.get(
+    "/dashboard",
+    response_model=DashboardOut,
+    summary="Home screen data in one request",
+    description="Return the current user, their plans with item counts, the active workout session (if any), "
+                "the latest weight entry and goals whose deadline has not passed.",
+    responses={
+        200: {
+            "description": "Dashboard data",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "user": {"id": 1, "email": "newuser@example.com"},
+                        "plans": [
+                            {
+                                "id": 1,
+                                "title": "Strength Training Plan",
+                                "goal_text": "Build muscle mass",
+                                "frequency_per_week": 3,
+                                "session_duration_minutes": 60,
+                                "item_count": 5
+                            }
+                        ],
+                        "active_session": None,
+                        "latest_weight": {"id": 3, "user_id": 1, "log_date": "2025-10-02", "weight": 72.5},
+                        "open_goals": [
+                            {
+                                "id": 1,
+                                "user_id": 1,
+                                "type": "weight",
+                                "target_value": 70.0,
+                                "deadline": "2025-12-31",
+                                "exercise_id": None
+                            }
+                        ]
+                    }
+                }
+            }
+        }
+    }
+)
+@query_budget(5)
+async def get_dashboard(
+    current_user: User = Depends(get_current_user),
+    auth_db: Session = Depends(get_auth_db)
+):
+    # Give back the user lookup's connection; the user's columns stay loaded
+    auth_db.close()
+    plans, active_session, latest_weight, open_goals = await asyncio.gather(
+        _run(_plans_with_counts, current_user),
+        _run(_active_session, current_user),
+        _run(_latest_weight, current_user),
+        _run(_open_goals, current_user),
+    )
+    return {
+        "user": current_user,
+        "plans": plans,
+        "active_session": active_session,
+        "latest_weight": latest_weight,
+        "open_goals": open_goals,
+    }
@@ -0,0 +1,120 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from app.config import settings
+from app.middleware import compression
+from app.services.cache import response_cache
+from app.services.metrics import REGISTRY, format_labels
+from app.services.query_budget import query_budget
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+router = APIRouter(
+    prefix="/metrics",
+    tags=["Metrics"]
+)
+
+
+@REGISTRY.collector
+def _compression_metrics():
+    snapshot = compression.stats.snapshot()
+    families = (
+        ("athlos_compression_responses_total", "Responses compressed.", "responses"),
+        ("athlos_compression_bytes_in_total", "Bytes before compression.", "bytes_in"),
+        ("athlos_compression_bytes_out_total", "Bytes after compression.", "bytes_out"),
+        ("athlos_compression_cpu_seconds_total", "CPU seconds spent compressing.", "cpu_seconds"),
+    )
+    for name, help, field in families:
+        yield f"# HELP {name} {help}"
+        yield f"# TYPE {name} counter"
+        for row in snapshot:
+            yield f"{name}{format_labels(('route', 'encoding'), (row['route'], row['encoding']))} {row[field]}"
+
+
+@REGISTRY.collector
+def _cache_metrics():
+    snapshot = response_cache.snapshot()
+    for name, field in (("athlos_cache_hits_total", "hits"), ("athlos_cache_misses_total", "misses")):
+        yield f"# HELP {name} Response cache {field} per endpoint."
+        yield f"# TYPE {name} counter"
+        for row in snapshot:
+            yield f"{name}{format_labels(('endpoint',), (row['endpoint'],))} {row[field]}"
+
+
+@router.get(
+    "",
+    summary="Prometheus metrics",
+    description="Per-route request latency, SQL statements and database time per request, response sizes, "
+                "compression and response cache counters in the Prometheus text exposition format. "
+                "Values are per worker and reset on restart.",
+    response_class=Response,
+    responses={200: {"content": {PROMETHEUS_CONTENT_TYPE: {}}}}
+)
+@query_budget(0)
+def prometheus_metrics():
+    return Response(REGISTRY.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@router.get(
+    "/compression",
+    summary="Response compression statistics",
+    description="Per-route totals of compressed responses: bytes before and after, compression ratio "
+                "and CPU seconds spent compressing, since the worker started.",
+    responses={
+        200: {
+            "description": "Compression statistics",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "brotli_available": False,
+                        "routes": [
+                            {
+                                "route": "/tracking/workouts",
+                                "encoding": "gzip",
+                                "responses": 42,
+                                "bytes_in": 1894211,
+                                "bytes_out": 201346,
+                                "ratio": 9.408,
+                                "cpu_seconds": 0.081234
+                            }
+                        ]
+                    }
+                }
+            }
+        }
+    }
+)
+@query_budget(0)
+def compression_stats():
+    return {
+        "brotli_available": compression.brotli is not None,
+        "routes": compression.stats.snapshot(),
+    }
+
+
+@router.get(
+    "/cache",
+    summary="Response cache statistics",
+    description="Per-endpoint hits and misses of the per-user response cache since the worker started.",
+    responses={
+        200: {
+            "description": "Cache statistics",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "backend": "memory",
+                        "endpoints": [
+                            {"endpoint": "list_plans", "hits": 120, "misses": 8, "hit_ratio": 0.938}
+                        ]
+                    }
+                }
+            }
+        }
+    }
+)
+@query_budget(0)
+def cache_stats():
+    return {
+        "backend": settings.CACHE_BACKEND,
+        "endpoints": response_cache.snapshot(),
+    }
@@ -1,10 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from typing import List
 
 from app.db import get_db
 from app.models.workout_plan import WorkoutPlan
 from app.models.plan_item import PlanItem
+from app.models.workout_log import WorkoutLog
 from app.models.exercise import Exercise
 from app.schemas.workout_plan import (
     WorkoutPlanCreate,
@@ -14,6 +17,13 @@ from app.schemas.workout_plan import (
     PlanItemUpdate,
     PlanItemOut,
 )
+from app.schemas.volume import PlanVolumeOut
+from app.services.volume import plan_weekly_volume
+from app.responses import schema_columns
+from app.services.cache import cache_response, response_cache
+from app.services.etag import plans_etag, plan_etag
+from app.services.query_budget import query_budget
+from app.services.replicas import replica_reads
 from app.routers.auth import get_current_user
 from app.models.user import User
 
@@ -48,6 +58,7 @@ router = APIRouter(
         }
     }
 )
+@query_budget(4)
 def create_plan(
     plan_in: WorkoutPlanCreate,
     db: Session = Depends(get_db),
@@ -62,6 +73,7 @@ def create_plan(
     )
     db.add(plan)
     db.commit()
+    response_cache.bump(current_user.id, "plans")
     db.refresh(plan)
     return plan
 
@@ -69,6 +81,7 @@ def create_plan(
 @router.get(
     "/",
     response_model=List[WorkoutPlanOut],
+    dependencies=[Depends(plans_etag)],
     summary="List my workout plans",
     description="Retrieve all workout plans belonging to the logged-in user.",
     responses={
@@ -101,16 +114,42 @@ def create_plan(
         }
     }
 )
+@query_budget(4)
+@replica_reads
+@cache_response("plans")
 def list_plans(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    return db.query(WorkoutPlan).filter(WorkoutPlan.user_id == current_user.id).all()
+    plan_fields = [name for name in WorkoutPlanOut.model_fields if name != "items"]
+    plans = (
+        db.query(*(getattr(WorkoutPlan, name) for name in plan_fields))
+        .filter(WorkoutPlan.user_id == current_user.id)
+        .all()
+    )
+
+    # One query for the items of all plans instead of a lazy load per plan
+    items_by_plan = {}
+    items = (
+        db.query(PlanItem.plan_id, *schema_columns(PlanItem, PlanItemOut))
+        .join(WorkoutPlan, PlanItem.plan_id == WorkoutPlan.id)
+        .filter(WorkoutPlan.user_id == current_user.id)
+        .all()
+    )
+    for item in items:
+        item = item._asdict()
+        items_by_plan.setdefault(item.pop("plan_id"), []).append(item)
+
+    return ORJSONResponse([
+        dict(plan._asdict(), items=items_by_plan.get(plan.id, []))
+        for plan in plans
+    ])
 
 
 @router.get(
     "/{plan_id}",
     response_model=WorkoutPlanOut,
+    dependencies=[Depends(plan_etag)],
     summary="Get a workout plan by ID",
     description="Retrieve details of a specific workout plan (must belong to current user).",
     responses={
@@ -142,6 +181,9 @@ def list_plans(
         404: {"description": "Plan not found"}
     }
 )
+@query_budget(4)
+@replica_reads
+@cache_response("plans", schema=WorkoutPlanOut)
 def get_plan(
     plan_id: int,
     db: Session = Depends(get_db),
@@ -157,6 +199,62 @@ def get_plan(
     return plan
 
 
+@router.get(
+    "/{plan_id}/volume",
+    response_model=PlanVolumeOut,
+    summary="Weekly volume per muscle group for a plan",
+    description="Compute the weekly training volume per muscle group prescribed by a plan "
+                "(one pass of the plan multiplied by its frequency per week).",
+    responses={
+        200: {
+            "description": "Weekly volume per muscle group",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "plan_id": 1,
+                        "frequency_per_week": 3,
+                        "muscles": [
+                            {"muscle": "Chest", "sets": 9.0, "reps": 108.0, "duration_seconds": 0.0, "distance_meters": 0.0},
+                            {"muscle": "Triceps", "sets": 9.0, "reps": 108.0, "duration_seconds": 0.0, "distance_meters": 0.0}
+                        ]
+                    }
+                }
+            }
+        },
+        404: {"description": "Plan not found"}
+    }
+)
+@query_budget(4)
+@replica_reads
+@cache_response("plans", schema=PlanVolumeOut)
+def get_plan_volume(
+    plan_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    plan = (
+        db.query(WorkoutPlan.id, WorkoutPlan.frequency_per_week)
+        .filter(WorkoutPlan.id == plan_id, WorkoutPlan.user_id == current_user.id)
+        .first()
+    )
+    if not plan:
+        raise HTTPException(status_code=404, detail="Plan not found")
+
+    rows = db.query(
+        PlanItem.exercise_id,
+        PlanItem.sets,
+        PlanItem.reps,
+        PlanItem.duration_seconds,
+        PlanItem.distance_meters,
+    ).filter(PlanItem.plan_id == plan.id).all()
+
+    return {
+        "plan_id": plan.id,
+        "frequency_per_week": plan.frequency_per_week,
+        "muscles": plan_weekly_volume(db, rows, plan.frequency_per_week),
+    }
+
+
 @router.patch(
     "/{plan_id}",
     response_model=WorkoutPlanOut,
@@ -182,6 +280,7 @@ def get_plan(
         404: {"description": "Plan not found"}
     }
 )
+@query_budget(5)
 def update_plan(
     plan_id: int,
     plan_in: WorkoutPlanUpdate,
@@ -202,6 +301,7 @@ def update_plan(
     plan.session_duration_minutes = plan_in.session_duration_minutes
 
     db.commit()
+    response_cache.bump(current_user.id, "plans")
     db.refresh(plan)
     return plan
 
@@ -216,6 +316,7 @@ def update_plan(
         404: {"description": "Plan not found"}
     }
 )
+@query_budget(7)
 def delete_plan(
     plan_id: int,
     db: Session = Depends(get_db),
@@ -229,8 +330,14 @@ def delete_plan(
     if not plan:
         raise HTTPException(status_code=404, detail="Plan not found")
 
+    # Detach the plan's workout logs here rather than leaving it to ON DELETE
+    # SET NULL, so their updated_at moves and ETags and /sync see the change
+    db.query(WorkoutLog).filter(WorkoutLog.plan_id == plan.id).update(
+        {WorkoutLog.plan_id: None, WorkoutLog.updated_at: func.now()}, synchronize_session=False
+    )
     db.delete(plan)
     db.commit()
+    response_cache.bump(current_user.id, "plans", "workouts")
     return None
 
 
@@ -262,6 +369,7 @@ def delete_plan(
         404: {"description": "Plan or exercise not found"}
     }
 )
+@query_budget(7)
 def add_item(
     plan_id: int,
     item_in: PlanItemCreate,
@@ -303,6 +411,7 @@ def add_item(
     )
     db.add(item)
     db.commit()
+    response_cache.bump(current_user.id, "plans")
     db.refresh(item)
     return item
 
@@ -333,6 +442,7 @@ def add_item(
         404: {"description": "Plan or item not found"}
     }
 )
+@query_budget(6)
 def update_item(
     plan_id: int,
     item_id: int,
@@ -380,6 +490,7 @@ def update_item(
     item.notes = item_in.notes
 
     db.commit()
+    response_cache.bump(current_user.id, "plans")
     db.refresh(item)
     return item
 
@@ -394,6 +505,7 @@ def update_item(
         404: {"description": "Plan or item not found"}
     }
 )
+@query_budget(7)
 def delete_item(
     plan_id: int,
     item_id: int,
@@ -421,5 +533,6 @@ def delete_item(
         PlanItem.order_index > deleted_order
     ).update({PlanItem.order_index: PlanItem.order_index - 1})
     db.commit()
+    response_cache.bump(current_user.id, "plans")
 
     return None
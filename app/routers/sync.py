@@ -0,0 +1,68 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+from datetime import datetime
+
+from app.db import get_db
+from app.schemas.sync import SyncOut
+from app.services.sync import collect_changes
+from app.services.query_budget import query_budget
+from app.routers.auth import get_current_user
+from app.models.user import User
+
+router = APIRouter(
+    prefix="/sync",
+    tags=["Sync"]
+)
+
+@router.get(
+    "",
+    response_model=SyncOut,
+    summary="Fetch changes since a watermark",
+    description="Return plans, plan items, workout logs, weight logs and goals changed after `since`, "
+                "the rows deleted after it, and the new watermark. Omit `since` for a full snapshot. "
+                "Rows near the watermark may be sent twice; clients should upsert by id.",
+    responses={
+        200: {
+            "description": "Changed and deleted rows",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "watermark": "2025-10-05T08:30:12",
+                        "full": False,
+                        "plans": [],
+                        "plan_items": [
+                            {
+                                "id": 4,
+                                "plan_id": 1,
+                                "exercise_id": 2,
+                                "sets": 4,
+                                "reps": 10,
+                                "duration_seconds": None,
+                                "distance_meters": None,
+                                "order_index": 2,
+                                "notes": None,
+                                "updated_at": "2025-10-05T08:29:57"
+                            }
+                        ],
+                        "workout_logs": [],
+                        "weight_logs": [],
+                        "goals": [],
+                        "deleted": [
+                            {"entity": "goals", "id": 3, "deleted_at": "2025-10-05T08:12:40"}
+                        ]
+                    }
+                }
+            }
+        }
+    }
+)
+# One more statement for full snapshots that load archived logs, which
+# includes a delta sync turned full by a resync tombstone
+@query_budget(9)
+def sync(
+    since: Optional[datetime] = Query(None, description="Watermark returned by the previous sync"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    return collect_changes(db, current_user.id, since)
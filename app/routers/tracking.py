@@ -1,16 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from datetime import date
 
 from app.db import get_db
 from app.models.workout_log import WorkoutLog
 from app.models.weight_log import WeightLog
 from app.models.goal import Goal
+from app.models.exercise import Exercise
 from app.schemas.tracking import (
     WorkoutLogCreate, WorkoutLogOut,
     WeightLogCreate, WeightLogOut,
     GoalCreate, GoalUpdate, GoalOut
 )
+from app.schemas.volume import TrackingVolumeOut
+from app.services.volume import RangeTooLong, history_weekly_volume
+from app.services.archive import archived_rows, reaches_archive
+from app.responses import schema_columns, rows_response
+from app.services.cache import cache_response, response_cache
+from app.services.etag import workout_logs_etag, weight_logs_etag, goals_etag
+from app.services.query_budget import query_budget
+from app.services.replicas import replica_reads
 from app.routers.auth import get_current_user
 from app.models.user import User
 
@@ -19,6 +29,20 @@ router = APIRouter(
     tags=["Tracking & Goals"]
 )
 
+
+def check_range(from_date: Optional[date], to_date: Optional[date]) -> None:
+    if from_date and to_date and from_date > to_date:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+
+
+def in_range(query, column, from_date, to_date):
+    if from_date:
+        query = query.filter(column >= from_date)
+    if to_date:
+        query = query.filter(column <= to_date)
+    return query
+
+
 # Workout Logs
 
 @router.post(
@@ -36,26 +60,43 @@ router = APIRouter(
                         "user_id": 1,
                         "plan_id": 2,
                         "log_date": "2025-10-03",
-                        "notes": "Felt strong today, pushed extra reps"
+                        "notes": "Felt strong today, pushed extra reps",
+                        "exercise_id": 3,
+                        "sets": 3,
+                        "reps": 12,
+                        "duration_seconds": None,
+                        "distance_meters": None
                     }
                 }
             }
         }
     }
 )
+@query_budget(4)
 def create_workout_log(
     log_in: WorkoutLogCreate,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
+    if log_in.exercise_id is not None:
+        exercise = db.query(Exercise).filter(Exercise.id == log_in.exercise_id).first()
+        if not exercise:
+            raise HTTPException(status_code=404, detail="Exercise not found")
+
     log = WorkoutLog(
         user_id=current_user.id,
         plan_id=log_in.plan_id,
         log_date =log_in.log_date,
-        notes=log_in.notes
+        notes=log_in.notes,
+        exercise_id=log_in.exercise_id,
+        sets=log_in.sets,
+        reps=log_in.reps,
+        duration_seconds=log_in.duration_seconds,
+        distance_meters=log_in.distance_meters
     )
     db.add(log)
     db.commit()
+    response_cache.bump(current_user.id, "workouts")
     db.refresh(log)
     return log
 
@@ -63,8 +104,10 @@ def create_workout_log(
 @router.get(
     "/workouts",
     response_model=List[WorkoutLogOut],
+    dependencies=[Depends(workout_logs_etag)],
     summary="List my workout logs",
-    description="Retrieve all workout logs for the current user.",
+    description="Retrieve the current user's workout logs, optionally limited to a date range. "
+                "Archived logs in the range are included.",
     responses={
         200: {
             "description": "List of workout logs",
@@ -88,14 +131,26 @@ def create_workout_log(
                     ]
                 }
             }
-        }
+        },
+        400: {"description": "Invalid date range"}
     }
 )
+# One more statement when the range reaches into the archive
+@query_budget(4)
+@replica_reads
+@cache_response("workouts")
 def list_workout_logs(
+    from_date: Optional[date] = Query(None, alias="from", description="First day of the range (inclusive)"),
+    to_date: Optional[date] = Query(None, alias="to", description="Last day of the range (inclusive)"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    return db.query(WorkoutLog).filter(WorkoutLog.user_id == current_user.id).all()
+    check_range(from_date, to_date)
+    archived = []
+    if reaches_archive(from_date):
+        archived = archived_rows(db, current_user.id, "workout_logs", from_date, to_date, WorkoutLogOut.model_fields)
+    query = db.query(*schema_columns(WorkoutLog, WorkoutLogOut)).filter(WorkoutLog.user_id == current_user.id)
+    return rows_response(in_range(query, WorkoutLog.log_date, from_date, to_date).all(), archived)
 
 
 @router.get(
@@ -121,6 +176,9 @@ def list_workout_logs(
         404: {"description": "Workout log not found"}
     }
 )
+@query_budget(2)
+@replica_reads
+@cache_response("workouts", schema=WorkoutLogOut)
 def get_workout_log(
     log_id: int,
     db: Session = Depends(get_db),
@@ -145,6 +203,7 @@ def get_workout_log(
         404: {"description": "Workout log not found"}
     }
 )
+@query_budget(4)
 def delete_workout_log(
     log_id: int,
     db: Session = Depends(get_db),
@@ -159,9 +218,67 @@ def delete_workout_log(
 
     db.delete(log)
     db.commit()
+    response_cache.bump(current_user.id, "workouts")
     return None
 
 
+@router.get(
+    "/volume",
+    response_model=TrackingVolumeOut,
+    summary="Weekly training volume per muscle group",
+    description="Aggregate logged exercise work into weekly volume per muscle group. "
+                "Only workout logs that record an exercise contribute, archived ones included.",
+    responses={
+        200: {
+            "description": "Weekly volume per muscle group",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "weeks": [
+                            {
+                                "week_start": "2025-09-29",
+                                "muscles": [
+                                    {"muscle": "Chest", "sets": 6.0, "reps": 60.0, "duration_seconds": 0.0, "distance_meters": 0.0},
+                                    {"muscle": "Triceps", "sets": 6.0, "reps": 60.0, "duration_seconds": 0.0, "distance_meters": 0.0}
+                                ]
+                            }
+                        ]
+                    }
+                }
+            }
+        },
+        400: {"description": "Invalid date range, or one spanning more than 530 weeks"}
+    }
+)
+# One more statement each when the exercise catalog is loaded for the first
+# time and when the range reaches into the archive
+@query_budget(4)
+@replica_reads
+@cache_response("workouts", schema=TrackingVolumeOut)
+def get_training_volume(
+    from_date: Optional[date] = Query(None, alias="from", description="First day of the range (inclusive)"),
+    to_date: Optional[date] = Query(None, alias="to", description="Last day of the range (inclusive)"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    check_range(from_date, to_date)
+    columns = ("log_date", "exercise_id", "sets", "reps", "duration_seconds", "distance_meters")
+    rows = []
+    if reaches_archive(from_date):
+        archived = archived_rows(db, current_user.id, "workout_logs", from_date, to_date, columns)
+        rows = [tuple(row.values()) for row in archived if row["exercise_id"] is not None]
+
+    query = db.query(*(getattr(WorkoutLog, name) for name in columns)).filter(
+        WorkoutLog.user_id == current_user.id, WorkoutLog.exercise_id.isnot(None)
+    )
+    rows += in_range(query, WorkoutLog.log_date, from_date, to_date).all()
+
+    try:
+        return {"weeks": history_weekly_volume(db, rows, from_date, to_date)}
+    except RangeTooLong as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+
 # Weight Logs
 
 @router.post(
@@ -185,6 +302,7 @@ def delete_workout_log(
         }
     }
 )
+@query_budget(3)
 def create_weight_log(
     log_in: WeightLogCreate,
     db: Session = Depends(get_db),
@@ -197,6 +315,7 @@ def create_weight_log(
     )
     db.add(log)
     db.commit()
+    response_cache.bump(current_user.id, "weights")
     db.refresh(log)
     return log
 
@@ -204,8 +323,10 @@ def create_weight_log(
 @router.get(
     "/weights",
     response_model=List[WeightLogOut],
+    dependencies=[Depends(weight_logs_etag)],
     summary="List my weight history",
-    description="Retrieve all weight log entries for the current user.",
+    description="Retrieve the current user's weight log entries, optionally limited to a date range. "
+                "Archived entries in the range are included.",
     responses={
         200: {
             "description": "List of weight logs",
@@ -218,14 +339,26 @@ def create_weight_log(
                     ]
                 }
             }
-        }
+        },
+        400: {"description": "Invalid date range"}
     }
 )
+# One more statement when the range reaches into the archive
+@query_budget(4)
+@replica_reads
+@cache_response("weights")
 def list_weight_logs(
+    from_date: Optional[date] = Query(None, alias="from", description="First day of the range (inclusive)"),
+    to_date: Optional[date] = Query(None, alias="to", description="Last day of the range (inclusive)"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    return db.query(WeightLog).filter(WeightLog.user_id == current_user.id).all()
+    check_range(from_date, to_date)
+    archived = []
+    if reaches_archive(from_date):
+        archived = archived_rows(db, current_user.id, "weight_logs", from_date, to_date, WeightLogOut.model_fields)
+    query = db.query(*schema_columns(WeightLog, WeightLogOut)).filter(WeightLog.user_id == current_user.id)
+    return rows_response(in_range(query, WeightLog.log_date, from_date, to_date).all(), archived)
 
 
 @router.delete(
@@ -238,6 +371,7 @@ def list_weight_logs(
         404: {"description": "Weight log not found"}
     }
 )
+@query_budget(4)
 def delete_weight_log(
     log_id: int,
     db: Session = Depends(get_db),
@@ -252,6 +386,7 @@ def delete_weight_log(
 
     db.delete(log)
     db.commit()
+    response_cache.bump(current_user.id, "weights")
     return None
 
 
@@ -280,6 +415,7 @@ def delete_weight_log(
         }
     }
 )
+@query_budget(3)
 def create_goal(
     goal_in: GoalCreate,
     db: Session = Depends(get_db),
@@ -294,6 +430,7 @@ def create_goal(
     )
     db.add(goal)
     db.commit()
+    response_cache.bump(current_user.id, "goals")
     db.refresh(goal)
     return goal
 
@@ -301,6 +438,7 @@ def create_goal(
 @router.get(
     "/goals",
     response_model=List[GoalOut],
+    dependencies=[Depends(goals_etag)],
     summary="List my goals",
     description="Retrieve all fitness goals for the current user.",
     responses={
@@ -331,6 +469,9 @@ def create_goal(
         }
     }
 )
+@query_budget(3)
+@replica_reads
+@cache_response("goals", schema=List[GoalOut])
 def list_goals(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -362,6 +503,7 @@ def list_goals(
         404: {"description": "Goal not found"}
     }
 )
+@query_budget(4)
 def update_goal(
     goal_id: int,
     goal_in: GoalUpdate,
@@ -381,6 +523,7 @@ def update_goal(
     goal.exercise_id = goal_in.exercise_id
 
     db.commit()
+    response_cache.bump(current_user.id, "goals")
     db.refresh(goal)
     return goal
 
@@ -395,6 +538,7 @@ def update_goal(
         404: {"description": "Goal not found"}
     }
 )
+@query_budget(4)
 def delete_goal(
     goal_id: int,
     db: Session = Depends(get_db),
@@ -409,4 +553,5 @@ def delete_goal(
 
     db.delete(goal)
     db.commit()
+    response_cache.bump(current_user.id, "goals")
     return None
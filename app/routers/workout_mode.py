@@ -8,6 +8,8 @@ from app.models.plan_item import PlanItem
 from app.models.workout_session import WorkoutSession
 from app.models.workout_log import WorkoutLog
 from app.schemas.workout_mode import WorkoutSessionOut, WorkoutSessionItem, CompleteItemRequest, FinishSessionRequest
+from app.services.cache import response_cache
+from app.services.query_budget import query_budget
 from app.routers.auth import get_current_user
 from app.models.user import User
 
@@ -18,6 +20,7 @@ router = APIRouter(
 
 # Start a session
 @router.post("/start/{plan_id}", response_model=WorkoutSessionOut)
+@query_budget(8)
 def start_workout(plan_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
     plan = db.query(WorkoutPlan).filter(
         WorkoutPlan.id == plan_id, WorkoutPlan.user_id == current_user.id
@@ -62,6 +65,7 @@ def start_workout(plan_id: int, db: Session = Depends(get_db), current_user: Use
 
 # Complete exercise
 @router.patch("/{session_id}/complete", response_model=WorkoutSessionOut)
+@query_budget(10)
 def complete_exercise(session_id: int, data: CompleteItemRequest, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
     session = db.query(WorkoutSession).filter(
         WorkoutSession.id == session_id, WorkoutSession.user_id == current_user.id
@@ -82,12 +86,18 @@ def complete_exercise(session_id: int, data: CompleteItemRequest, db: Session =
         user_id=current_user.id,
         plan_id=session.plan_id,
         log_date=func.current_date(),
-        notes=f"Completed {item.exercise.name}: {data.notes or 'done'}"
+        notes=f"Completed {item.exercise.name}: {data.notes or 'done'}",
+        exercise_id=item.exercise_id,
+        sets=item.sets,
+        reps=item.reps,
+        duration_seconds=item.duration_seconds,
+        distance_meters=item.distance_meters
     )
     db.add(log)
 
     session.current_index += 1
     db.commit()
+    response_cache.bump(current_user.id, "workouts")
     db.refresh(session)
 
     next_item = db.query(PlanItem).filter(
@@ -115,6 +125,7 @@ def complete_exercise(session_id: int, data: CompleteItemRequest, db: Session =
 
 # Finish session
 @router.post("/{session_id}/finish")
+@query_budget(5)
 def finish_session(session_id: int, data: FinishSessionRequest, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
     session = db.query(WorkoutSession).filter(
         WorkoutSession.id == session_id, WorkoutSession.user_id == current_user.id
@@ -134,6 +145,7 @@ def finish_session(session_id: int, data: FinishSessionRequest, db: Session = De
     )
     db.add(log)
     db.commit()
+    response_cache.bump(current_user.id, "workouts")
     db.refresh(session)
 
     return {"status": "finished", "session_id": session.id, "plan_id": session.plan_id, "notes": data.notes}
@@ -0,0 +1,23 @@
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Literal, Optional
+
+
+class BatchOperation(BaseModel):
+    method: Literal["GET", "POST", "PATCH", "DELETE"] = Field(..., example="PATCH")
+    path: str = Field(..., example="/plans/1/items/4", description="Path of a /plans or /tracking endpoint")
+    body: Optional[Dict[str, Any]] = Field(None, example={"sets": 4, "reps": 10, "order_index": 1})
+    query: Dict[str, Any] = Field({}, example={}, description="Query parameters, if the endpoint takes any")
+
+
+class BatchRequest(BaseModel):
+    operations: List[BatchOperation] = Field(..., min_length=1)
+
+
+class BatchResult(BaseModel):
+    status: int = Field(..., example=200)
+    body: Any = None
+
+
+class BatchOut(BaseModel):
+    committed: bool = Field(..., description="False when an operation failed and the whole batch was rolled back")
+    results: List[BatchResult] = Field([], description="One result per executed operation, up to the failing one")
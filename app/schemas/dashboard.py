@@ -0,0 +1,20 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+from app.schemas.user import UserOut
+from app.schemas.workout_plan import WorkoutPlanBase
+from app.schemas.workout_mode import WorkoutSessionOut
+from app.schemas.tracking import WeightLogOut, GoalOut
+
+
+class DashboardPlan(WorkoutPlanBase):
+    id: int
+    item_count: int = Field(..., example=5, description="Number of exercises in the plan")
+
+
+class DashboardOut(BaseModel):
+    user: UserOut
+    plans: List[DashboardPlan] = []
+    active_session: Optional[WorkoutSessionOut] = None
+    latest_weight: Optional[WeightLogOut] = None
+    open_goals: List[GoalOut] = []
@@ -0,0 +1,49 @@
+from pydantic import BaseModel, Field
+from typing import List
+from datetime import datetime
+
+from app.schemas.workout_plan import WorkoutPlanBase, PlanItemOut
+from app.schemas.tracking import WorkoutLogOut, WeightLogOut, GoalOut
+
+
+class SyncPlan(WorkoutPlanBase):
+    id: int
+    user_id: int
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class SyncPlanItem(PlanItemOut):
+    plan_id: int
+    updated_at: datetime
+
+
+class SyncWorkoutLog(WorkoutLogOut):
+    updated_at: datetime
+
+
+class SyncWeightLog(WeightLogOut):
+    updated_at: datetime
+
+
+class SyncGoal(GoalOut):
+    updated_at: datetime
+
+
+class SyncDeleted(BaseModel):
+    entity: str = Field(..., example="plan_items", description="Table the row was deleted from")
+    id: int = Field(..., example=12)
+    deleted_at: datetime
+
+
+class SyncOut(BaseModel):
+    watermark: datetime = Field(..., description="Pass as `since` on the next sync")
+    full: bool = Field(..., description="True when this is a full snapshot and local data should be replaced")
+    plans: List[SyncPlan] = []
+    plan_items: List[SyncPlanItem] = []
+    workout_logs: List[SyncWorkoutLog] = []
+    weight_logs: List[SyncWeightLog] = []
+    goals: List[SyncGoal] = []
+    deleted: List[SyncDeleted] = []
@@ -8,6 +8,11 @@ from datetime import date
 class WorkoutLogBase(BaseModel):
     log_date: date = Field(..., example="2025-10-03")
     notes: Optional[str] = Field(None, example="Felt strong today, pushed extra reps")
+    exercise_id: Optional[int] = Field(None, example=3, description="Exercise performed (optional, enables volume analytics)")
+    sets: Optional[int] = Field(None, example=3)
+    reps: Optional[int] = Field(None, example=12)
+    duration_seconds: Optional[int] = Field(None, example=None, description="Duration in seconds")
+    distance_meters: Optional[int] = Field(None, example=None, description="Distance in meters")
 
 
 class WorkoutLogCreate(WorkoutLogBase):
@@ -14,3 +14,12 @@ class UserOut(BaseModel):
     email: EmailStr
 
     model_config = ConfigDict(from_attributes=True)
+
+class TokenOut(BaseModel):
+    access_token: str
+    refresh_token: str
+    token_type: str = "bearer"
+    expires_in: int  # access token lifetime in seconds
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
@@ -0,0 +1,26 @@
+from pydantic import BaseModel, Field
+from typing import List
+from datetime import date
+
+
+class MuscleVolume(BaseModel):
+    muscle: str = Field(..., example="Chest")
+    sets: float = Field(..., example=9.0)
+    reps: float = Field(..., example=90.0, description="Total repetitions (sets x reps)")
+    duration_seconds: float = Field(..., example=0.0, description="Total time under work (sets x duration)")
+    distance_meters: float = Field(..., example=0.0, description="Total distance (sets x distance)")
+
+
+class PlanVolumeOut(BaseModel):
+    plan_id: int
+    frequency_per_week: int
+    muscles: List[MuscleVolume] = []
+
+
+class WeeklyVolume(BaseModel):
+    week_start: date = Field(..., example="2025-09-29", description="Monday of the week")
+    muscles: List[MuscleVolume] = []
+
+
+class TrackingVolumeOut(BaseModel):
+    weeks: List[WeeklyVolume] = []
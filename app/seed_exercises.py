@@ -1,4 +1,5 @@
-from app.db import SessionLocal
+from app.db import SessionLocal, shard_map
+from app.services.rebalance import replicate_exercises
 from app.models.exercise import Exercise
 
 def seed_exercises():
@@ -175,6 +176,9 @@ def seed_exercises():
     db.commit()
     db.close()
 
+    if shard_map.sharded:
+        replicate_exercises()
+
 if __name__ == "__main__":
     seed_exercises()
     print("✅ 20 exercises seeded successfully.")
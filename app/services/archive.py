@@ -0,0 +1,211 @@
+"""
+Cold storage for old workout and weight logs.
+
+Most reads touch the last few months, so logs dated before the archive
+horizon (the first day of the month ``ARCHIVE_AFTER_MONTHS`` months ago) are
+moved out of the hot tables into ``log_archives``, one row per user, table
+and month holding that month's rows as gzipped NDJSON. Reads whose date
+range starts before the horizon (or has no start) also load the archived
+months it covers and merge them in: the tracking lists, the volume report
+and full ``/sync`` snapshots. Reads within the horizon never touch the
+archive.
+
+Archived logs keep their ids but are read-only; deleting one returns 404
+until it is restored. Moving a user to another shard brings their archive
+back into the hot tables there, and the next run packs it again.
+
+    python -m app.services.archive run [--dry-run]
+    python -m app.services.archive restore [--user ID]
+
+Run it from cron. Reads only look at the archive for dates before the
+current horizon, so ``restore`` before lengthening ``ARCHIVE_AFTER_MONTHS``
+or setting it back to 0 (off).
+"""
+
+import argparse
+import gzip
+from collections import Counter
+from datetime import date, datetime
+
+import orjson
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.db import shard_map
+from app.models.log_archive import LogArchive
+from app.models.weight_log import WeightLog
+from app.models.workout_log import WorkoutLog
+from app.services.cache import response_cache
+from app.services.partitions import add_months
+
+archives = LogArchive.__table__
+
+# Archived tables and the response cache namespace reading them
+ENTITIES = {
+    "workout_logs": (WorkoutLog.__table__, "workouts"),
+    "weight_logs": (WeightLog.__table__, "weights"),
+}
+
+
+def horizon(today: date | None = None) -> date | None:
+    """Logs dated before this are archived; None when archiving is off."""
+    if settings.ARCHIVE_AFTER_MONTHS <= 0:
+        return None
+    return add_months((today or date.today()).replace(day=1), -settings.ARCHIVE_AFTER_MONTHS)
+
+
+def reaches_archive(from_date: date | None) -> bool:
+    """Whether a read starting at ``from_date`` (None: the beginning) may need archived logs."""
+    cutoff = horizon()
+    return cutoff is not None and (from_date is None or from_date < cutoff)
+
+
+def encode(rows) -> bytes:
+    return gzip.compress(b"".join(
+        orjson.dumps({k: v for k, v in row.items() if k != "user_id"}) + b"\n" for row in rows
+    ))
+
+
+def decode(data: bytes, user_id: int) -> list:
+    rows = []
+    for line in gzip.decompress(data).splitlines():
+        row = orjson.loads(line)
+        row["user_id"] = user_id
+        row["log_date"] = date.fromisoformat(row["log_date"])
+        row["updated_at"] = datetime.fromisoformat(row["updated_at"])
+        rows.append(row)
+    return rows
+
+
+def archived_rows(
+    db: Session,
+    user_id: int,
+    entity: str,
+    from_date: date | None = None,
+    to_date: date | None = None,
+    columns=None,
+) -> list:
+    """
+    The user's archived ``entity`` rows dated within the range, as dicts of
+    ``columns`` (every column when None), ordered by date.
+    """
+    query = select(archives.c.data).where(archives.c.user_id == user_id, archives.c.entity == entity)
+    if from_date:
+        query = query.where(archives.c.month >= from_date.replace(day=1))
+    if to_date:
+        query = query.where(archives.c.month <= to_date)
+    rows = []
+    for data in db.execute(query.order_by(archives.c.month)).scalars():
+        rows.extend(
+            row for row in decode(data, user_id)
+            if (from_date is None or row["log_date"] >= from_date) and (to_date is None or row["log_date"] <= to_date)
+        )
+    if columns is not None:
+        rows = [{name: row.get(name) for name in columns} for row in rows]
+    return rows
+
+
+def all_archived_rows(db: Session, user_id: int) -> dict:
+    """Every archived row of the user, by table, loaded in one statement."""
+    rows = {entity: [] for entity in ENTITIES}
+    query = select(archives.c.entity, archives.c.data).where(archives.c.user_id == user_id)
+    for entity, data in db.execute(query.order_by(archives.c.month)):
+        rows[entity].extend(decode(data, user_id))
+    return rows
+
+
+def _archive_user(connection, entity: str, user_id: int, before: date) -> int:
+    table, _ = ENTITIES[entity]
+    # Archive what the DELETE removed rather than what an earlier SELECT saw:
+    # a log the user deletes concurrently must not come back from the archive
+    rows = sorted(
+        (dict(row._mapping) for row in connection.execute(
+            delete(table).where(table.c.user_id == user_id, table.c.log_date < before).returning(*table.c)
+        )),
+        key=lambda row: (row["log_date"], row["id"]),
+    )
+    by_month = {}
+    for row in rows:
+        by_month.setdefault(row["log_date"].replace(day=1), []).append(row)
+
+    for month, month_rows in by_month.items():
+        key = (archives.c.user_id == user_id, archives.c.entity == entity, archives.c.month == month)
+        existing = connection.execute(select(archives.c.data).where(*key)).scalar()
+        if existing is None:
+            connection.execute(insert(archives).values(
+                user_id=user_id, entity=entity, month=month, row_count=len(month_rows), data=encode(month_rows),
+            ))
+        else:
+            # Logs back-dated into an archived month since the last run
+            merged = sorted(decode(existing, user_id) + month_rows, key=lambda row: (row["log_date"], row["id"]))
+            connection.execute(update(archives).where(*key).values(row_count=len(merged), data=encode(merged)))
+    return len(rows)
+
+
+def archive(engine, before: date, dry_run: bool = False) -> Counter:
+    """Move logs dated before ``before`` into the archive, one transaction per user. Returns rows per table."""
+    moved = Counter()
+    for entity, (table, namespace) in ENTITIES.items():
+        with engine.connect() as connection:
+            user_ids = connection.execute(select(table.c.user_id).where(table.c.log_date < before).distinct()).scalars().all()
+        for user_id in user_ids:
+            if dry_run:
+                with engine.connect() as connection:
+                    moved[entity] += len(connection.execute(
+                        select(table.c.id).where(table.c.user_id == user_id, table.c.log_date < before)
+                    ).all())
+                continue
+            with engine.begin() as connection:
+                moved[entity] += _archive_user(connection, entity, user_id, before)
+            response_cache.bump(user_id, namespace)
+    return moved
+
+
+def restore(engine, user_id: int | None = None) -> Counter:
+    """Move archived logs back into the hot tables, keeping their ids. Returns rows per table."""
+    restored = Counter()
+    query = select(archives.c.id, archives.c.user_id, archives.c.entity)
+    if user_id is not None:
+        query = query.where(archives.c.user_id == user_id)
+    with engine.connect() as connection:
+        blobs = connection.execute(query).all()
+    for archive_id, owner, entity in blobs:
+        table, namespace = ENTITIES[entity]
+        with engine.begin() as connection:
+            data = connection.execute(select(archives.c.data).where(archives.c.id == archive_id)).scalar()
+            if data is None:
+                continue
+            rows = decode(data, owner)
+            connection.execute(insert(table), rows)
+            connection.execute(delete(archives).where(archives.c.id == archive_id))
+        restored[entity] += len(rows)
+        response_cache.bump(owner, namespace)
+    return restored
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="archive logs older than ARCHIVE_AFTER_MONTHS")
+    run.add_argument("--dry-run", action="store_true", help="count the rows without moving them")
+    back = commands.add_parser("restore", help="move archived logs back into the hot tables")
+    back.add_argument("--user", type=int, help="only this user's logs")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        before = horizon()
+        if before is None:
+            parser.error("ARCHIVE_AFTER_MONTHS is not set")
+        for name, engine in shard_map.engines.items():
+            moved = archive(engine, before, args.dry_run)
+            verb = "would archive" if args.dry_run else "archived"
+            print(f"🧊 {name}: {verb} {moved['workout_logs']} workout and {moved['weight_logs']} weight logs before {before}.")
+    else:
+        for name, engine in shard_map.engines.items():
+            restored = restore(engine, args.user)
+            print(f"♻️ {name}: restored {restored['workout_logs']} workout and {restored['weight_logs']} weight logs.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+Per-user read-through response cache.
+
+Cached responses are keyed by endpoint, user id, the user's shard, request
+parameters and the current version of every namespace the endpoint reads
+("plans", "goals", "workouts", "weights"). Write handlers call
+`response_cache.bump` after committing, which moves readers to a new key;
+stale entries are never read again and simply age out of the LRU/TTL.
+Moving a user to another shard changes their key too, since the rebalance
+process's own bumps never reach the workers' in-process caches.
+
+The backend is an in-process LRU by default. Set ``CACHE_BACKEND=redis``
+(with the optional ``redis`` package) to share entries and versions between
+workers through a local Redis-compatible server.
+"""
+
+import functools
+import threading
+import time
+from collections import OrderedDict
+
+import orjson
+from fastapi.responses import Response
+from pydantic import TypeAdapter
+
+from app.config import settings
+
+try:
+    import redis
+except ImportError:  # optional dependency
+    redis = None
+
+NAMESPACES = ("plans", "goals", "workouts", "weights")
+
+
+class MemoryCacheBackend:
+    """Bounded LRU of response bodies with a TTL, plus namespace versions."""
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self._entries: OrderedDict = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def versions(self, keys) -> list:
+        with self._lock:
+            return [self._versions.get(key, 0) for key in keys]
+
+    def bump(self, keys) -> None:
+        with self._lock:
+            for key in keys:
+                self._versions[key] = self._versions.get(key, 0) + 1
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            body, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return body
+
+    def set(self, key, body: bytes) -> None:
+        with self._lock:
+            self._entries[key] = (body, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class RedisCacheBackend:
+    """Entries and versions stored in a Redis-compatible server."""
+
+    def __init__(self, url: str, ttl_seconds: int):
+        if redis is None:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package")
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl_seconds
+
+    def versions(self, keys) -> list:
+        return [int(v or 0) for v in self.client.mget([f"athlos:ver:{k}" for k in keys])]
+
+    def bump(self, keys) -> None:
+        pipe = self.client.pipeline()
+        for key in keys:
+            pipe.incr(f"athlos:ver:{key}")
+        pipe.execute()
+
+    def get(self, key):
+        return self.client.get(f"athlos:resp:{key}")
+
+    def set(self, key, body: bytes) -> None:
+        self.client.set(f"athlos:resp:{key}", body, ex=self.ttl)
+
+
+class ResponseCache:
+    def __init__(self, backend):
+        self.backend = backend
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def bump(self, user_id: int, *namespaces: str) -> None:
+        """Invalidate the user's cached reads of ``namespaces``."""
+        self.backend.bump([f"{user_id}:{ns}" for ns in namespaces])
+
+    def key(self, name: str, user_id: int, shard: str | None, namespaces, params: dict) -> str:
+        versions = self.backend.versions([f"{user_id}:{ns}" for ns in namespaces])
+        args = ",".join(f"{k}={params[k]}" for k in sorted(params))
+        return f"{user_id}@{shard or 'main'}:{name}:{'.'.join(map(str, versions))}:{args}"
+
+    def record(self, name: str, hit: bool) -> None:
+        with self._lock:
+            entry = self._stats.setdefault(name, [0, 0])
+            entry[0 if hit else 1] += 1
+
+    def snapshot(self) -> list:
+        with self._lock:
+            items = sorted(self._stats.items())
+        return [
+            {
+                "endpoint": name,
+                "hits": hits,
+                "misses": misses,
+                "hit_ratio": round(hits / (hits + misses), 3) if hits + misses else None,
+            }
+            for name, (hits, misses) in items
+        ]
+
+
+def make_backend():
+    if settings.CACHE_BACKEND == "redis":
+        return RedisCacheBackend(settings.CACHE_REDIS_URL, settings.CACHE_TTL_SECONDS)
+    if settings.CACHE_BACKEND == "memory":
+        return MemoryCacheBackend(settings.CACHE_MAX_ENTRIES, settings.CACHE_TTL_SECONDS)
+    raise ValueError(f"Unknown CACHE_BACKEND: {settings.CACHE_BACKEND!r}")
+
+
+response_cache = ResponseCache(make_backend())
+
+
+def cache_response(*namespaces: str, schema=None):
+    """
+    Cache a per-user GET endpoint's JSON body.
+
+    The endpoint must take ``current_user``; its other non-``db`` arguments
+    become part of the key. ``schema`` serialises non-Response results (the
+    endpoint's ``response_model``). Only successful responses are cached.
+    """
+    adapter = TypeAdapter(schema) if schema is not None else None
+
+    def decorator(endpoint):
+        name = endpoint.__name__
+
+        @functools.wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            if not settings.CACHE_ENABLED:
+                return endpoint(*args, **kwargs)
+
+            params = {k: v for k, v in kwargs.items() if k not in ("db", "current_user")}
+            user = kwargs["current_user"]
+            key = response_cache.key(name, user.id, user.shard, namespaces, params)
+            body = response_cache.backend.get(key)
+            response_cache.record(name, hit=body is not None)
+            if body is not None:
+                return Response(body, media_type="application/json")
+
+            result = endpoint(*args, **kwargs)
+            if isinstance(result, Response):
+                if result.status_code != 200:
+                    return result
+                body = result.body
+            else:
+                body = orjson.dumps(adapter.dump_python(adapter.validate_python(result, from_attributes=True), mode="json"))
+
+            if len(body) <= settings.CACHE_MAX_ENTRY_BYTES:
+                response_cache.backend.set(key, body)
+            return Response(body, media_type="application/json")
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,107 @@
+"""
+Per-request deadlines for database work.
+
+`app.middleware.deadline.DeadlineMiddleware` gives every request a deadline
+(``REQUEST_DEADLINE_MS``, overridden per path by ``REQUEST_DEADLINES``).
+`apply_deadline` makes each transaction of a request's session honour the
+time left: ``SET LOCAL statement_timeout`` on PostgreSQL, a progress handler
+on SQLite. The setup goes through the raw DBAPI cursor, so it does not count
+against query budgets. When the client disconnects, the middleware calls
+`cancel_queries` to cancel the statements still running for it.
+
+A statement stopped by either mechanism surfaces as `DeadlineExceeded`,
+which the app turns into a 503.
+"""
+
+import time
+from fnmatch import fnmatchcase
+
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import Pool
+
+from app.config import settings
+
+# PostgreSQL's SQLSTATE for a statement cancelled by timeout or cancel request
+QUERY_CANCELED = "57014"
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+def parse_deadlines(spec: str) -> list:
+    """``"/workout-mode/*=1500,/sync=15000"`` -> ``[("/workout-mode/*", 1500), ("/sync", 15000)]``."""
+    deadlines = []
+    for entry in spec.split(","):
+        if not entry.strip():
+            continue
+        pattern, _, ms = entry.rpartition("=")
+        deadlines.append((pattern.strip(), int(ms)))
+    return deadlines
+
+
+def deadline_ms(path: str, deadlines: list) -> int:
+    return next((ms for pattern, ms in deadlines if fnmatchcase(path, pattern)), settings.REQUEST_DEADLINE_MS)
+
+
+def is_timeout(exc: OperationalError) -> bool:
+    return getattr(exc.orig, "pgcode", None) == QUERY_CANCELED or str(exc.orig) == "interrupted"
+
+
+def apply_deadline(db: Session, scope) -> None:
+    """
+    Bound every transaction ``db`` begins by the deadline of the request in
+    ``scope``, and register its connections for `cancel_queries`. A no-op
+    outside requests handled by the deadline middleware.
+    """
+    state = scope.get("state", {})
+    deadline = state.get("deadline")
+    if deadline is None:
+        return
+    if time.monotonic() >= deadline:
+        raise DeadlineExceeded()
+
+    @event.listens_for(db, "after_begin")
+    def set_timeout(session, transaction, connection):
+        if transaction.nested:
+            return
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceeded()
+        pooled = connection.connection
+        dbapi_connection = pooled.dbapi_connection
+        if connection.dialect.name == "postgresql":
+            cursor = pooled.cursor()
+            try:
+                cursor.execute(f"SET LOCAL statement_timeout = {max(int(remaining * 1000), 1)}")
+            finally:
+                cursor.close()
+        elif connection.dialect.name == "sqlite":
+            # Called every 1000 VM instructions; a true result interrupts
+            dbapi_connection.set_progress_handler(lambda: time.monotonic() > deadline, 1000)
+        # Tracked until the connection goes back to the pool (see _release)
+        pooled.info["deadline_connections"] = connections = state.setdefault("db_connections", [])
+        if dbapi_connection not in connections:
+            connections.append(dbapi_connection)
+
+
+def cancel_queries(state: dict) -> None:
+    """Cancel the statements running on the request's connections."""
+    for dbapi_connection in list(state.get("db_connections", ())):
+        if hasattr(dbapi_connection, "cancel"):  # psycopg2
+            dbapi_connection.cancel()
+        elif hasattr(dbapi_connection, "interrupt"):  # sqlite3
+            dbapi_connection.interrupt()
+
+
+@event.listens_for(Pool, "checkin")
+def _release(dbapi_connection, connection_record):
+    connections = connection_record.info.pop("deadline_connections", None)
+    if connections is None:
+        return
+    if dbapi_connection in connections:
+        connections.remove(dbapi_connection)
+    if hasattr(dbapi_connection, "set_progress_handler"):
+        dbapi_connection.set_progress_handler(None, 0)
@@ -0,0 +1,96 @@
+"""
+Weak ETags for per-user resources.
+
+Each ETag is derived from a cheap version of the resource: the row count and
+latest ``updated_at`` of the user's rows, read in a single statement served
+by the ``(user_id, updated_at)`` indexes. The dependencies below run before
+the endpoint, so a matching ``If-None-Match`` returns 304 without loading or
+serialising any rows. Otherwise the ETag is left in ``request.state`` for
+`app.middleware.etag.ETagMiddleware` to put on the response.
+"""
+
+import hashlib
+
+from fastapi import Depends, HTTPException, Request
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.db import get_db
+from app.models.workout_plan import WorkoutPlan
+from app.models.plan_item import PlanItem
+from app.models.workout_log import WorkoutLog
+from app.models.weight_log import WeightLog
+from app.models.goal import Goal
+from app.routers.auth import get_current_user
+from app.models.user import User
+
+
+def _count_and_max(model, *where):
+    return (
+        select(func.count(model.id)).where(*where).scalar_subquery(),
+        select(func.max(model.updated_at)).where(*where).scalar_subquery(),
+    )
+
+
+def _items_of(user_id: int, *where):
+    """Count/max of plan items of the user's plans (items carry no user_id)."""
+    owned = select(WorkoutPlan.id).where(WorkoutPlan.user_id == user_id)
+    return _count_and_max(PlanItem, PlanItem.plan_id.in_(owned), *where)
+
+
+def make_etag(kind: str, user_id: int, version) -> str:
+    digest = hashlib.blake2b(repr((kind, user_id, tuple(version))).encode(), digest_size=10).hexdigest()
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Weak comparison of an ETag against an If-None-Match header."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(tag.removeprefix("W/") == etag.removeprefix("W/") for tag in candidates)
+
+
+def _check(request: Request, kind: str, user_id: int, version) -> None:
+    etag = make_etag(kind, user_id, version)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        raise HTTPException(status_code=304, headers={"ETag": etag})
+    request.state.etag = etag
+
+
+def plans_etag(request: Request, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    version = db.execute(select(
+        *_count_and_max(WorkoutPlan, WorkoutPlan.user_id == current_user.id),
+        *_items_of(current_user.id),
+    )).one()
+    _check(request, "plans", current_user.id, version)
+
+
+def plan_etag(
+    plan_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    version = db.execute(select(
+        *_count_and_max(WorkoutPlan, WorkoutPlan.id == plan_id, WorkoutPlan.user_id == current_user.id),
+        *_items_of(current_user.id, PlanItem.plan_id == plan_id),
+    )).one()
+    if version[0] == 0:
+        return  # the endpoint answers 404
+    _check(request, f"plan:{plan_id}", current_user.id, version)
+
+
+def workout_logs_etag(request: Request, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    version = db.execute(select(*_count_and_max(WorkoutLog, WorkoutLog.user_id == current_user.id))).one()
+    _check(request, "workout_logs", current_user.id, version)
+
+
+def weight_logs_etag(request: Request, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    version = db.execute(select(*_count_and_max(WeightLog, WeightLog.user_id == current_user.id))).one()
+    _check(request, "weight_logs", current_user.id, version)
+
+
+def goals_etag(request: Request, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    version = db.execute(select(*_count_and_max(Goal, Goal.user_id == current_user.id))).one()
+    _check(request, "goals", current_user.id, version)
@@ -0,0 +1,146 @@
+"""
+Upkeep of the monthly partitions of workout_logs and weight_logs.
+
+On PostgreSQL both tables are range-partitioned on ``log_date`` (migration
+b8d4f2a6c3e1), one ``<table>_YYYY_MM`` partition per month plus
+``<table>_default`` for dates no month covers. Each worker runs `maintain`
+every ``LOG_PARTITION_CHECK_SECONDS`` on every shard:
+
+- the current month and the next ``LOG_PARTITION_MONTHS_AHEAD`` get their
+  partition before rows arrive, so inserts never land in the default
+  partition (``create_log_partition`` moves any that did);
+- with ``LOG_PARTITION_RETENTION_MONTHS`` set, months older than that are
+  detached and moved to the ``LOG_PARTITION_ARCHIVE_SCHEMA`` schema, where
+  they can be dumped and dropped. Detached rows no longer show up anywhere
+  in the API.
+
+A transaction-level advisory lock keeps workers from doing the same work at
+once. Other databases keep plain tables and are skipped.
+
+    python -m app.services.partitions
+"""
+
+import logging
+import re
+import threading
+from datetime import date
+
+from sqlalchemy import text
+
+from app.config import settings
+from app.db import shard_map
+
+logger = logging.getLogger(__name__)
+
+TABLES = ("workout_logs", "weight_logs")
+
+# Arbitrary key shared by every worker maintaining partitions
+LOCK_KEY = 7_352_014_209
+
+
+def add_months(month: date, months: int) -> date:
+    """First day of the month ``months`` after the one ``month`` is in."""
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def is_partitioned(connection, table: str) -> bool:
+    kind = connection.execute(
+        text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:table)"), {"table": table}
+    ).scalar()
+    return kind == "p"
+
+
+def monthly_partitions(connection, table: str) -> dict:
+    """``{first day of month: partition name}`` for the partitions attached to ``table``."""
+    names = connection.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(:table)"
+        ),
+        {"table": table},
+    ).scalars()
+    pattern = re.compile(rf"{table}_(\d{{4}})_(\d{{2}})")
+    months = {}
+    for name in names:
+        match = pattern.fullmatch(name)
+        if match:
+            months[date(int(match[1]), int(match[2]), 1)] = name
+    return months
+
+
+def maintain(engine, today: date | None = None) -> list:
+    """Create upcoming partitions and detach expired ones; returns what was done."""
+    if engine.dialect.name != "postgresql":
+        return []
+    this_month = (today or date.today()).replace(day=1)
+    done = []
+    with engine.begin() as connection:
+        if not connection.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": LOCK_KEY}).scalar():
+            return []
+        for table in TABLES:
+            if not is_partitioned(connection, table):
+                continue
+            existing = monthly_partitions(connection, table)
+            for ahead in range(settings.LOG_PARTITION_MONTHS_AHEAD + 1):
+                month = add_months(this_month, ahead)
+                if month not in existing:
+                    connection.execute(
+                        text("SELECT create_log_partition(:table, :month)"), {"table": table, "month": month}
+                    )
+                    done.append(f"created {table} {month:%Y-%m}")
+
+            if settings.LOG_PARTITION_RETENTION_MONTHS <= 0:
+                continue
+            cutoff = add_months(this_month, -settings.LOG_PARTITION_RETENTION_MONTHS)
+            schema = settings.LOG_PARTITION_ARCHIVE_SCHEMA
+            connection.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{schema}"'))
+            for month, name in sorted(existing.items()):
+                if month >= cutoff:
+                    break
+                connection.execute(text(f'ALTER TABLE "{table}" DETACH PARTITION "{name}"'))
+                connection.execute(text(f'ALTER TABLE "{name}" SET SCHEMA "{schema}"'))
+                done.append(f"detached {table} {month:%Y-%m} to {schema}")
+    return done
+
+
+def maintain_all() -> list:
+    done = []
+    for name, engine in shard_map.engines.items():
+        done.extend(f"{name}: {action}" for action in maintain(engine))
+    return done
+
+
+class PartitionMaintainer:
+    def __init__(self, interval_seconds: float):
+        self.interval = interval_seconds
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                for action in maintain_all():
+                    logger.info("Log partitions: %s", action)
+            except Exception:
+                logger.exception("Could not maintain log partitions")
+            self._stop.wait(self.interval)
+
+    def start(self) -> None:
+        postgres = any(engine.dialect.name == "postgresql" for engine in shard_map.engines.values())
+        if postgres and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="log-partitions", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+partition_maintainer = PartitionMaintainer(settings.LOG_PARTITION_CHECK_SECONDS)
+
+
+if __name__ == "__main__":
+    actions = maintain_all()
+    for action in actions:
+        print(f"  {action}")
+    print(f"🗓️ {len(actions)} partition changes.")
@@ -0,0 +1,82 @@
+"""
+Per-route SQL statement budgets.
+
+Endpoints declare the most statements a request may execute with
+``@query_budget(n)``; the count includes dependencies such as
+``get_current_user`` and ETag checks. The engine hooks in
+`app.middleware.timing` enforce it according to ``QUERY_BUDGET_MODE``:
+
+- ``raise``: the statement that goes over budget raises `QueryBudgetExceeded`,
+  so the traceback points at the offending query (use this in tests);
+- ``log``: the request completes, and the overrun is logged and counted in
+  ``athlos_query_budget_exceeded_total``;
+- ``off``: budgets are ignored.
+
+Endpoints that run a variable number of sub-requests (``/batch``) extend the
+current request's budget with `extend_query_budget`.
+"""
+
+import logging
+
+from app.config import settings
+from app.services.metrics import REGISTRY, route_label
+
+logger = logging.getLogger(__name__)
+
+BUDGET_EXCEEDED = REGISTRY.counter(
+    "athlos_query_budget_exceeded_total",
+    "Requests that executed more SQL statements than their route's budget.",
+    labels=("route",),
+)
+
+
+class QueryBudgetExceeded(RuntimeError):
+    pass
+
+
+def query_budget(max_statements: int):
+    """Declare the maximum number of SQL statements a request to this endpoint may run."""
+
+    def decorator(endpoint):
+        endpoint.query_budget = max_statements
+        return endpoint
+
+    return decorator
+
+
+def budget_of(endpoint) -> int | None:
+    return getattr(endpoint, "query_budget", None)
+
+
+def request_budget(scope) -> int | None:
+    """Budget of the route matched for ``scope`` plus any extension, or None."""
+    budget = budget_of(getattr(scope.get("route"), "endpoint", None))
+    if budget is None:
+        return None
+    return budget + scope.get("state", {}).get("query_budget_extra", 0)
+
+
+def extend_query_budget(request, statements: int) -> None:
+    request.state.query_budget_extra = getattr(request.state, "query_budget_extra", 0) + statements
+
+
+def check_statement(scope, executed: int) -> None:
+    """Called before each statement; raises in ``raise`` mode once the budget is spent."""
+    if settings.QUERY_BUDGET_MODE != "raise":
+        return
+    budget = request_budget(scope)
+    if budget is not None and executed >= budget:
+        route = route_label(scope)
+        BUDGET_EXCEEDED.inc(route)
+        raise QueryBudgetExceeded(f"{route} exceeded its budget of {budget} SQL statements")
+
+
+def check_request(scope, executed: int) -> None:
+    """Called when a request finishes; logs and counts overruns in ``log`` mode."""
+    if settings.QUERY_BUDGET_MODE != "log":
+        return
+    budget = request_budget(scope)
+    if budget is not None and executed > budget:
+        route = route_label(scope)
+        BUDGET_EXCEEDED.inc(route)
+        logger.warning("%s executed %d SQL statements (budget %d)", route, executed, budget)
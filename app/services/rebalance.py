@@ -0,0 +1,256 @@
+"""
+Shard maintenance: moving users to match the hash ring, and keeping the
+exercise catalog replicated.
+
+    python -m app.services.rebalance status
+    python -m app.services.rebalance move [--dry-run] [--limit N] [--grace SECONDS]
+    python -m app.services.rebalance cleanup
+    python -m app.services.rebalance replicate-exercises
+
+``move`` relocates every user whose stored shard is not their owner on the
+current ring (typically after adding a shard to ``DATABASE_SHARDS``). Each
+batch is marked as moving, so its requests get 503, and the tool waits
+``--grace`` seconds for requests already running to finish. It then copies
+each user's rows to the target, points ``users.shard`` at it and deletes the
+source rows. Row ids are per database, so copied rows get new ids; a
+``users`` tombstone on the target makes the user's clients do a full resync.
+Archived logs are unpacked into the target's hot tables along the way.
+Cached responses are keyed by the user's shard, so workers stop serving
+pre-move bodies even when their cache is in-process and misses this tool's
+invalidation.
+
+Every step can be re-run: an interrupted copy is cleared and redone, and
+``cleanup`` deletes rows left on a shard that no longer holds their user.
+Run the Alembic migrations against every shard before adding it.
+"""
+
+import argparse
+import time
+from collections import Counter
+
+from sqlalchemy import delete, func, insert, select, update
+
+from app.db import SessionLocal, shard_map
+from app.models.exercise import Exercise
+from app.models.goal import Goal
+from app.models.log_archive import LogArchive
+from app.models.plan_item import PlanItem
+from app.models.tombstone import RESYNC_ENTITY, Tombstone
+from app.models.user import User
+from app.models.weight_log import WeightLog
+from app.models.workout_log import WorkoutLog
+from app.models.workout_plan import WorkoutPlan
+from app.models.workout_session import WorkoutSession
+from app.services.archive import decode
+from app.services.cache import NAMESPACES, response_cache
+from app.services.sharding import MAIN, is_moving
+
+users = User.__table__
+plans = WorkoutPlan.__table__
+plan_items = PlanItem.__table__
+sessions = WorkoutSession.__table__
+workout_logs = WorkoutLog.__table__
+weight_logs = WeightLog.__table__
+goals = Goal.__table__
+tombstones = Tombstone.__table__
+archives = LogArchive.__table__
+
+# Tables with a user_id column, children first
+USER_TABLES = (archives, tombstones, goals, weight_logs, workout_logs, sessions, plans)
+
+
+def create_user_stub(connection, user_id: int, email: str) -> None:
+    """Add the users row a shard needs for its foreign keys; it holds no credentials."""
+    exists = connection.execute(select(users.c.id).where(users.c.id == user_id)).first()
+    if exists is None:
+        connection.execute(insert(users).values(id=user_id, email=email, password_hash=""))
+
+
+def _delete_user_rows(connection, user_id: int) -> None:
+    plan_ids = select(plans.c.id).where(plans.c.user_id == user_id).scalar_subquery()
+    connection.execute(delete(plan_items).where(plan_items.c.plan_id.in_(plan_ids)))
+    for table in USER_TABLES:
+        connection.execute(delete(table).where(table.c.user_id == user_id))
+
+
+def _rows(connection, query) -> list:
+    return [dict(row._mapping) for row in connection.execute(query)]
+
+
+def _insert(table):
+    # Copied rows are stamped with the move time: their ids change, and the
+    # count and latest updated_at the ETags are built from must change too
+    statement = insert(table)
+    if "updated_at" in table.c:
+        statement = statement.values(updated_at=func.now())
+    return statement
+
+
+def copy_user(source, target, user_id: int, email: str) -> None:
+    """Copy a user's rows from ``source`` to ``target`` in one target transaction."""
+    with source.connect() as src:
+        user_plans = _rows(src, select(plans).where(plans.c.user_id == user_id))
+        plan_ids = [plan["id"] for plan in user_plans]
+        items = _rows(src, select(plan_items).where(plan_items.c.plan_id.in_(plan_ids)))
+        user_sessions = _rows(src, select(sessions).where(sessions.c.user_id == user_id))
+        logs = _rows(src, select(workout_logs).where(workout_logs.c.user_id == user_id))
+        weights = _rows(src, select(weight_logs).where(weight_logs.c.user_id == user_id))
+        user_goals = _rows(src, select(goals).where(goals.c.user_id == user_id))
+        for entity, data in src.execute(select(archives.c.entity, archives.c.data).where(archives.c.user_id == user_id)):
+            (logs if entity == "workout_logs" else weights).extend(decode(data, user_id))
+
+    with target.begin() as dst:
+        # Leftovers of an interrupted move
+        _delete_user_rows(dst, user_id)
+        create_user_stub(dst, user_id, email)
+
+        plan_map = {}
+        for plan in user_plans:
+            old_id = plan.pop("id")
+            plan.pop("updated_at")
+            plan_map[old_id] = dst.execute(_insert(plans).values(**plan)).inserted_primary_key[0]
+        for row in items + user_sessions:
+            row["plan_id"] = plan_map[row["plan_id"]]
+        for row in logs:
+            row["plan_id"] = plan_map.get(row["plan_id"])
+
+        for table, rows in (
+            (plan_items, items), (sessions, user_sessions), (workout_logs, logs),
+            (weight_logs, weights), (goals, user_goals),
+        ):
+            for row in rows:
+                row.pop("id")
+                row.pop("updated_at", None)
+            if rows:
+                dst.execute(_insert(table), rows)
+        dst.execute(insert(tombstones).values(user_id=user_id, entity=RESYNC_ENTITY, entity_id=user_id))
+
+
+def delete_user(engine, user_id: int, shard: str) -> None:
+    with engine.begin() as connection:
+        _delete_user_rows(connection, user_id)
+        if shard != MAIN:
+            connection.execute(delete(users).where(users.c.id == user_id))
+
+
+def _set_shard(user_ids, shard: str | None) -> None:
+    with shard_map.engines[MAIN].begin() as connection:
+        connection.execute(update(users).where(users.c.id.in_(user_ids)).values(shard=shard))
+
+
+def misplaced(limit: int | None = None) -> list:
+    """``(user_id, email, source, target)`` for users not on their ring owner."""
+    moves = []
+    with shard_map.engines[MAIN].connect() as connection:
+        for user_id, email, shard in connection.execute(select(users.c.id, users.c.email, users.c.shard)):
+            if is_moving(shard):
+                source, target = shard.split(">")
+            else:
+                source, target = shard or MAIN, shard_map.place(user_id)
+            if source != target:
+                moves.append((user_id, email, source, target))
+                if limit is not None and len(moves) >= limit:
+                    break
+    return moves
+
+
+def move_users(moves: list, grace_seconds: float) -> None:
+    by_route = {}
+    for move in moves:
+        by_route.setdefault(move[2:], []).append(move)
+    for (source, target), batch in by_route.items():
+        _set_shard([user_id for user_id, _, _, _ in batch], f"{source}>{target}")
+        time.sleep(grace_seconds)
+
+        for user_id, email, _, _ in batch:
+            copy_user(shard_map.engines[source], shard_map.engines[target], user_id, email)
+            _set_shard([user_id], None if target == MAIN else target)
+            delete_user(shard_map.engines[source], user_id, source)
+            response_cache.bump(user_id, *NAMESPACES)
+            print(f"  user {user_id}: {source} -> {target}")
+
+
+def cleanup() -> int:
+    """Delete rows of users a shard does not hold (left by interrupted moves)."""
+    with shard_map.engines[MAIN].connect() as connection:
+        placement = {user_id: shard or MAIN for user_id, shard in connection.execute(select(users.c.id, users.c.shard))}
+    removed = 0
+    for name, engine in shard_map.engines.items():
+        with engine.connect() as connection:
+            present = set()
+            for table in USER_TABLES:
+                present.update(connection.execute(select(table.c.user_id).distinct()).scalars())
+        for user_id in present:
+            if placement.get(user_id, name) != name and not is_moving(placement.get(user_id)):
+                delete_user(engine, user_id, name)
+                removed += 1
+                print(f"  user {user_id}: removed stray rows from {name}")
+    return removed
+
+
+def replicate_exercises() -> int:
+    """Copy the exercise catalog from main to every other shard, keeping ids. Returns the row count."""
+    columns = Exercise.__table__.c
+    with shard_map.engines[MAIN].connect() as connection:
+        catalog = _rows(connection, select(Exercise.__table__).order_by(columns.id))
+    for name, engine in shard_map.engines.items():
+        if name == MAIN:
+            continue
+        with engine.begin() as connection:
+            existing = set(connection.execute(select(columns.id)).scalars())
+            for row in catalog:
+                if row["id"] in existing:
+                    connection.execute(update(Exercise.__table__).where(columns.id == row["id"]).values(**row))
+                else:
+                    connection.execute(insert(Exercise.__table__).values(**row))
+    return len(catalog)
+
+
+def status() -> None:
+    db = SessionLocal()
+    try:
+        counts = Counter()
+        for shard, count in db.query(User.shard, func.count()).group_by(User.shard):
+            counts[shard or MAIN] += count
+    finally:
+        db.close()
+    for name in shard_map.engines:
+        print(f"  {name}: {counts.pop(name, 0)} users")
+    for shard, count in counts.items():
+        print(f"  {shard}: {count} users{' (moving)' if is_moving(shard) else ' (unknown shard)'}")
+    print(f"  {len(misplaced())} users to move")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("status", help="users per shard and pending moves")
+    move = commands.add_parser("move", help="move users onto their ring owner")
+    move.add_argument("--dry-run", action="store_true", help="list the moves without making them")
+    move.add_argument("--limit", type=int, help="move at most this many users")
+    move.add_argument(
+        "--grace", type=float, default=30,
+        help="seconds to wait after marking users as moving (longest request deadline)",
+    )
+    commands.add_parser("cleanup", help="delete rows left on shards that no longer hold their user")
+    commands.add_parser("replicate-exercises", help="copy the exercise catalog to every shard")
+    args = parser.parse_args()
+
+    if args.command == "status":
+        status()
+    elif args.command == "move":
+        moves = misplaced(args.limit)
+        if args.dry_run:
+            for user_id, _, source, target in moves:
+                print(f"  user {user_id}: {source} -> {target}")
+        else:
+            move_users(moves, args.grace)
+        print(f"🔀 {len(moves)} users {'to move' if args.dry_run else 'moved'}.")
+    elif args.command == "cleanup":
+        print(f"🧹 Removed stray rows of {cleanup()} users.")
+    else:
+        print(f"✅ Replicated {replicate_exercises()} exercises to {len(shard_map.engines) - 1} shards.")
+
+
+if __name__ == "__main__":
+    main()
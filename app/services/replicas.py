@@ -0,0 +1,219 @@
+"""
+Read-replica routing.
+
+With ``DATABASE_REPLICA_URLS`` set, endpoints marked ``@replica_reads``
+(catalog, plan and log listings) run their SELECTs on a replica chosen
+round-robin; everything else, and every statement after the request's first
+write, goes to the primary (`RoutingSession`).
+
+A background thread checks each replica every
+``REPLICA_HEALTH_CHECK_SECONDS`` with ``SELECT 1`` and, on PostgreSQL
+standbys, its replay lag; replicas that fail, lag by more than
+``REPLICA_MAX_LAG_SECONDS`` or drop a connection mid-request are skipped
+until a later check passes. With no healthy replica, reads use the primary.
+
+Read-your-writes: once a user commits a write, their requests read from the
+primary for ``READ_YOUR_WRITES_SECONDS``. Keep the lag limit below that
+window, or a user may read (and the response cache may keep) data older
+than their own write. Marks are per worker by default; set
+``READ_YOUR_WRITES_BACKEND=redis`` to share them between workers.
+
+Replicas can be two PostgreSQL instances or, for local testing, copies of a
+SQLite file.
+"""
+
+import itertools
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+import jwt
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.services.tokens import verify_token
+
+try:
+    import redis
+except ImportError:  # optional dependency
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+# Replay lag of a PostgreSQL standby; 0 when it has replayed everything it
+# received (an idle primary would otherwise look like growing lag), and
+# NULL on a server that is not a standby
+PG_REPLICATION_LAG = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+SAFE_METHODS = ("GET", "HEAD")
+
+
+def replica_reads(endpoint):
+    """Mark a read-only endpoint whose SELECTs may run on a replica."""
+    endpoint.replica_reads = True
+    return endpoint
+
+
+class RoutingSession(Session):
+    """
+    Session sending SELECTs to ``info["replica"]`` when set, and everything
+    else to the primary; after the first write it stays on the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._flushing or not getattr(clause, "is_select", False):
+            self.info["wrote"] = True
+            self.info["replica"] = None
+        elif self.info.get("replica") is not None:
+            return self.info["replica"]
+        return super().get_bind(mapper, clause=clause, **kw)
+
+
+class ReplicaSet:
+    def __init__(self, urls: list, interval_seconds: float, max_lag_seconds: float):
+        self.engines = [create_engine(url) for url in urls]
+        self.interval = interval_seconds
+        self.max_lag = max_lag_seconds
+        self._healthy = []
+        self._cycle = itertools.count()
+        self._stop = threading.Event()
+        self._thread = None
+        for engine in self.engines:
+            event.listen(engine, "handle_error", self._on_error)
+
+    def pick(self):
+        """Next healthy replica engine, or None to read from the primary."""
+        healthy = self._healthy
+        if not healthy:
+            return None
+        return healthy[next(self._cycle) % len(healthy)]
+
+    def _on_error(self, context) -> None:
+        if context.is_disconnect and context.engine in self._healthy:
+            logger.warning("Replica %s dropped a connection; skipping it", context.engine.url)
+            self._healthy = [engine for engine in self._healthy if engine is not context.engine]
+
+    def is_healthy(self, engine) -> bool:
+        try:
+            with engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+                if engine.dialect.name == "postgresql":
+                    lag = connection.execute(PG_REPLICATION_LAG).scalar()
+                    if lag is not None and lag > self.max_lag:
+                        logger.warning("Replica %s is %.1fs behind; skipping it", engine.url, lag)
+                        return False
+        except Exception as exc:
+            logger.warning("Replica %s failed its health check: %s", engine.url, exc)
+            return False
+        return True
+
+    def check(self) -> None:
+        self._healthy = [engine for engine in self.engines if self.is_healthy(engine)]
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def start(self) -> None:
+        if self.engines and self._thread is None:
+            self.check()
+            self._thread = threading.Thread(target=self._run, name="replica-health", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+class MemoryWriteMarks:
+    """Users' last write times in a bounded per-worker LRU."""
+
+    def __init__(self, window_seconds: float, max_entries: int = 100_000):
+        self.window = window_seconds
+        self.max_entries = max_entries
+        self._marks = OrderedDict()
+        self._lock = threading.Lock()
+
+    def mark(self, user_id: int) -> None:
+        with self._lock:
+            self._marks[user_id] = time.monotonic()
+            self._marks.move_to_end(user_id)
+            while len(self._marks) > self.max_entries:
+                self._marks.popitem(last=False)
+
+    def is_recent(self, user_id: int) -> bool:
+        marked = self._marks.get(user_id)
+        return marked is not None and time.monotonic() - marked < self.window
+
+
+class RedisWriteMarks:
+    """Write marks in a Redis-compatible server, expiring after the window."""
+
+    def __init__(self, url: str, window_seconds: float):
+        if redis is None:
+            raise RuntimeError("READ_YOUR_WRITES_BACKEND=redis requires the 'redis' package")
+        self.client = redis.Redis.from_url(url)
+        self.window_ms = int(window_seconds * 1000)
+
+    def mark(self, user_id: int) -> None:
+        self.client.set(f"athlos:rw:{user_id}", 1, px=self.window_ms)
+
+    def is_recent(self, user_id: int) -> bool:
+        return bool(self.client.exists(f"athlos:rw:{user_id}"))
+
+
+def make_write_marks():
+    if settings.READ_YOUR_WRITES_BACKEND == "redis":
+        return RedisWriteMarks(settings.READ_YOUR_WRITES_REDIS_URL, settings.READ_YOUR_WRITES_SECONDS)
+    if settings.READ_YOUR_WRITES_BACKEND == "memory":
+        return MemoryWriteMarks(settings.READ_YOUR_WRITES_SECONDS)
+    raise ValueError(f"Unknown READ_YOUR_WRITES_BACKEND: {settings.READ_YOUR_WRITES_BACKEND!r}")
+
+
+def _parse_urls(spec: str) -> list:
+    return [url.strip() for url in spec.split(",") if url.strip()]
+
+
+replica_set = ReplicaSet(
+    _parse_urls(settings.DATABASE_REPLICA_URLS),
+    settings.REPLICA_HEALTH_CHECK_SECONDS,
+    settings.REPLICA_MAX_LAG_SECONDS,
+)
+write_marks = make_write_marks() if replica_set.engines else None
+
+
+def mark_write(user_id: int) -> None:
+    """Send the user's reads to the primary for ``READ_YOUR_WRITES_SECONDS``."""
+    if write_marks is not None:
+        write_marks.mark(user_id)
+
+
+def _user_id(request) -> int | None:
+    # Only picks a database, so the revocation list is not consulted
+    try:
+        sub = verify_token(request.headers.get("authorization", "")).get("sub")
+        return int(sub) if sub is not None else None
+    except (jwt.PyJWTError, ValueError):
+        return None
+
+
+def route_reads(db: Session, request) -> None:
+    """Point ``db``'s reads at a replica if the request's endpoint allows it."""
+    if not replica_set.engines:
+        return
+    user_id = _user_id(request)
+    if user_id is not None:
+        @event.listens_for(db, "after_commit")
+        def after_commit(session):
+            if session.info.get("wrote"):
+                mark_write(user_id)
+
+    endpoint = getattr(request.scope.get("route"), "endpoint", None)
+    if request.method not in SAFE_METHODS or not getattr(endpoint, "replica_reads", False):
+        return
+    if user_id is not None and write_marks.is_recent(user_id):
+        return
+    db.info["replica"] = replica_set.pick()
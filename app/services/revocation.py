@@ -0,0 +1,92 @@
+"""
+Access-token revocation without a database lookup per request.
+
+Access tokens cannot be recalled once issued, so logout and refresh-token
+reuse record the token's ``jti``, or the ``sid`` shared by every token of a
+login, in ``revoked_tokens`` until all tokens it could match have expired.
+Each worker keeps those ids in memory: a background thread reloads them every
+``REVOCATION_SYNC_SECONDS`` and prunes expired rows, and revocations made by
+this worker apply immediately. A token revoked through another worker is
+accepted for at most one sync interval.
+
+The set holds one id per logout within the last ``ACCESS_TOKEN_MINUTES``, so
+it stays small enough that a Bloom filter would not save anything.
+"""
+
+import logging
+import threading
+from datetime import datetime, timezone
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.db import SessionLocal
+from app.models.revoked_token import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class RevocationList:
+    def __init__(self, interval_seconds: float):
+        self.interval = interval_seconds
+        self._ids = frozenset()
+        self._loaded = frozenset()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def is_revoked(self, claims: dict) -> bool:
+        ids = self._ids
+        return claims.get("jti") in ids or claims.get("sid") in ids
+
+    def revoke(self, db: Session, ids, expires_at: datetime) -> None:
+        """Record ``ids`` as revoked until ``expires_at`` and commit."""
+        ids = set(ids)
+        existing = {
+            jti for (jti,) in db.query(RevokedToken.jti).filter(RevokedToken.jti.in_(ids))
+        }
+        db.add_all(RevokedToken(jti=jti, expires_at=expires_at) for jti in ids - existing)
+        db.commit()
+        with self._lock:
+            self._ids = self._ids | ids
+
+    def sync(self) -> None:
+        """Prune expired rows and reload the revoked ids from the database."""
+        db = SessionLocal()
+        try:
+            now = _now()
+            db.query(RevokedToken).filter(RevokedToken.expires_at <= now).delete(synchronize_session=False)
+            db.commit()
+            loaded = frozenset(
+                jti for (jti,) in db.query(RevokedToken.jti).filter(RevokedToken.expires_at > now)
+            )
+        finally:
+            db.close()
+        with self._lock:
+            # Keep ids revoked here since the previous load; they may have
+            # been committed after this load's query ran
+            self._ids = loaded | (self._ids - self._loaded)
+            self._loaded = loaded
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.sync()
+            except Exception:
+                logger.exception("Could not sync revoked tokens")
+            self._stop.wait(self.interval)
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="revocation-sync", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+revocation_list = RevocationList(settings.REVOCATION_SYNC_SECONDS)
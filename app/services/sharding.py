@@ -0,0 +1,82 @@
+"""
+User-id sharding across several databases.
+
+The main database (``DATABASE_URL``) is always shard ``main``; it holds the
+users table and everything auth needs (tokens, idempotency keys), plus the
+master copy of the exercise catalog. ``DATABASE_SHARDS`` adds more shards
+(``"name=url,..."``), each with the full schema, a copy of the catalog and a
+stub users row for every user it holds.
+
+New users are placed by a consistent-hash ring over ``user_id`` with
+``SHARD_VNODES`` virtual nodes per shard, and their placement is recorded in
+``users.shard`` (NULL means ``main``, which covers every user created before
+sharding). Because placement is stored rather than recomputed, adding a
+shard never strands anyone: new users start landing on it right away, and
+`app.services.rebalance` moves existing users whose stored shard differs from
+their position on the ring. While a user is being moved, ``users.shard``
+reads ``"source>target"`` and their requests get 503.
+
+`get_current_user` binds the request's session to the user's shard, so
+routes need no changes; anonymous requests (the exercise catalog) use main.
+"""
+
+import bisect
+import hashlib
+
+from sqlalchemy import create_engine
+
+MAIN = "main"
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent-hash ring; adding a shard only moves keys onto the new shard."""
+
+    def __init__(self, names, vnodes: int):
+        points = sorted((_hash(f"{name}#{i}"), name) for name in names for i in range(vnodes))
+        self._hashes = [point for point, _ in points]
+        self._names = [name for _, name in points]
+
+    def owner(self, user_id: int) -> str:
+        index = bisect.bisect(self._hashes, _hash(str(user_id))) % len(self._hashes)
+        return self._names[index]
+
+
+def parse_shards(spec: str) -> dict:
+    """``"eu1=postgresql://...,eu2=sqlite:///x.db"`` -> ``{"eu1": "postgresql://...", "eu2": "sqlite:///x.db"}``."""
+    shards = {}
+    for entry in spec.split(","):
+        if not entry.strip():
+            continue
+        name, _, url = entry.partition("=")
+        name = name.strip()
+        if name == MAIN or ">" in name:
+            raise ValueError(f"Invalid shard name {name!r}")
+        shards[name] = url.strip()
+    return shards
+
+
+def is_moving(shard: str | None) -> bool:
+    return shard is not None and ">" in shard
+
+
+class ShardMap:
+    def __init__(self, main_engine, urls: dict, vnodes: int):
+        self.engines = {MAIN: main_engine}
+        self.engines.update((name, create_engine(url)) for name, url in urls.items())
+        self.ring = HashRing(self.engines, vnodes)
+
+    @property
+    def sharded(self) -> bool:
+        return len(self.engines) > 1
+
+    def place(self, user_id: int) -> str:
+        """Shard a new user is created on."""
+        return self.ring.owner(user_id) if self.sharded else MAIN
+
+    def engine_for(self, shard: str | None):
+        """Engine holding the data of a user whose ``users.shard`` is ``shard``."""
+        return self.engines[shard or MAIN]
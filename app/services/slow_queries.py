@@ -0,0 +1,145 @@
+"""
+Slow-query log.
+
+Statements slower than ``SLOW_QUERY_THRESHOLD_MS`` are logged with the route
+that issued them, their normalised SQL, redacted parameters and duration,
+and kept in a ring buffer served at ``GET /admin/slow-queries``.
+
+With ``SLOW_QUERY_EXPLAIN`` on, the plan of the first slow occurrence of each
+normalised SELECT is captured: ``EXPLAIN (ANALYZE, BUFFERS)`` on PostgreSQL,
+``EXPLAIN QUERY PLAN`` on SQLite. ANALYZE runs the query a second time, so
+only reads are explained, and on a connection of its own in a background
+thread: a failing or timed-out EXPLAIN cannot abort the request's
+transaction or add to its latency. The entry's plan is filled in when it
+finishes.
+"""
+
+import logging
+import re
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from app.config import settings
+from app.services.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERIES = REGISTRY.counter(
+    "athlos_db_slow_queries_total",
+    "Statements slower than SLOW_QUERY_THRESHOLD_MS.",
+    labels=("route",),
+)
+
+# Normalised statements already explained; bounded so ad-hoc SQL cannot grow it
+MAX_EXPLAINED = 1_000
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|(?<!:):\w+|\$\d+")
+_SPACE = re.compile(r"\s+")
+
+
+def normalise(statement: str) -> str:
+    """SQL with literals and bind markers replaced by ``?`` and IN lists collapsed."""
+    sql = _STRING.sub("?", statement)
+    sql = _PLACEHOLDER.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _IN_LIST.sub("(...)", sql)
+    return _SPACE.sub(" ", sql).strip()
+
+
+def redact(parameters):
+    """Parameter shapes without values: each value is replaced by its type name."""
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return None
+
+
+def _explain(engine, statement: str, parameters) -> str:
+    dialect = engine.dialect.name
+    if dialect == "postgresql":
+        prefix = "EXPLAIN (ANALYZE, BUFFERS) "
+    elif dialect == "sqlite":
+        prefix = "EXPLAIN QUERY PLAN "
+    else:
+        return f"EXPLAIN is not supported for {dialect}"
+
+    # A raw DBAPI connection from the pool: no SQLAlchemy events, so the
+    # EXPLAIN itself is not counted or logged, and its transaction is rolled
+    # back when the connection returns to the pool.
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        try:
+            cursor.execute(prefix + statement, parameters)
+            return "\n".join(" ".join(str(col) for col in row) for row in cursor.fetchall())
+        finally:
+            cursor.close()
+    finally:
+        connection.close()
+
+
+class SlowQueryLog:
+    def __init__(self, size: int):
+        self.entries = deque(maxlen=size)
+        self._explained: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._explainer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slow-query-explain")
+
+    def _explain_into(self, entry: dict, engine, statement: str, parameters) -> None:
+        try:
+            plan = _explain(engine, statement, parameters)
+        except Exception as e:
+            plan = f"EXPLAIN failed: {e}"
+        with self._lock:
+            entry["plan"] = plan
+
+    def _first_occurrence(self, sql: str) -> bool:
+        with self._lock:
+            if sql in self._explained:
+                return False
+            self._explained[sql] = True
+            while len(self._explained) > MAX_EXPLAINED:
+                self._explained.popitem(last=False)
+            return True
+
+    def record(self, conn, route: str, statement: str, parameters, executemany: bool, seconds: float):
+        sql = normalise(statement)
+        entry = {
+            "at": datetime.now(timezone.utc).isoformat(),
+            "route": route,
+            "statement": sql,
+            "parameters": None if executemany else redact(parameters),
+            "duration_ms": round(seconds * 1000, 3),
+            "plan": None,
+        }
+        logger.warning("Slow query (%.1f ms) on %s: %s", seconds * 1000, route, sql)
+        SLOW_QUERIES.inc(route)
+
+        if (
+            settings.SLOW_QUERY_EXPLAIN
+            and not executemany
+            and sql.upper().startswith("SELECT")
+            and self._first_occurrence(sql)
+        ):
+            self._explainer.submit(self._explain_into, entry, conn.engine, statement, parameters)
+
+        with self._lock:
+            self.entries.append(entry)
+
+    def snapshot(self) -> list:
+        with self._lock:
+            return [dict(entry) for entry in reversed(self.entries)]
+
+    def clear(self) -> None:
+        with self._lock:
+            self.entries.clear()
+            self._explained.clear()
+
+
+slow_query_log = SlowQueryLog(settings.SLOW_QUERY_BUFFER_SIZE)
@@ -0,0 +1,107 @@
+"""
+Delta sync for mobile clients.
+
+Every synced table carries an indexed ``updated_at`` column and deletions
+leave a row in ``tombstones``, so a client holding a watermark only needs
+the rows changed after it instead of re-downloading everything.
+"""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.db import SessionLocal, shard_map
+from app.models.workout_plan import WorkoutPlan
+from app.models.plan_item import PlanItem
+from app.models.workout_log import WorkoutLog
+from app.models.weight_log import WeightLog
+from app.models.goal import Goal
+from app.models.tombstone import RESYNC_ENTITY, Tombstone
+from app.services.archive import all_archived_rows, reaches_archive
+
+
+def db_now(db: Session) -> datetime:
+    """
+    Current time according to the database, as a naive timestamp comparable
+    with the ``updated_at``/``deleted_at`` columns.
+    """
+    now = db.execute(select(func.now())).scalar_one()
+    if isinstance(now, str):
+        now = datetime.fromisoformat(now)
+    return now.replace(tzinfo=None)
+
+
+def collect_changes(db: Session, user_id: int, since: datetime | None) -> dict:
+    """
+    Return every row of the user's synced tables changed after ``since`` and
+    the tombstones recorded after it, plus the watermark for the next call.
+
+    Without ``since``, or with a watermark older than the tombstone retention
+    window, a full snapshot is returned with ``full`` set. Archived logs only
+    appear in full snapshots; they never change once archived.
+    """
+    watermark = db_now(db)
+
+    retention = timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+    full = since is None or since.replace(tzinfo=None) < watermark - retention
+    cutoff = None if full else since.replace(tzinfo=None) - timedelta(seconds=settings.SYNC_OVERLAP_SECONDS)
+
+    deleted = []
+    if not full:
+        tombstones = db.query(Tombstone.entity, Tombstone.entity_id, Tombstone.deleted_at).filter(
+            Tombstone.user_id == user_id,
+            Tombstone.deleted_at > cutoff
+        ).all()
+        if any(entity == RESYNC_ENTITY for entity, _, _ in tombstones):
+            # The user's rows moved to another shard since the client's last
+            # sync and have new ids; the client must start over
+            full, cutoff = True, None
+        else:
+            deleted = [
+                {"entity": entity, "id": entity_id, "deleted_at": deleted_at}
+                for entity, entity_id, deleted_at in tombstones
+            ]
+
+    def changed(query, model):
+        if cutoff is not None:
+            query = query.filter(model.updated_at > cutoff)
+        return query.all()
+
+    archived = all_archived_rows(db, user_id) if full and reaches_archive(None) else {}
+
+    def with_archived(query, model):
+        return archived.get(model.__tablename__, []) + changed(query, model)
+
+    return {
+        "watermark": watermark,
+        "full": full,
+        "plans": changed(db.query(WorkoutPlan).filter(WorkoutPlan.user_id == user_id), WorkoutPlan),
+        "plan_items": changed(
+            db.query(PlanItem).join(WorkoutPlan, PlanItem.plan_id == WorkoutPlan.id)
+            .filter(WorkoutPlan.user_id == user_id),
+            PlanItem,
+        ),
+        "workout_logs": with_archived(db.query(WorkoutLog).filter(WorkoutLog.user_id == user_id), WorkoutLog),
+        "weight_logs": with_archived(db.query(WeightLog).filter(WeightLog.user_id == user_id), WeightLog),
+        "goals": changed(db.query(Goal).filter(Goal.user_id == user_id), Goal),
+        "deleted": deleted,
+    }
+
+
+def prune_tombstones(db: Session) -> int:
+    """Delete tombstones older than the retention window. Returns the count."""
+    cutoff = db_now(db) - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+    deleted = db.query(Tombstone).filter(Tombstone.deleted_at < cutoff).delete(synchronize_session=False)
+    db.commit()
+    return deleted
+
+
+if __name__ == "__main__":
+    for name, shard_engine in shard_map.engines.items():
+        db = SessionLocal(bind=shard_engine)
+        try:
+            print(f"🧹 Pruned {prune_tombstones(db)} tombstones on {name}.")
+        finally:
+            db.close()
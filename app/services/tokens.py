@@ -0,0 +1,164 @@
+"""
+JWT signing and verification with key rotation and a decoded-claims cache.
+
+New tokens are signed with the key named by ``JWT_ACTIVE_KID`` and carry its
+id in the ``kid`` header. Verification picks the key by ``kid``, so to rotate,
+add a new key, make it active, and drop the old one once the tokens it signed
+have expired; nobody has to log in again. Tokens without a ``kid`` (issued
+before any keys were configured, or while ``JWT_ACTIVE_KID`` is empty) are
+signed and verified with ``JWT_SECRET``.
+
+``JWT_KEYS`` is a comma separated list of ``kid:ALG:value`` entries. For HS256
+the value is the shared secret; for ES256 and EdDSA it is the path of a PEM
+file. A private key signs and verifies; a public key only verifies. The
+asymmetric algorithms need the optional ``cryptography`` package, and their
+public keys are published at ``/auth/jwks.json`` so other services can verify
+tokens without calling us.
+
+Decoded claims are kept in a per-process LRU keyed by the token's SHA-256
+until the token's ``exp``, so a token seen recently is not verified again.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import jwt
+from jwt.algorithms import get_default_algorithms, has_crypto
+
+from app.config import settings
+from app.services.metrics import REGISTRY
+
+ALGORITHMS = ("HS256", "ES256", "EdDSA")
+
+CLAIMS_CACHE_HITS = REGISTRY.counter(
+    "athlos_jwt_claims_cache_hits_total", "Tokens whose claims were served from the decoded-claims cache."
+)
+CLAIMS_CACHE_MISSES = REGISTRY.counter(
+    "athlos_jwt_claims_cache_misses_total", "Tokens that had to be verified."
+)
+
+
+class TokenKey:
+    """One key of the ring; ``signing_key`` is None for verify-only keys."""
+
+    def __init__(self, kid: str | None, algorithm: str, signing_key, verifying_key):
+        self.kid = kid
+        self.algorithm = algorithm
+        self.signing_key = signing_key
+        self.verifying_key = verifying_key
+
+    @classmethod
+    def parse(cls, entry: str) -> "TokenKey":
+        kid, algorithm, value = (part.strip() for part in entry.split(":", 2))
+        if algorithm not in ALGORITHMS:
+            raise RuntimeError(f"JWT key {kid!r}: algorithm must be one of {', '.join(ALGORITHMS)}")
+        if algorithm == "HS256":
+            return cls(kid, algorithm, value, value)
+        if not has_crypto:
+            raise RuntimeError(f"JWT key {kid!r}: {algorithm} requires the 'cryptography' package")
+        with open(value, "rb") as f:
+            key = get_default_algorithms()[algorithm].prepare_key(f.read())
+        if hasattr(key, "public_key"):
+            return cls(kid, algorithm, key, key.public_key())
+        return cls(kid, algorithm, None, key)
+
+    def jwk(self) -> dict:
+        jwk = get_default_algorithms()[self.algorithm].to_jwk(self.verifying_key, as_dict=True)
+        return {**jwk, "kid": self.kid, "alg": self.algorithm, "use": "sig"}
+
+
+class KeyRing:
+    def __init__(self, keys: list, active_kid: str | None, legacy_secret: str):
+        self.keys = {key.kid: key for key in keys}
+        self.legacy = TokenKey(None, "HS256", legacy_secret, legacy_secret)
+        if active_kid:
+            active = self.keys.get(active_kid)
+            if active is None or active.signing_key is None:
+                raise RuntimeError(f"JWT_ACTIVE_KID {active_kid!r} is not a signing key in JWT_KEYS")
+            self.active = active
+        else:
+            self.active = self.legacy
+
+    @classmethod
+    def from_settings(cls) -> "KeyRing":
+        entries = [entry for entry in settings.JWT_KEYS.split(",") if entry.strip()]
+        return cls([TokenKey.parse(entry) for entry in entries], settings.JWT_ACTIVE_KID, settings.JWT_SECRET)
+
+    def sign(self, claims: dict) -> str:
+        headers = {"kid": self.active.kid} if self.active.kid else None
+        return jwt.encode(claims, self.active.signing_key, algorithm=self.active.algorithm, headers=headers)
+
+    def verify(self, token: str) -> dict:
+        kid = jwt.get_unverified_header(token).get("kid")
+        key = self.keys.get(kid) if kid is not None else self.legacy
+        if key is None:
+            raise jwt.InvalidTokenError("Unknown key id")
+        return jwt.decode(token, key.verifying_key, algorithms=[key.algorithm])
+
+    def jwks(self) -> dict:
+        return {"keys": [key.jwk() for key in self.keys.values() if key.algorithm != "HS256"]}
+
+
+class ClaimsCache:
+    """Bounded LRU of verified claims keyed by token hash, valid until ``exp``."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> dict | None:
+        key = self._key(token)
+        with self._lock:
+            claims = self._entries.get(key)
+            if claims is None:
+                return None
+            if claims["exp"] <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return claims
+
+    def put(self, token: str, claims: dict) -> None:
+        # Tokens that never expire are not cached: nothing would bound them
+        if not isinstance(claims.get("exp"), (int, float)) or self.max_entries <= 0:
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = claims
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+keyring = KeyRing.from_settings()
+claims_cache = ClaimsCache(settings.JWT_CLAIMS_CACHE_SIZE)
+
+
+def sign_token(claims: dict) -> str:
+    return keyring.sign(claims)
+
+
+def verify_token(token: str) -> dict:
+    """
+    Claims of a valid token, from the cache when it was verified recently.
+    Raises `jwt.PyJWTError` if the token is invalid or expired.
+    """
+    claims = claims_cache.get(token)
+    if claims is not None:
+        CLAIMS_CACHE_HITS.inc()
+        return dict(claims)
+    CLAIMS_CACHE_MISSES.inc()
+    claims = keyring.verify(token)
+    claims_cache.put(token, claims)
+    return dict(claims)
@@ -0,0 +1,188 @@
+"""
+Training-volume analytics.
+
+Volume is computed per muscle group from a precomputed exercise -> muscle
+incidence matrix. Plan items and workout logs are loaded as plain column
+tuples, packed into numpy arrays and reduced with matrix products, so the
+cost stays linear in the number of rows with no per-row Python work beyond
+building the arrays.
+"""
+
+from datetime import date, timedelta
+from threading import Lock
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.models.exercise import Exercise
+
+# Order of the volume metrics along the last axis of every volume array
+METRICS = ("sets", "reps", "duration_seconds", "distance_meters")
+
+# Longest history report, about ten years; the arrays and the response grow
+# with the number of weeks, which the client's range or log dates decide
+MAX_WEEKS = 530
+
+
+class RangeTooLong(ValueError):
+    pass
+
+
+class MuscleIncidence:
+    """
+    Binary matrix of shape (n_exercises, n_muscles) where ``matrix[e, m]`` is 1
+    when exercise ``e`` lists muscle ``m`` in its ``target_muscles``.
+    """
+
+    def __init__(self, rows):
+        muscles = {}
+        pairs = []
+        exercise_ids = []
+        for exercise_id, target_muscles in rows:
+            exercise_ids.append(exercise_id)
+            for name in (target_muscles or "").split(","):
+                name = name.strip()
+                if name:
+                    pairs.append((len(exercise_ids) - 1, muscles.setdefault(name, len(muscles))))
+
+        self.muscles = list(muscles)
+        self.exercise_ids = np.asarray(exercise_ids, dtype=np.int64)
+        self.matrix = np.zeros((len(exercise_ids), len(muscles)), dtype=np.float64)
+        if pairs:
+            e, m = np.asarray(pairs, dtype=np.int64).T
+            self.matrix[e, m] = 1.0
+
+        # Sorted ids let us map exercise ids to matrix rows with searchsorted
+        self._order = np.argsort(self.exercise_ids)
+        self._sorted_ids = self.exercise_ids[self._order]
+
+    def rows_for(self, exercise_ids: np.ndarray) -> np.ndarray:
+        """Map exercise ids to matrix row indices (-1 for unknown ids)."""
+        if not len(self._sorted_ids):
+            return np.full(len(exercise_ids), -1, dtype=np.int64)
+        pos = np.searchsorted(self._sorted_ids, exercise_ids)
+        pos = np.clip(pos, 0, len(self._sorted_ids) - 1)
+        found = self._sorted_ids[pos] == exercise_ids
+        return np.where(found, self._order[pos], -1)
+
+
+_incidence: MuscleIncidence | None = None
+_incidence_lock = Lock()
+
+
+def get_incidence(db: Session, exercise_ids=()) -> MuscleIncidence:
+    """
+    Return the cached incidence matrix, rebuilding it when the catalog has
+    grown and one of ``exercise_ids`` is not known yet.
+    """
+    global _incidence
+    incidence = _incidence
+    if incidence is not None:
+        missing = np.setdiff1d(np.asarray(exercise_ids, dtype=np.int64), incidence.exercise_ids)
+        if not len(missing):
+            return incidence
+
+    with _incidence_lock:
+        rows = db.query(Exercise.id, Exercise.target_muscles).all()
+        _incidence = MuscleIncidence(rows)
+        return _incidence
+
+
+def item_metrics(sets, reps, duration_seconds, distance_meters) -> np.ndarray:
+    """
+    Build the (n, len(METRICS)) metric matrix for prescribed or logged work.
+
+    A missing ``sets`` value counts as a single set; every other missing value
+    contributes nothing.
+    """
+    sets = np.nan_to_num(np.asarray(sets, dtype=np.float64), nan=1.0)
+    reps = np.nan_to_num(np.asarray(reps, dtype=np.float64))
+    duration = np.nan_to_num(np.asarray(duration_seconds, dtype=np.float64))
+    distance = np.nan_to_num(np.asarray(distance_meters, dtype=np.float64))
+    return np.column_stack((sets, sets * reps, sets * duration, sets * distance))
+
+
+def _columns(rows, count):
+    """Transpose row tuples into per-column float arrays (None -> nan)."""
+    if not rows:
+        return [np.empty(0, dtype=np.float64) for _ in range(count)]
+    data = np.array(rows, dtype=np.float64)
+    return [data[:, i] for i in range(count)]
+
+
+def _to_muscle_dicts(incidence: MuscleIncidence, volume: np.ndarray):
+    """Convert a (n_muscles, len(METRICS)) array into response dicts."""
+    result = []
+    for m in np.flatnonzero(volume.any(axis=1)):
+        entry = {"muscle": incidence.muscles[m]}
+        entry.update(zip(METRICS, volume[m].tolist()))
+        result.append(entry)
+    result.sort(key=lambda e: (-e["sets"], e["muscle"]))
+    return result
+
+
+def plan_weekly_volume(db: Session, rows, frequency_per_week: int):
+    """
+    Weekly volume per muscle for a plan.
+
+    ``rows`` are ``(exercise_id, sets, reps, duration_seconds, distance_meters)``
+    tuples for the plan's items. A single pass of the plan is multiplied by
+    ``frequency_per_week``.
+    """
+    exercise_ids, *values = _columns(rows, 5)
+    exercise_ids = exercise_ids.astype(np.int64)
+    incidence = get_incidence(db, exercise_ids)
+
+    idx = incidence.rows_for(exercise_ids)
+    known = idx >= 0
+    metrics = item_metrics(*values)[known]
+
+    # (n_items, n_muscles).T @ (n_items, n_metrics) -> (n_muscles, n_metrics)
+    volume = incidence.matrix[idx[known]].T @ metrics
+    return _to_muscle_dicts(incidence, volume * frequency_per_week)
+
+
+def _week_start(day: date) -> date:
+    return day - timedelta(days=day.weekday())
+
+
+def history_weekly_volume(db: Session, rows, from_date: date | None, to_date: date | None):
+    """
+    Volume per muscle for every week in the requested range.
+
+    ``rows`` are ``(log_date, exercise_id, sets, reps, duration_seconds,
+    distance_meters)`` tuples for logs that recorded an exercise. Weeks start
+    on Monday. Raises `RangeTooLong` when the range spans more than
+    ``MAX_WEEKS`` weeks.
+    """
+    if not rows and (from_date is None or to_date is None):
+        return []
+
+    dates = np.array([r[0] for r in rows], dtype="datetime64[D]")
+    exercise_ids, *values = _columns([r[1:] for r in rows], 5)
+    exercise_ids = exercise_ids.astype(np.int64)
+
+    first = _week_start(from_date or dates.min().item())
+    last = _week_start(to_date or dates.max().item())
+    n_weeks = (last - first).days // 7 + 1
+    if n_weeks > MAX_WEEKS:
+        raise RangeTooLong(f"Volume covers at most {MAX_WEEKS} weeks; narrow the range with 'from' and 'to'")
+
+    incidence = get_incidence(db, exercise_ids)
+    idx = incidence.rows_for(exercise_ids)
+    week = (dates - np.datetime64(first, "D")).astype(np.int64) // 7
+    known = idx >= 0
+
+    # Scatter logs into a (week, exercise, metric) tensor, then contract the
+    # exercise axis with the incidence matrix in one product.
+    per_exercise = np.zeros((n_weeks, len(incidence.exercise_ids), len(METRICS)))
+    np.add.at(per_exercise, (week[known], idx[known]), item_metrics(*values)[known])
+    volume = np.einsum("wek,em->wmk", per_exercise, incidence.matrix)
+
+    return [
+        {
+            "week_start": first + timedelta(weeks=w),
+            "muscles": _to_muscle_dicts(incidence, volume[w]),
+        }
+        for w in range(n_weeks)
+    ]
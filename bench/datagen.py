@@ -0,0 +1,235 @@
+"""
+Synthetic data generator for load tests.
+
+Bulk-creates N users, each with a few workout plans and plan items, years of
+workout and weight logs, goals and finished workout sessions, into the
+database configured by ``DATABASE_URL``. Output is deterministic for a given
+``--seed``. Rows are written with ``COPY`` on PostgreSQL and batched
+``executemany`` inserts elsewhere; ids are assigned here so child rows can
+reference their parents without a round trip.
+
+Users are ``bench{i}@example.com`` with the password ``--password``, which is
+what ``bench.load`` logs in with. Run from the repository root after
+migrating:
+
+    python -m bench.datagen --users 1000 --years 3
+"""
+
+import argparse
+import csv
+import io
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import func, insert, select, text
+
+from app.db import engine
+from app.models.exercise import Exercise
+from app.models.goal import Goal
+from app.models.plan_item import PlanItem
+from app.models.user import User
+from app.models.weight_log import WeightLog
+from app.models.workout_log import WorkoutLog
+from app.models.workout_plan import WorkoutPlan
+from app.models.workout_session import WorkoutSession
+from app.seed_exercises import seed_exercises
+
+EMAIL = "bench{}@example.com"
+BATCH_SIZE = 5_000
+
+PLAN_TITLES = ("Full Body", "Push Pull Legs", "Upper / Lower", "Conditioning", "5x5 Strength", "Mobility")
+NOTES = (None, None, None, "Felt strong", "Tired today", "New PR", "Short on time", "Focus on form")
+
+
+def email(i: int) -> str:
+    return EMAIL.format(i)
+
+
+def _next_id(conn, model) -> int:
+    return (conn.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+
+def _copy(conn, table, rows):
+    columns = list(rows[0])
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(["\\N" if row[c] is None else row[c] for c in columns])
+    buffer.seek(0)
+    cursor = conn.connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+            buffer,
+        )
+    finally:
+        cursor.close()
+
+
+def write(conn, model, rows):
+    """Insert ``rows`` (dicts with the same keys) into ``model``'s table in batches."""
+    if not rows:
+        return
+    table = model.__table__
+    for start in range(0, len(rows), BATCH_SIZE):
+        chunk = rows[start:start + BATCH_SIZE]
+        if conn.dialect.name == "postgresql" and conn.dialect.driver == "psycopg2":
+            _copy(conn, table, chunk)
+        else:
+            conn.execute(insert(table), chunk)
+
+
+def _fix_sequences(conn, models):
+    """Move PostgreSQL id sequences past the explicitly assigned ids."""
+    if conn.dialect.name != "postgresql":
+        return
+    for model in models:
+        table = model.__tablename__
+        conn.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+            f"(SELECT COALESCE(MAX(id), 1) FROM {table}))"
+        ))
+
+
+class Generator:
+    def __init__(self, rng: random.Random, exercise_ids: list, years: int, today: date, next_ids: dict):
+        self.rng = rng
+        self.exercise_ids = exercise_ids
+        self.first_day = today - timedelta(days=365 * years)
+        self.today = today
+        self.next_ids = next_ids
+        self.rows = {model: [] for model in (User, WorkoutPlan, PlanItem, WorkoutLog, WeightLog, Goal, WorkoutSession)}
+        self.counts = {}
+
+    def user(self, user_id: int, index: int, password_hash: str):
+        rng = self.rng
+        self.rows[User].append({"id": user_id, "email": email(index), "password_hash": password_hash})
+
+        plans = []
+        for _ in range(rng.randint(1, 3)):
+            plan_id = self.new_id(WorkoutPlan)
+            frequency = rng.randint(2, 5)
+            self.rows[WorkoutPlan].append({
+                "id": plan_id,
+                "user_id": user_id,
+                "title": rng.choice(PLAN_TITLES),
+                "goal_text": rng.choice((None, "Build muscle", "Lose fat", "Get stronger")),
+                "frequency_per_week": frequency,
+                "session_duration_minutes": rng.choice((30, 45, 60, 75, 90)),
+            })
+            items = []
+            for order_index, exercise_id in enumerate(rng.sample(self.exercise_ids, rng.randint(4, 8)), start=1):
+                item = {
+                    "id": self.new_id(PlanItem),
+                    "plan_id": plan_id,
+                    "exercise_id": exercise_id,
+                    "sets": rng.randint(2, 5),
+                    "reps": rng.choice((5, 8, 10, 12, 15)),
+                    "duration_seconds": None,
+                    "distance_meters": None,
+                    "order_index": order_index,
+                    "notes": rng.choice(NOTES),
+                }
+                self.rows[PlanItem].append(item)
+                items.append(item)
+            plans.append((plan_id, frequency, items))
+
+        # Training history: the user follows one of their plans each week
+        weight = rng.uniform(55, 110)
+        day = self.first_day + timedelta(days=rng.randint(0, 30))
+        while day < self.today:
+            plan_id, frequency, items = rng.choice(plans)
+            for offset in sorted(rng.sample(range(7), min(frequency, 7))):
+                session_day = day + timedelta(days=offset)
+                if session_day >= self.today or rng.random() < 0.15:
+                    continue
+                self._session(user_id, plan_id, items, session_day)
+            weight += rng.gauss(-0.05, 0.4)
+            self.rows[WeightLog].append({"user_id": user_id, "log_date": day, "weight": round(weight, 1)})
+            day += timedelta(days=7)
+
+        for _ in range(rng.randint(0, 3)):
+            kind = rng.choice(("weight", "exercise"))
+            self.rows[Goal].append({
+                "user_id": user_id,
+                "type": kind,
+                "target_value": round(weight - rng.uniform(2, 10), 1) if kind == "weight" else rng.randint(5, 50),
+                "deadline": self.today + timedelta(days=rng.randint(30, 365)),
+                "exercise_id": rng.choice(self.exercise_ids) if kind == "exercise" else None,
+            })
+
+    def _session(self, user_id, plan_id, items, day):
+        started = datetime.combine(day, datetime.min.time()) + timedelta(hours=self.rng.randint(6, 20))
+        self.rows[WorkoutSession].append({
+            "id": self.new_id(WorkoutSession),
+            "user_id": user_id,
+            "plan_id": plan_id,
+            "started_at": started,
+            "ended_at": started + timedelta(minutes=self.rng.randint(25, 95)),
+            "current_index": len(items) + 1,
+        })
+        for item in items:
+            self.rows[WorkoutLog].append({
+                "user_id": user_id,
+                "plan_id": plan_id,
+                "log_date": day,
+                "notes": self.rng.choice(NOTES),
+                "exercise_id": item["exercise_id"],
+                "sets": item["sets"],
+                "reps": item["reps"],
+                "duration_seconds": None,
+                "distance_meters": None,
+            })
+
+    def new_id(self, model) -> int:
+        self.next_ids[model] += 1
+        return self.next_ids[model] - 1
+
+    def flush(self, conn):
+        # Parents before children
+        for model in (User, WorkoutPlan, PlanItem, WorkoutSession, WorkoutLog, WeightLog, Goal):
+            write(conn, model, self.rows[model])
+            self.counts[model] = self.counts.get(model, 0) + len(self.rows[model])
+            self.rows[model] = []
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--years", type=int, default=2, help="years of workout/weight history per user")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--start", type=int, default=0, help="index of the first bench user (to add more later)")
+    parser.add_argument("--password", default="benchpass")
+    args = parser.parse_args()
+
+    seed_exercises()
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        exercise_ids = list(conn.execute(select(Exercise.id).order_by(Exercise.id)).scalars())
+        taken = conn.execute(
+            select(func.count()).select_from(User).where(User.email == email(args.start))
+        ).scalar()
+        if taken:
+            parser.error(f"{email(args.start)} already exists; pass --start to add more users")
+
+        next_ids = {model: _next_id(conn, model) for model in (User, WorkoutPlan, PlanItem, WorkoutSession)}
+        generator = Generator(random.Random(args.seed), exercise_ids, args.years, date.today(), next_ids)
+        # bcrypt is deliberately slow; every bench user shares one hash
+        password_hash = User.hash_password(args.password)
+
+        for index in range(args.start, args.start + args.users):
+            generator.user(generator.new_id(User), index, password_hash)
+            if len(generator.rows[WorkoutLog]) >= BATCH_SIZE:
+                generator.flush(conn)
+        generator.flush(conn)
+        _fix_sequences(conn, (User, WorkoutPlan, PlanItem, WorkoutSession, WorkoutLog, WeightLog, Goal))
+
+    elapsed = time.perf_counter() - started
+    for model, count in generator.counts.items():
+        print(f"{model.__tablename__:<20}{count:>12,}")
+    print(f"Generated in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
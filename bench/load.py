@@ -0,0 +1,343 @@
+"""
+Open-loop HTTP load driver.
+
+Replays a weighted traffic mix (logins, token refreshes, dashboard and list
+reads, workout-mode steps, log writes, sync) against a running server at a
+fixed request rate, as users created by ``bench.datagen``. Requests are started on schedule
+whether or not earlier ones have finished, so server slowdowns show up as
+latency instead of a lower request rate.
+
+Reports p50/p95/p99 latency per route and writes them, with the run
+parameters and git revision, to a JSON file; ``--compare`` prints the change
+against an earlier result file.
+
+The driver sends everything from one address, so start the server with the
+rate limiter off:
+
+    python -m bench.datagen --users 200
+    RATE_LIMIT_ENABLED=false uvicorn app.main:app --workers 4 &
+    python -m bench.load --users 200 --rps 100 --duration 60 --out results.json
+    python -m bench.load ... --out new.json --compare results.json
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+
+import httpx
+
+# Same accounts as bench.datagen; not imported from there so the driver can
+# run without the app's settings
+EMAIL = "bench{}@example.com"
+
+# (weight, route label, operation name)
+MIX = (
+    (2, "POST /auth/login", "login"),
+    (3, "POST /auth/refresh", "refresh"),
+    (20, "GET /me/dashboard", "dashboard"),
+    (10, "GET /plans/", "plans"),
+    (8, "GET /plans/{plan_id}", "plan"),
+    (10, "GET /tracking/workouts", "workouts"),
+    (5, "GET /tracking/weights", "weights"),
+    (4, "GET /tracking/goals", "goals"),
+    (4, "GET /tracking/volume", "volume"),
+    (5, "GET /sync", "sync"),
+    (16, "workout-mode step", "workout_step"),
+    (10, "POST /tracking/workouts", "log_workout"),
+    (6, "POST /tracking/weights", "log_weight"),
+)
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(q / 100 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def record(self, route: str, status: int, seconds: float):
+        self.latencies[route].append(seconds)
+        self.statuses[route][status] += 1
+        if status >= 500 or status == 0:
+            self.errors[route] += 1
+
+    def summary(self, elapsed: float) -> dict:
+        routes = {}
+        everything = []
+        for route in sorted(self.latencies):
+            values = sorted(self.latencies[route])
+            everything.extend(values)
+            routes[route] = self._stats(values, self.errors[route])
+            routes[route]["statuses"] = {str(k): v for k, v in sorted(self.statuses[route].items())}
+        everything.sort()
+        overall = self._stats(everything, sum(self.errors.values()))
+        overall["achieved_rps"] = round(len(everything) / elapsed, 2) if elapsed else 0.0
+        return {"overall": overall, "routes": routes}
+
+    @staticmethod
+    def _stats(values: list, errors: int) -> dict:
+        return {
+            "count": len(values),
+            "errors": errors,
+            "mean_ms": round(sum(values) / len(values) * 1000, 2) if values else 0.0,
+            "p50_ms": round(percentile(values, 50) * 1000, 2),
+            "p95_ms": round(percentile(values, 95) * 1000, 2),
+            "p99_ms": round(percentile(values, 99) * 1000, 2),
+            "max_ms": round(values[-1] * 1000, 2) if values else 0.0,
+        }
+
+
+class VirtualUser:
+    def __init__(self, index: int, password: str):
+        self.email = EMAIL.format(index)
+        self.password = password
+        self.token = None
+        self.refresh_token = None
+        self.plan_ids = []
+        self.session_id = None
+        self.lock = asyncio.Lock()
+
+    @property
+    def headers(self) -> dict:
+        return {"Authorization": self.token}
+
+
+class Driver:
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, rng: random.Random):
+        self.client = client
+        self.recorder = recorder
+        self.rng = rng
+
+    async def request(self, route: str, method: str, url: str, **kwargs) -> httpx.Response | None:
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.recorder.record(route, 0, time.perf_counter() - started)
+            return None
+        self.recorder.record(route, response.status_code, time.perf_counter() - started)
+        return response
+
+    async def _setup_request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        # The server sheds the login burst with 503 + Retry-After; wait it out
+        while True:
+            response = await self.client.request(method, url, **kwargs)
+            if response.status_code != 503:
+                response.raise_for_status()
+                return response
+            await asyncio.sleep(float(response.headers.get("retry-after", 1)))
+
+    async def setup(self, user: VirtualUser):
+        """Log in and learn the user's plans; not recorded."""
+        response = await self._setup_request(
+            "POST", "/auth/login", json={"email": user.email, "password": user.password}
+        )
+        user.token, user.refresh_token = response.json()["access_token"], response.json()["refresh_token"]
+        plans = await self._setup_request("GET", "/plans/", headers=user.headers)
+        user.plan_ids = [plan["id"] for plan in plans.json()]
+
+    async def login(self, user):
+        async with user.lock:
+            response = await self.request(
+                "POST /auth/login", "POST", "/auth/login", json={"email": user.email, "password": user.password}
+            )
+            if response is not None and response.status_code == 200:
+                user.token, user.refresh_token = response.json()["access_token"], response.json()["refresh_token"]
+
+    async def refresh(self, user):
+        async with user.lock:
+            response = await self.request(
+                "POST /auth/refresh", "POST", "/auth/refresh", json={"refresh_token": user.refresh_token}
+            )
+            if response is not None and response.status_code == 200:
+                user.token, user.refresh_token = response.json()["access_token"], response.json()["refresh_token"]
+
+    async def dashboard(self, user):
+        await self.request("GET /me/dashboard", "GET", "/me/dashboard", headers=user.headers)
+
+    async def plans(self, user):
+        await self.request("GET /plans/", "GET", "/plans/", headers=user.headers)
+
+    async def plan(self, user):
+        if user.plan_ids:
+            plan_id = self.rng.choice(user.plan_ids)
+            await self.request("GET /plans/{plan_id}", "GET", f"/plans/{plan_id}", headers=user.headers)
+
+    async def workouts(self, user):
+        await self.request("GET /tracking/workouts", "GET", "/tracking/workouts", headers=user.headers)
+
+    async def weights(self, user):
+        await self.request("GET /tracking/weights", "GET", "/tracking/weights", headers=user.headers)
+
+    async def goals(self, user):
+        await self.request("GET /tracking/goals", "GET", "/tracking/goals", headers=user.headers)
+
+    async def volume(self, user):
+        today = date.today()
+        params = {"from": (today - timedelta(weeks=12)).isoformat(), "to": today.isoformat()}
+        await self.request("GET /tracking/volume", "GET", "/tracking/volume", params=params, headers=user.headers)
+
+    async def sync(self, user):
+        since = (datetime.now(timezone.utc) - timedelta(hours=self.rng.randint(1, 72))).isoformat()
+        await self.request("GET /sync", "GET", "/sync", params={"since": since}, headers=user.headers)
+
+    async def workout_step(self, user):
+        """Start a session, complete its next exercise, or finish it."""
+        async with user.lock:
+            if user.session_id is None:
+                if not user.plan_ids:
+                    return
+                plan_id = self.rng.choice(user.plan_ids)
+                response = await self.request(
+                    "POST /workout-mode/start/{plan_id}", "POST", f"/workout-mode/start/{plan_id}",
+                    headers=user.headers
+                )
+                if response is not None and response.status_code == 200:
+                    user.session_id = response.json()["id"]
+                return
+
+            response = await self.request(
+                "PATCH /workout-mode/{session_id}/complete", "PATCH", f"/workout-mode/{user.session_id}/complete",
+                json={"notes": None}, headers=user.headers
+            )
+            if response is not None and response.status_code == 200 and response.json()["current_exercise"]:
+                return
+            await self.request(
+                "POST /workout-mode/{session_id}/finish", "POST", f"/workout-mode/{user.session_id}/finish",
+                json={"notes": "bench"}, headers=user.headers
+            )
+            user.session_id = None
+
+    async def log_workout(self, user):
+        body = {"log_date": date.today().isoformat(), "notes": "bench", "exercise_id": self.rng.randint(1, 20),
+                "sets": self.rng.randint(2, 5), "reps": self.rng.choice((5, 8, 10, 12))}
+        await self.request("POST /tracking/workouts", "POST", "/tracking/workouts", json=body, headers=user.headers)
+
+    async def log_weight(self, user):
+        body = {"log_date": date.today().isoformat(), "weight": round(self.rng.uniform(55, 110), 1)}
+        await self.request("POST /tracking/weights", "POST", "/tracking/weights", json=body, headers=user.headers)
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args) -> dict:
+    rng = random.Random(args.seed)
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout) as client:
+        driver = Driver(client, recorder, rng)
+        users = [VirtualUser(i, args.password) for i in range(args.start, args.start + args.users)]
+
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def bounded_setup(user):
+            async with semaphore:
+                await driver.setup(user)
+
+        print(f"Logging in {len(users)} users...", file=sys.stderr)
+        await asyncio.gather(*(bounded_setup(user) for user in users))
+
+        weights = [weight for weight, _, _ in MIX]
+        operations = [getattr(driver, name) for _, _, name in MIX]
+        total = int(args.rps * args.duration)
+        tasks = []
+        print(f"Sending {total} requests at {args.rps} rps...", file=sys.stderr)
+        started = time.perf_counter()
+        for i in range(total):
+            delay = started + i / args.rps - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            operation = rng.choices(operations, weights)[0]
+            tasks.append(asyncio.create_task(operation(rng.choice(users))))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+
+    return {
+        "meta": {
+            "revision": git_revision(),
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "base_url": args.base_url,
+            "users": args.users,
+            "target_rps": args.rps,
+            "duration_s": args.duration,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+            "elapsed_s": round(elapsed, 2),
+        },
+        **recorder.summary(elapsed),
+    }
+
+
+def print_summary(result: dict):
+    print(f"{'route':<44}{'count':>8}{'err':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for route, stats in result["routes"].items():
+        print(f"{route:<44}{stats['count']:>8}{stats['errors']:>6}"
+              f"{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}")
+    overall = result["overall"]
+    print(f"{'overall':<44}{overall['count']:>8}{overall['errors']:>6}"
+          f"{overall['p50_ms']:>10.1f}{overall['p95_ms']:>10.1f}{overall['p99_ms']:>10.1f}")
+    print(f"achieved {overall['achieved_rps']} rps (target {result['meta']['target_rps']})")
+
+
+def print_comparison(baseline: dict, result: dict):
+    print(f"\nChange against {baseline['meta'].get('revision') or 'baseline'}:")
+    print(f"{'route':<44}{'p50':>10}{'p95':>10}{'p99':>10}")
+    rows = list(result["routes"].items()) + [("overall", result["overall"])]
+    for route, stats in rows:
+        old = baseline["overall"] if route == "overall" else baseline["routes"].get(route)
+        if old is None:
+            continue
+        cells = []
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            change = (stats[key] - old[key]) / old[key] * 100 if old[key] else 0.0
+            cells.append(f"{change:>+9.1f}%")
+        print(f"{route:<44}{''.join(cells)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--users", type=int, default=100, help="bench users to act as (see bench.datagen)")
+    parser.add_argument("--start", type=int, default=0, help="index of the first bench user")
+    parser.add_argument("--password", default="benchpass")
+    parser.add_argument("--rps", type=float, default=50)
+    parser.add_argument("--duration", type=float, default=30, help="seconds")
+    parser.add_argument("--concurrency", type=int, default=100, help="maximum open connections")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", default="bench-results.json")
+    parser.add_argument("--compare", help="earlier result file to compare against")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    with open(args.out, "w") as f:
+        json.dump(result, f, indent=2)
+    print_summary(result)
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(json.load(f), result)
+    print(f"\nResults written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+"""
+Microbenchmarks for auth, serialisation and plan-ordering hot paths.
+
+Times, in the spirit of pytest-benchmark but without a test runner:
+
+- ``auth.*``: ``create_access_token`` and ``decode_access_token``;
+- ``schema.*``: Pydantic validation and JSON serialisation of
+  ``WorkoutPlanOut``, ``WorkoutLogOut`` and ``WorkoutSessionOut`` at a few
+  sizes;
+- ``plans.*``: the item insert/move/delete paths of ``app.routers.plans``,
+  called directly against an in-memory SQLite DB, on plans of different
+  lengths;
+- ``seed.*``: ``seed_exercises`` on an empty and on an already seeded DB.
+
+Each benchmark runs for at least ``--min-time`` seconds and ``--min-rounds``
+rounds; only the call itself is timed. ``--save`` stores the results as a
+named baseline under ``bench/baselines/``; ``--compare`` checks a run against
+one and exits with status 1 if any median got slower by more than
+``--threshold`` percent. Baselines are only comparable on the same machine.
+
+Run from the repository root:
+
+    python -m bench.micro --save main
+    python -m bench.micro --compare main --threshold 10
+    python -m bench.micro --filter plans.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import List
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("JWT_SECRET", "bench")
+
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.db import Base, engine
+from app.models import Exercise, PlanItem, User, WorkoutPlan
+from app.routers.auth import create_access_token, decode_access_token
+from app.routers.plans import add_item, delete_item, update_item
+from app.schemas.tracking import WorkoutLogOut
+from app.schemas.workout_mode import WorkoutSessionOut
+from app.schemas.workout_plan import PlanItemCreate, PlanItemUpdate, WorkoutPlanOut
+from app.seed_exercises import seed_exercises
+from bench.load import git_revision
+
+BASELINE_DIR = Path(__file__).parent / "baselines"
+
+BENCHMARKS = {}
+
+
+def benchmark(name: str, setup=None, teardown=None):
+    """
+    Register the decorated callable as benchmark ``name``. ``setup()`` runs
+    untimed before every call and its result is passed to the benchmark;
+    ``teardown(result)`` runs untimed after it with the benchmark's return
+    value.
+    """
+
+    def decorator(fn):
+        BENCHMARKS[name] = (fn, setup, teardown)
+        return fn
+
+    return decorator
+
+
+def measure(fn, setup, teardown, min_time: float, min_rounds: int) -> dict:
+    timings = []
+    deadline = time.perf_counter() + min_time
+    while len(timings) < min_rounds or time.perf_counter() < deadline:
+        state = setup() if setup else None
+        start = time.perf_counter()
+        result = fn(state) if setup else fn()
+        timings.append(time.perf_counter() - start)
+        if teardown:
+            teardown(result)
+    median = statistics.median(timings)
+    return {
+        "rounds": len(timings),
+        "min_us": round(min(timings) * 1e6, 3),
+        "median_us": round(median * 1e6, 3),
+        "mean_us": round(statistics.fmean(timings) * 1e6, 3),
+        "stddev_us": round(statistics.pstdev(timings) * 1e6, 3),
+        "ops": round(1 / median, 1) if median else None,
+    }
+
+
+# Auth
+
+_TOKEN = create_access_token({"sub": "42"})
+
+benchmark("auth.create_access_token")(lambda: create_access_token({"sub": "42"}))
+benchmark("auth.decode_access_token")(lambda: decode_access_token(_TOKEN))
+
+
+# Schemas
+
+def _item(i: int) -> dict:
+    return {"id": i, "exercise_id": i % 20 + 1, "sets": 3, "reps": 10, "duration_seconds": None,
+            "distance_meters": None, "order_index": i, "notes": "Keep core tight"}
+
+
+def _plan(i: int, items: int) -> dict:
+    return {"id": i, "user_id": 1, "title": "Strength Training Plan", "goal_text": "Get stronger",
+            "frequency_per_week": 3, "session_duration_minutes": 60,
+            "items": [_item(j) for j in range(1, items + 1)]}
+
+
+def _log(i: int) -> dict:
+    return {"id": i, "user_id": 1, "plan_id": 1, "log_date": date(2024, 1, 1) + timedelta(days=i // 3),
+            "notes": "Completed Squat: done", "exercise_id": 3, "sets": 3, "reps": 10,
+            "duration_seconds": None, "distance_meters": None}
+
+
+_SESSION = {"id": 1, "plan_id": 1, "title": "Strength Training Plan", "started_at": datetime(2024, 1, 1, 7, 30),
+            "ended_at": None, "current_index": 2,
+            "current_exercise": {"id": 2, "order_index": 2, "exercise_name": "Squat", "sets": 3, "reps": 10,
+                                 "duration_seconds": None, "distance_meters": None, "notes": None}}
+
+
+def _schema_benchmarks(label: str, schema, documents: list):
+    adapter = TypeAdapter(List[schema])
+    validated = adapter.validate_python(documents)
+    benchmark(f"schema.{label}.validate")(lambda: adapter.validate_python(documents))
+    benchmark(f"schema.{label}.dump_json")(lambda: adapter.dump_json(validated))
+
+
+_schema_benchmarks("plan[1x8]", WorkoutPlanOut, [_plan(1, 8)])
+_schema_benchmarks("plan[1x100]", WorkoutPlanOut, [_plan(1, 100)])
+_schema_benchmarks("plan[50x8]", WorkoutPlanOut, [_plan(i, 8) for i in range(1, 51)])
+_schema_benchmarks("workout_log[10]", WorkoutLogOut, [_log(i) for i in range(1, 11)])
+_schema_benchmarks("workout_log[1000]", WorkoutLogOut, [_log(i) for i in range(1, 1001)])
+_schema_benchmarks("session[1]", WorkoutSessionOut, [_SESSION])
+_schema_benchmarks("session[100]", WorkoutSessionOut, [dict(_SESSION, id=i) for i in range(1, 101)])
+
+
+# Plan ordering: the endpoint functions, called with a session and user
+
+def _ordering_db():
+    ordering_engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(ordering_engine)
+    db = sessionmaker(bind=ordering_engine)()
+    db.add(Exercise(id=1, name="Squat"))
+    db.commit()
+    return db
+
+
+_db = _ordering_db()
+
+
+def _make_plan(items: int):
+    user = User(email=f"micro{items}@example.com", password_hash="x")
+    plan = WorkoutPlan(user=user, title=f"{items} items", frequency_per_week=3, session_duration_minutes=60)
+    plan.items = [PlanItem(exercise_id=1, sets=3, reps=10, order_index=i) for i in range(1, items + 1)]
+    _db.add(plan)
+    _db.commit()
+    return user, plan.id
+
+
+def _ordering_benchmarks(items: int):
+    user, plan_id = _make_plan(items)
+
+    def insert_first():
+        return add_item(plan_id, PlanItemCreate(exercise_id=1, sets=3, reps=10, order_index=1), _db, user).id
+
+    def remove(item_id):
+        delete_item(plan_id, item_id, _db, user)
+
+    def first_item_id():
+        return _db.query(PlanItem.id).filter(PlanItem.plan_id == plan_id, PlanItem.order_index == 1).scalar()
+
+    def last_item_id():
+        return _db.query(PlanItem.id).filter(PlanItem.plan_id == plan_id, PlanItem.order_index == items).scalar()
+
+    def move(item_id, order_index):
+        update_item(plan_id, item_id, PlanItemUpdate(sets=3, reps=10, order_index=order_index), _db, user)
+        return item_id
+
+    benchmark(f"plans[{items}].insert_first", teardown=remove)(insert_first)
+    benchmark(f"plans[{items}].insert_last", teardown=remove)(
+        lambda: add_item(plan_id, PlanItemCreate(exercise_id=1, sets=3, reps=10), _db, user).id
+    )
+    benchmark(f"plans[{items}].move_first_to_last", setup=first_item_id,
+              teardown=lambda item_id: move(item_id, 1))(lambda item_id: move(item_id, items))
+    benchmark(f"plans[{items}].move_last_to_first", setup=last_item_id,
+              teardown=lambda item_id: move(item_id, items))(lambda item_id: move(item_id, 1))
+    benchmark(f"plans[{items}].delete_first", setup=insert_first)(remove)
+
+
+for _items in (10, 200):
+    _ordering_benchmarks(_items)
+
+
+# Seeding: seed_exercises uses the app's own engine (in-memory SQLite here)
+
+Base.metadata.create_all(engine)
+
+
+def _clear_exercises():
+    with engine.begin() as conn:
+        conn.execute(Exercise.__table__.delete())
+
+
+benchmark("seed.exercises.empty", setup=_clear_exercises)(lambda _: seed_exercises())
+benchmark("seed.exercises.seeded")(seed_exercises)
+
+
+def compare(baseline: dict, results: dict, threshold: float) -> list:
+    """Print the change against ``baseline`` and return the names that regressed."""
+    regressions = []
+    print(f"\nChange in median against {baseline['meta'].get('revision') or 'baseline'} "
+          f"(threshold {threshold:+.0f}%):")
+    for name, stats in results.items():
+        old = baseline["results"].get(name)
+        if old is None:
+            print(f"{name:<44}{'new':>12}")
+            continue
+        change = (stats["median_us"] - old["median_us"]) / old["median_us"] * 100
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<44}{change:>+11.1f}%{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--filter", default="", help="only run benchmarks whose name contains this")
+    parser.add_argument("--min-time", type=float, default=0.5, help="seconds per benchmark")
+    parser.add_argument("--min-rounds", type=int, default=20)
+    parser.add_argument("--save", metavar="NAME", help="store the results as baseline NAME")
+    parser.add_argument("--compare", metavar="NAME", help="baseline to compare against")
+    parser.add_argument("--threshold", type=float, default=10, help="allowed median slowdown in percent")
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'benchmark':<44}{'min us':>12}{'median us':>12}{'stddev us':>12}{'ops/s':>12}{'rounds':>8}")
+    for name, (fn, setup, teardown) in BENCHMARKS.items():
+        if args.filter not in name:
+            continue
+        stats = results[name] = measure(fn, setup, teardown, args.min_time, args.min_rounds)
+        print(f"{name:<44}{stats['min_us']:>12.1f}{stats['median_us']:>12.1f}{stats['stddev_us']:>12.1f}"
+              f"{stats['ops']:>12,.0f}{stats['rounds']:>8}")
+
+    if args.save:
+        BASELINE_DIR.mkdir(exist_ok=True)
+        path = BASELINE_DIR / f"{args.save}.json"
+        meta = {
+            "revision": git_revision(),
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": f"{platform.system()} {platform.machine()} {platform.node()}",
+        }
+        path.write_text(json.dumps({"meta": meta, "results": results}, indent=2))
+        print(f"\nBaseline written to {path}")
+
+    if args.compare:
+        baseline = json.loads((BASELINE_DIR / f"{args.compare}.json").read_text())
+        if compare(baseline, results, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
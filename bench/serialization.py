@@ -0,0 +1,102 @@
+"""
+Microbenchmark: list-endpoint serialisation before and after the fast path.
+
+Compares, for N workout/weight log rows loaded from an in-memory SQLite DB:
+
+- ``orm+pydantic``: load ORM objects, validate them against the response
+  model with ``from_attributes`` and serialise with the stdlib ``json``
+  (what FastAPI does for ``response_model=List[...]`` endpoints).
+- ``rows+orjson``: select plain columns and ``orjson.dumps`` the row dicts
+  (``app.responses.rows_response``).
+
+Run from the repository root:
+
+    python -m bench.serialization --rows 10000 --repeat 5
+"""
+
+import argparse
+import json
+import os
+import time
+from datetime import date, timedelta
+from typing import List
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("JWT_SECRET", "bench")
+
+import orjson
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.db import Base
+from app.models.user import User
+from app.models.workout_log import WorkoutLog
+from app.models.weight_log import WeightLog
+from app.schemas.tracking import WorkoutLogOut, WeightLogOut
+from app.responses import schema_columns, rows_response
+
+
+def setup_db(rows: int):
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    db.add(User(id=1, email="bench@example.com", password_hash="x"))
+    start = date(2020, 1, 1)
+    db.bulk_insert_mappings(WorkoutLog, [
+        {"user_id": 1, "log_date": start + timedelta(days=i // 3), "notes": f"Completed set {i}",
+         "exercise_id": None, "sets": 3, "reps": 10}
+        for i in range(rows)
+    ])
+    db.bulk_insert_mappings(WeightLog, [
+        {"user_id": 1, "log_date": start + timedelta(days=i), "weight": 80.0 - i * 0.001}
+        for i in range(rows)
+    ])
+    db.commit()
+    return db
+
+
+def orm_pydantic(db, model, schema):
+    adapter = TypeAdapter(List[schema])
+    objects = db.query(model).filter(model.user_id == 1).all()
+    data = adapter.dump_python(adapter.validate_python(objects, from_attributes=True), mode="json")
+    body = json.dumps(data, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+    db.expunge_all()
+    return body
+
+
+def rows_orjson(db, model, schema):
+    rows = db.query(*schema_columns(model, schema)).filter(model.user_id == 1).all()
+    return rows_response(rows).body
+
+
+def bench(fn, repeat, *args):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    db = setup_db(args.rows)
+    print(f"{'endpoint':<16}{'path':<16}{'best (ms)':>12}{'rows/s':>14}")
+    for name, model, schema in (("workouts", WorkoutLog, WorkoutLogOut), ("weights", WeightLog, WeightLogOut)):
+        # Both paths must produce the same document
+        assert orjson.loads(orm_pydantic(db, model, schema)) == orjson.loads(rows_orjson(db, model, schema))
+        timings = {}
+        for label, fn in (("orm+pydantic", orm_pydantic), ("rows+orjson", rows_orjson)):
+            timings[label] = bench(fn, args.repeat, db, model, schema)
+            print(f"{name:<16}{label:<16}{timings[label] * 1000:>12.1f}{args.rows / timings[label]:>14,.0f}")
+        print(f"{name:<16}{'speedup':<16}{timings['orm+pydantic'] / timings['rows+orjson']:>11.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+Every route with a ``@query_budget`` stays within it.
+
+The app runs against throwaway SQLite databases, a main database plus one
+extra shard, with ``QUERY_BUDGET_MODE=raise``, so a route running more
+statements than its budget fails the request with ``QueryBudgetExceeded``.
+The requests take the costlier branch of a route where it has one: users
+placed on both shards, logs reaching into the archive, a delta sync turned
+full by a resync tombstone. The response cache is off so every read hits
+the database.
+
+`test_every_budgeted_route_is_requested` fails when a budgeted route has no
+request here; add one with the route.
+
+    python -m pytest tests
+"""
+
+import os
+import tempfile
+from datetime import date, timedelta
+
+_db_dir = tempfile.mkdtemp(prefix="athlos-tests-")
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{_db_dir}/main.db",
+    DATABASE_SHARDS=f"s1=sqlite:///{_db_dir}/s1.db",
+    JWT_SECRET="test-secret",
+    QUERY_BUDGET_MODE="raise",
+    CACHE_ENABLED="false",
+    RATE_LIMIT_ENABLED="false",
+    CONCURRENCY_LIMIT_ENABLED="false",
+    ARCHIVE_AFTER_MONTHS="3",
+    ADMIN_EMAILS="admin@example.com",
+    PROFILER_HEADER_ENABLED="true",
+)
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+
+import app.models
+from app.db import Base, shard_map
+from app.main import app as api
+from app.models.tombstone import RESYNC_ENTITY, Tombstone
+from app.seed_exercises import seed_exercises
+from app.services import archive
+from app.services.query_budget import budget_of
+from app.services.sharding import MAIN
+
+# (method, path template) of every request made by the tests
+requested = set()
+
+OLD = date.today() - timedelta(days=400)
+RECENT = date.today() - timedelta(days=2)
+
+
+def call(client, method, template, headers=None, path=None, status=None, **kwargs):
+    """Request ``template`` and check the status: ``status`` when given, any 2xx otherwise."""
+    response = client.request(method, template.format(**(path or {})), headers=headers, **kwargs)
+    requested.add((method, template))
+    if status is None:
+        assert 200 <= response.status_code < 300, response.text
+    else:
+        assert response.status_code == status, response.text
+    return response
+
+
+def register(client, email):
+    call(client, "POST", "/auth/register", json={"email": email, "password": "secret-pw"})
+    tokens = call(client, "POST", "/auth/login", json={"email": email, "password": "secret-pw"}).json()
+    return {"Authorization": tokens["access_token"]}, tokens["refresh_token"]
+
+
+@pytest.fixture(scope="module")
+def client():
+    for engine in shard_map.engines.values():
+        Base.metadata.create_all(engine)
+    seed_exercises()
+    return TestClient(api)
+
+
+@pytest.fixture(scope="module")
+def users(client):
+    """Headers of a user on each shard."""
+    headers = {}
+    for n in range(50):
+        email = f"user{n}@example.com"
+        auth, _ = register(client, email)
+        user_id = call(client, "GET", "/auth/me", headers=auth).json()["id"]
+        headers.setdefault(shard_map.place(user_id), auth)
+        if len(headers) == len(shard_map.engines):
+            return headers
+    pytest.fail("No user was placed on every shard")
+
+
+def test_auth(client, users):
+    auth, refresh_token = register(client, "auth@example.com")
+    rotated = call(client, "POST", "/auth/refresh", json={"refresh_token": refresh_token})
+    # Reusing a refresh token revokes the whole login
+    call(client, "POST", "/auth/refresh", json={"refresh_token": refresh_token}, status=401)
+    auth = {"Authorization": rotated.json()["access_token"]}
+    call(client, "GET", "/auth/me", headers=auth, status=401)
+
+    auth, _ = register(client, "logout@example.com")
+    call(client, "POST", "/auth/logout", headers=auth, status=204)
+    call(client, "GET", "/auth/jwks.json")
+
+
+def test_exercises(client):
+    exercises = call(client, "GET", "/exercises/").json()
+    call(client, "GET", "/exercises/{exercise_id}", path={"exercise_id": exercises[0]["id"]})
+
+
+@pytest.mark.parametrize("shard", [MAIN, "s1"])
+def test_user_data(client, users, shard):
+    auth = users[shard]
+
+    # Plans and items; workout mode steps through order_index 1, 2, ...
+    plan = call(client, "POST", "/plans/", headers=auth, json={
+        "title": "Strength", "frequency_per_week": 3, "session_duration_minutes": 60,
+    }).json()
+    ids = {"plan_id": plan["id"]}
+    items = [
+        call(client, "POST", "/plans/{plan_id}/items", headers=auth, path=ids, json={
+            "exercise_id": exercise_id, "sets": 3, "reps": 10, "order_index": index,
+        }).json()
+        for index, exercise_id in enumerate((1, 2, 3), start=1)
+    ]
+    call(client, "PATCH", "/plans/{plan_id}", headers=auth, path=ids, json={
+        "title": "Strength II", "frequency_per_week": 4, "session_duration_minutes": 45,
+    })
+    call(client, "PATCH", "/plans/{plan_id}/items/{item_id}", headers=auth,
+         path={**ids, "item_id": items[0]["id"]}, json={"sets": 4, "reps": 8, "order_index": 1})
+    call(client, "GET", "/plans/", headers=auth)
+    call(client, "GET", "/plans/{plan_id}", headers=auth, path=ids)
+    call(client, "GET", "/plans/{plan_id}/volume", headers=auth, path=ids)
+
+    # Workout mode through every item
+    session = call(client, "POST", "/workout-mode/start/{plan_id}", headers=auth, path=ids).json()
+    for _ in items:
+        call(client, "PATCH", "/workout-mode/{session_id}/complete", headers=auth,
+             path={"session_id": session["id"]}, json={"notes": "done"})
+    call(client, "POST", "/workout-mode/{session_id}/finish", headers=auth,
+         path={"session_id": session["id"]}, json={"notes": "good"})
+
+    # Tracking, with old logs moved to the archive
+    for log_date in (OLD, RECENT):
+        call(client, "POST", "/tracking/workouts", headers=auth, json={
+            "log_date": str(log_date), "plan_id": plan["id"], "exercise_id": 1, "sets": 3, "reps": 10,
+        })
+        call(client, "POST", "/tracking/weights", headers=auth, json={"log_date": str(log_date), "weight": 70.5})
+    assert archive.archive(shard_map.engines[shard], archive.horizon())["workout_logs"] >= 1
+    workouts = call(client, "GET", "/tracking/workouts", headers=auth).json()
+    assert str(OLD) in {log["log_date"] for log in workouts}
+    call(client, "GET", "/tracking/workouts/{log_id}", headers=auth, path={"log_id": workouts[-1]["id"]})
+    weights = call(client, "GET", "/tracking/weights", headers=auth).json()
+    call(client, "GET", "/tracking/volume", headers=auth, params={"from": str(OLD)})
+
+    goal = call(client, "POST", "/tracking/goals", headers=auth, json={"type": "weight", "target_value": 68}).json()
+    call(client, "PATCH", "/tracking/goals/{goal_id}", headers=auth, path={"goal_id": goal["id"]},
+         json={"type": "weight", "target_value": 67})
+    call(client, "GET", "/tracking/goals", headers=auth)
+
+    call(client, "GET", "/me/dashboard", headers=auth)
+    batch = call(client, "POST", "/batch", headers=auth, json={"operations": [
+        {"method": "GET", "path": "/tracking/workouts", "query": {"from": str(OLD)}},
+        {"method": "POST", "path": "/tracking/weights", "body": {"log_date": str(RECENT), "weight": 70}},
+        {"method": "PATCH", "path": f"/plans/{plan['id']}/items/{items[1]['id']}", "body": {"sets": 5}},
+    ]}).json()
+    assert batch["committed"], batch
+
+    # Full snapshot, then a delta sync turned full by a resync tombstone
+    watermark = call(client, "GET", "/sync", headers=auth).json()["watermark"]
+    user_id = call(client, "GET", "/auth/me", headers=auth).json()["id"]
+    with shard_map.engines[shard].begin() as connection:
+        connection.execute(insert(Tombstone.__table__).values(user_id=user_id, entity=RESYNC_ENTITY, entity_id=user_id))
+    assert call(client, "GET", "/sync", headers=auth, params={"since": watermark}).json()["full"]
+
+    call(client, "DELETE", "/tracking/workouts/{log_id}", headers=auth, path={"log_id": workouts[-1]["id"]})
+    call(client, "DELETE", "/tracking/weights/{log_id}", headers=auth, path={"log_id": weights[-1]["id"]})
+    call(client, "DELETE", "/tracking/goals/{goal_id}", headers=auth, path={"goal_id": goal["id"]})
+    call(client, "DELETE", "/plans/{plan_id}/items/{item_id}", headers=auth, path={**ids, "item_id": items[2]["id"]})
+    call(client, "DELETE", "/plans/{plan_id}", headers=auth, path=ids)
+
+
+def test_admin_and_metrics(client, users):
+    admin, _ = register(client, "admin@example.com")
+    profiled = call(client, "GET", "/auth/me", headers={**admin, "X-Profile": "1"})
+
+    call(client, "GET", "/admin/slow-queries", headers=admin)
+    call(client, "DELETE", "/admin/slow-queries", headers=admin)
+    call(client, "GET", "/admin/profiles", headers=admin)
+    call(client, "GET", "/admin/profiles/collapsed", headers=admin)
+    call(client, "GET", "/admin/profiles/{profile_id}", headers=admin,
+         path={"profile_id": profiled.headers["X-Profile-Id"]})
+    call(client, "DELETE", "/admin/profiles", headers=admin)
+
+    call(client, "POST", "/admin/memory/start", headers=admin)
+    call(client, "GET", "/admin/memory", headers=admin)
+    first = call(client, "POST", "/admin/memory/snapshots", headers=admin).json()
+    call(client, "GET", "/admin/memory/snapshots/{snapshot_id}", headers=admin, path={"snapshot_id": first["id"]})
+    call(client, "GET", "/admin/memory/diff", headers=admin, params={"from": first["id"]})
+    call(client, "POST", "/admin/memory/stop", headers=admin)
+
+    call(client, "GET", "/metrics")
+    call(client, "GET", "/metrics/compression")
+    call(client, "GET", "/metrics/cache")
+
+
+def test_every_budgeted_route_is_requested():
+    budgeted = {
+        (method, route.path)
+        for route in api.routes
+        if budget_of(getattr(route, "endpoint", None)) is not None
+        for method in route.methods
+    }
+    assert budgeted - requested == set()